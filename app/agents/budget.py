@@ -0,0 +1,111 @@
+"""
+Token budgets for LLM calls.
+
+Every node counts its prompt locally before calling the model and fits it
+to min(node budget, what is left of the run budget) — truncating raw text or
+dropping the least relevant changes first (secondary champions, then system,
+then item changes). Budgeted, estimated and actual usage are recorded in
+metadata["token_budget"].
+"""
+import logging
+import os
+from collections.abc import Callable
+from typing import Any, Optional
+
+from agents.prompt_codec import count_tokens
+
+logger = logging.getLogger(__name__)
+
+NODE_TOKEN_BUDGETS = {
+    "extractor": int(os.getenv("EXTRACTOR_TOKEN_BUDGET", "6000")),
+    "analyzer": int(os.getenv("ANALYZER_TOKEN_BUDGET", "6000")),
+    "summarizer": int(os.getenv("SUMMARIZER_TOKEN_BUDGET", "6000")),
+}
+RUN_TOKEN_BUDGET = int(os.getenv("RUN_TOKEN_BUDGET", "40000"))
+
+
+def _ledger(metadata: dict) -> dict:
+    return metadata.setdefault("token_budget", {"run_budget": RUN_TOKEN_BUDGET, "calls": {}})
+
+
+def run_tokens_used(metadata: dict) -> int:
+    """Tokens spent so far this run: actual usage where known, else the estimate."""
+    used = 0
+    for call in _ledger(metadata)["calls"].values():
+        actual = call.get("actual_prompt_tokens", 0) + call.get("actual_completion_tokens", 0)
+        used += actual or call.get("estimated_prompt_tokens", 0)
+    return used
+
+
+def prompt_limit(metadata: dict, node: str) -> int:
+    """Prompt tokens allowed for the next call of `node`."""
+    node_budget = NODE_TOKEN_BUDGETS.get(node.split(".", 1)[0], RUN_TOKEN_BUDGET)
+    return max(0, min(node_budget, RUN_TOKEN_BUDGET - run_tokens_used(metadata)))
+
+
+def record(metadata: dict, call: str, budget: int, estimated: int, response: Any = None, dropped: int = 0) -> None:
+    """Record one LLM call; `call` is a node name, optionally with a step suffix ("summarizer.step1")."""
+    entry = {"budget": budget, "estimated_prompt_tokens": estimated, "dropped": dropped}
+    usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+    if usage:
+        entry["actual_prompt_tokens"] = usage.get("prompt_tokens", 0)
+        entry["actual_completion_tokens"] = usage.get("completion_tokens", 0)
+    _ledger(metadata)["calls"][call] = entry
+    logger.info(
+        f"💰 {call}: 预算={budget}, 预估输入={estimated}, "
+        f"实际输入={entry.get('actual_prompt_tokens', '-')}, 丢弃={dropped}"
+    )
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Longest prefix of `text` within `max_tokens` (binary search over length)."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if count_tokens(text[:mid]) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low]
+
+
+def drop_rank(change: dict) -> int:
+    """Higher rank is dropped first: secondary champions, system, item, then primary champions."""
+    if change.get("type") == "system":
+        return 2
+    if change.get("type") == "item":
+        return 1
+    return 3 if change.get("relevance") == "secondary" else 0
+
+
+def fit_records(
+    records: list[dict],
+    render: Callable[[list[dict]], str],
+    max_tokens: int,
+    rank: Optional[Callable[[dict], int]] = None,
+) -> tuple[list[dict], str, int]:
+    """
+    Drop records (highest rank first, later ones first within a rank) until
+    render(kept) fits in `max_tokens`; at least one record is always kept.
+    Returns (kept, rendered prompt, prompt tokens).
+    """
+    rank = rank or drop_rank
+    kept = list(records)
+    prompt = render(kept)
+    tokens = count_tokens(prompt)
+    if tokens <= max_tokens:
+        return kept, prompt, tokens
+
+    drop_order = sorted(range(len(records)), key=lambda i: (rank(records[i]), i), reverse=True)
+    dropped: set[int] = set()
+    for index in drop_order[:-1]:
+        dropped.add(index)
+        kept = [r for i, r in enumerate(records) if i not in dropped]
+        prompt = render(kept)
+        tokens = count_tokens(prompt)
+        if tokens <= max_tokens:
+            break
+    logger.warning(f"💰 Prompt 超出预算 {max_tokens}，丢弃 {len(records) - len(kept)} 条低相关内容")
+    return kept, prompt, tokens
@@ -1,49 +1,191 @@
+import asyncio
+import logging
 import os
+import time
+from collections.abc import Callable
+from typing import Any, Optional
 
+import openai
 from agents.tools import websearch
 from langchain_openai import ChatOpenAI
 
+logger = logging.getLogger(__name__)
+
 # AI Builders Space unified API
 _BASE_URL = os.getenv("AI_BUILDER_BASE_URL", "https://space.ai-builders.com/backend/v1")
 _API_KEY = os.getenv("AI_BUILDER_TOKEN", "")
 
+# Model routing (opt-in): a task is a node ("extractor") or a node step ("summarizer.step1").
+# <TASK>_MODEL (e.g. EXTRACTOR_MODEL, SUMMARIZER_STEP1_MODEL) overrides the step,
+# then the node, then LLM_MODEL. Output that fails validation is retried once on
+# ESCALATION_MODEL, when it is set and differs from the task's model.
+DEFAULT_MODEL = os.getenv("LLM_MODEL", "deepseek")
+MODEL_ROUTES = {
+    task: os.getenv(f"{task.replace('.', '_').upper()}_MODEL", "")
+    for task in ("extractor", "analyzer", "summarizer", "summarizer.step1", "summarizer.step2")
+}
+ESCALATION_MODEL = os.getenv("ESCALATION_MODEL", "")
+
+
+_http_client: Optional[openai.DefaultHttpxClient] = None
+_async_http_clients: dict[asyncio.AbstractEventLoop, openai.DefaultAsyncHttpxClient] = {}
+_closing: set[asyncio.Task] = set()
+
+
+def _get_http_clients() -> tuple[Any, Any]:
+    """
+    Connection pools shared by every ChatOpenAI instance, so each node call
+    reuses warm connections instead of building new clients. The async pool
+    is per event loop (connections cannot cross loops); pools left behind by
+    closed loops are closed in the background.
+    """
+    global _http_client
+    if _http_client is None:
+        _http_client = openai.DefaultHttpxClient()
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return _http_client, None  # no loop yet: ChatOpenAI builds its own async client
+    for stale in [other for other in _async_http_clients if other.is_closed()]:
+        task = loop.create_task(_async_http_clients.pop(stale).aclose())
+        _closing.add(task)
+        task.add_done_callback(_closing.discard)
+    async_http_client = _async_http_clients.get(loop)
+    if async_http_client is None or async_http_client.is_closed:
+        async_http_client = _async_http_clients[loop] = openai.DefaultAsyncHttpxClient()
+    return _http_client, async_http_client
+
+
+async def aclose_llm_clients() -> None:
+    """Close the running loop's async pool and any left behind by loops that have since closed."""
+    loop = asyncio.get_running_loop()
+    for owner in [other for other in _async_http_clients if other is loop or other.is_closed()]:
+        await _async_http_clients.pop(owner).aclose()
+
 
 def _create_llm(model: str, temperature: float, **kwargs) -> ChatOpenAI:
     """Create a ChatOpenAI instance pointing at AI Builders Space."""
+    http_client, async_http_client = _get_http_clients()
     return ChatOpenAI(
         model=model,
         temperature=temperature,
         base_url=_BASE_URL,
         api_key=_API_KEY,
+        http_client=http_client,
+        http_async_client=async_http_client,
         **kwargs,
     )
 
 
-def extractor_llm(temperature: float = 0.7, bind_tools: bool = False):
+def warm_up_clients() -> list[str]:
+    """Create the shared connection pools and one client per routed model; returns the models."""
+    models = sorted({route(task) for task in MODEL_ROUTES} | ({ESCALATION_MODEL} - {""}))
+    for model in models:
+        _create_llm(model, temperature=0.0)
+    return models
+
+
+def route(task: str) -> str:
+    """Model for a task: step route, then node route, then DEFAULT_MODEL."""
+    node = task.split(".", 1)[0]
+    return MODEL_ROUTES.get(task) or MODEL_ROUTES.get(node) or DEFAULT_MODEL
+
+
+def _record_model_call(
+    metadata: Optional[dict], task: str, model: str, latency: float, response: Any, escalated: bool
+) -> None:
+    if metadata is None:
+        return
+    usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+    stats = metadata.setdefault("model_usage", {}).setdefault(
+        model, {"calls": 0, "latency_seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0, "escalations": 0}
+    )
+    stats["calls"] += 1
+    stats["latency_seconds"] = round(stats["latency_seconds"] + latency, 3)
+    stats["prompt_tokens"] += usage.get("prompt_tokens", 0)
+    stats["completion_tokens"] += usage.get("completion_tokens", 0)
+    stats["escalations"] += int(escalated)
+    metadata.setdefault("model_routes", {})[task] = model
+    logger.info(f"🧭 {task} -> {model}: {latency:.2f}s{' (escalated)' if escalated else ''}")
+
+
+async def ainvoke_routed(
+    task: str,
+    messages: list,
+    make_llm: Callable[[str], Any],
+    parse: Optional[Callable[[Any], Any]] = None,
+    metadata: Optional[dict] = None,
+) -> tuple[Any, Any]:
+    """
+    Invoke the model routed for `task` and validate the response with `parse`
+    (which raises ValueError on bad output). On failure the call is retried
+    once on ESCALATION_MODEL (never on the same model). Returns (response, parsed).
+    """
+    models = [route(task)]
+    if parse is not None and ESCALATION_MODEL and ESCALATION_MODEL != models[0]:
+        models.append(ESCALATION_MODEL)
+
+    for attempt, model in enumerate(models):
+        started = time.monotonic()
+        response = await make_llm(model).ainvoke(messages)
+        _record_model_call(metadata, task, model, time.monotonic() - started, response, escalated=attempt > 0)
+        if parse is None:
+            return response, None
+        try:
+            return response, parse(response)
+        except ValueError as e:
+            if attempt == len(models) - 1:
+                raise
+            logger.warning(f"⚠️ {task} 输出校验失败 ({model}): {e}，改用 {models[attempt + 1]} 重试")
+    raise RuntimeError("unreachable")
+
+
+def extractor_llm(
+    temperature: float = 0.7,
+    bind_tools: bool = False,
+    model: Optional[str] = None,
+    response_format: Optional[dict] = None,
+):
     """Create LLM for the extractor node."""
-    llm = _create_llm("deepseek", temperature=temperature)
+    llm = _create_llm(model or route("extractor"), temperature=temperature)
 
     if bind_tools:
         llm = llm.bind_tools([websearch])
+    if response_format:
+        llm = llm.bind(response_format=response_format)
 
     return llm
 
 
-def analyzer_llm(temperature: float = 0.7, bind_tools: bool = True):
+def analyzer_llm(
+    temperature: float = 0.7,
+    bind_tools: bool = True,
+    model: Optional[str] = None,
+    response_format: Optional[dict] = None,
+):
     """Create LLM for the analyzer node."""
-    llm = _create_llm("deepseek", temperature=temperature)
+    llm = _create_llm(model or route("analyzer"), temperature=temperature)
 
     if bind_tools:
         llm = llm.bind_tools([websearch])
+    if response_format:
+        llm = llm.bind(response_format=response_format)
 
     return llm
 
 
-def summarizer_llm(temperature: float = 0.7, bind_tools: bool = False):
+def summarizer_llm(
+    temperature: float = 0.7,
+    bind_tools: bool = False,
+    model: Optional[str] = None,
+    response_format: Optional[dict] = None,
+):
     """Create LLM for the summarizer node."""
-    llm = _create_llm("deepseek", temperature=temperature)
+    llm = _create_llm(model or route("summarizer"), temperature=temperature)
 
     if bind_tools:
         llm = llm.bind_tools([websearch])
+    if response_format:
+        llm = llm.bind(response_format=response_format)
 
     return llm
@@ -0,0 +1,271 @@
+"""
+Memory-bounded workflow state.
+
+Large state fields (SPILL_FIELDS: the raw patch text and the impact analyses)
+are written to SPILL_DIR once they exceed SPILL_THRESHOLD_BYTES and travel
+through the graph as SpillRef handles, so copying the state between nodes
+copies a handle instead of the payload; nodes read them with load().
+
+Every graph node runs through track(), which spills oversized outputs,
+records RSS figures per node in metadata["memory"] (plus tracemalloc deltas
+when MEMORY_TRACEMALLOC is on — it costs memory and CPU, so it is opt-in), and
+refuses to start a node while RSS stays above WORKFLOW_MEMORY_CEILING_MB.
+materialize() turns the final state back into plain values. Each run goes
+inside run_scope(), which deletes every file the run spilled even when it
+fails or is cancelled; sweep_spill_dir() clears leftovers of killed processes.
+"""
+import contextlib
+import contextvars
+import functools
+import gc
+import json
+import logging
+import os
+import resource
+import sys
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+SPILL_DIR = Path(os.getenv("STATE_SPILL_DIR", "data/cache/spill"))
+SPILL_THRESHOLD_BYTES = int(os.getenv("STATE_SPILL_THRESHOLD_BYTES", str(64 * 1024)))
+# 0 disables the ceiling; set it below the container limit (e.g. 220 for 256MB)
+# Spill files older than this are left over from a killed process (no run lasts that long)
+SPILL_MAX_AGE_SECONDS = float(os.getenv("STATE_SPILL_MAX_AGE_SECONDS", str(6 * 3600)))
+MEMORY_CEILING_MB = float(os.getenv("WORKFLOW_MEMORY_CEILING_MB", "0"))
+MEMORY_TRACEMALLOC = os.getenv("MEMORY_TRACEMALLOC", "false").lower() == "true"
+
+SPILL_FIELDS = ("raw_content", "impact_analyses")
+
+_run_spills: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("run_spills", default=None)
+_tracers = 0  # nodes currently measured; tracemalloc runs while > 0 unless started elsewhere
+_owns_tracemalloc = False
+
+
+class SpillRef:
+    """Handle to a state value stored in a spill file."""
+
+    __slots__ = ("path", "kind", "size")
+
+    def __init__(self, path: Path, kind: str, size: int):
+        self.path = path
+        self.kind = kind  # "text" or "json"
+        self.size = size
+
+    def __repr__(self) -> str:
+        return f"SpillRef({self.path.name}, {self.size} bytes)"
+
+
+# ==================== Spill files ====================
+
+def spill(value: Any, name: str) -> Any:
+    """Return a SpillRef for `value` when it is large, else `value` itself."""
+    if value is None or isinstance(value, SpillRef):
+        return value
+    if isinstance(value, str):
+        kind, data = "text", value.encode("utf-8")
+    else:
+        kind, data = "json", json.dumps(value, ensure_ascii=False).encode("utf-8")
+    if len(data) < SPILL_THRESHOLD_BYTES:
+        return value
+
+    SPILL_DIR.mkdir(parents=True, exist_ok=True)
+    path = SPILL_DIR / f"{name}-{uuid.uuid4().hex}.{'txt' if kind == 'text' else 'json'}"
+    path.write_bytes(data)
+    logger.info(f"💽 {name} 已转存磁盘: {len(data)} 字节 -> {path.name}")
+    ref = SpillRef(path, kind, len(data))
+    run_spills = _run_spills.get()
+    if run_spills is not None:
+        run_spills.append(ref)
+    return ref
+
+
+def load(value: Any) -> Any:
+    """Resolve a SpillRef (plain values pass through). Drop the result after use."""
+    if not isinstance(value, SpillRef):
+        return value
+    if value.kind == "text":
+        return value.path.read_text(encoding="utf-8")
+    return json.loads(value.path.read_bytes())
+
+
+def discard(value: Any) -> None:
+    """Delete the spill file behind `value`, if any."""
+    if isinstance(value, SpillRef):
+        value.path.unlink(missing_ok=True)
+
+
+def materialize(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Final state with plain values: spilled analyses are loaded back, the raw
+    text is dropped (results never carry it), and the spill files are deleted.
+    """
+    result = dict(state)
+    if "raw_content" in result:
+        discard(result["raw_content"])
+        result["raw_content"] = ""
+    for field in SPILL_FIELDS:
+        value = result.get(field)
+        if isinstance(value, SpillRef):
+            result[field] = load(value)
+            discard(value)
+    return result
+
+
+@contextlib.contextmanager
+def run_scope() -> Iterator[None]:
+    """Delete every file spilled inside the block on exit, whether the run finished, failed or was cancelled."""
+    refs: list = []
+    token = _run_spills.set(refs)
+    try:
+        yield
+    finally:
+        _run_spills.reset(token)
+        for ref in refs:
+            discard(ref)
+
+
+def sweep_spill_dir(max_age_seconds: float = SPILL_MAX_AGE_SECONDS) -> int:
+    """Delete spill files older than `max_age_seconds`; returns how many were removed."""
+    if not SPILL_DIR.exists():
+        return 0
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    for path in SPILL_DIR.iterdir():
+        try:
+            if path.is_file() and path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except OSError as e:
+            logger.warning(f"清理转存文件失败 {path.name}: {e}")
+    if removed:
+        logger.info(f"🧹 已清理 {removed} 个过期转存文件")
+    return removed
+
+
+# ==================== Measurement ====================
+
+def current_rss_mb() -> float:
+    """Resident set size of this process, in MB."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, IndexError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    """Highest RSS this process has reached, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, kilobytes elsewhere
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def _start_tracing() -> bool:
+    global _tracers, _owns_tracemalloc
+    if not MEMORY_TRACEMALLOC:
+        return False
+    if _tracers == 0:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _owns_tracemalloc = True
+        tracemalloc.reset_peak()
+    _tracers += 1
+    return True
+
+
+def _stop_tracing() -> None:
+    global _tracers, _owns_tracemalloc
+    _tracers -= 1
+    if _tracers == 0 and _owns_tracemalloc:
+        tracemalloc.stop()
+        _owns_tracemalloc = False
+
+
+def _record(metadata: Dict[str, Any], name: str, sample: Dict[str, Any]) -> None:
+    """Fold one node call into metadata["memory"]["nodes"][name] (repeat calls: peaks max, deltas add up)."""
+    ledger = metadata.setdefault("memory", {"ceiling_mb": MEMORY_CEILING_MB or None, "nodes": {}})
+    entry = ledger["nodes"].get(name)
+    if entry is None:
+        ledger["nodes"][name] = {"calls": 1, **sample}
+        return
+    entry["calls"] += 1
+    for key, value in sample.items():
+        if key.endswith("_peak_mb") or key.endswith("_peak_kb"):
+            entry[key] = max(entry.get(key, 0), value)
+        elif key.endswith("_delta_mb") or key.endswith("_delta_kb") or key == "seconds":
+            entry[key] = round(entry.get(key, 0) + value, 3)
+        else:
+            entry[key] = value
+
+
+def _ceiling_exceeded() -> float:
+    """Current RSS if it is above the ceiling even after a collection, else 0."""
+    if not MEMORY_CEILING_MB or current_rss_mb() <= MEMORY_CEILING_MB:
+        return 0.0
+    gc.collect()
+    rss = current_rss_mb()
+    return rss if rss > MEMORY_CEILING_MB else 0.0
+
+
+# ==================== Node wrapper ====================
+
+def track(name: str, node: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]):
+    """Wrap a graph node with spilling, footprint accounting and the memory ceiling."""
+
+    @functools.wraps(node)
+    async def tracked(state: Dict[str, Any]) -> Dict[str, Any]:
+        over = _ceiling_exceeded()
+        if over:
+            metadata = state.get("metadata") or {}
+            _record(metadata, name, {"rss_mb": round(over, 1), "skipped": True})
+            logger.error(f"❌ 内存超出上限 ({over:.0f}MB > {MEMORY_CEILING_MB:.0f}MB)，跳过 {name}")
+            return {
+                **state,
+                "metadata": metadata,
+                "error": f"内存超出上限: {over:.0f}MB > {MEMORY_CEILING_MB:.0f}MB ({name} 未执行)",
+            }
+
+        rss_before = current_rss_mb()
+        tracing = _start_tracing()
+        traced_before = tracemalloc.get_traced_memory()[0] if tracing else 0
+        started = time.monotonic()
+        try:
+            result = await node(state)
+        finally:
+            traced_after, traced_peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+            if tracing:
+                _stop_tracing()
+
+        result = dict(result)
+        for field in SPILL_FIELDS:
+            old, new = state.get(field), result.get(field)
+            if new is not old:
+                discard(old)
+                result[field] = spill(new, field)
+
+        rss_after = current_rss_mb()
+        sample = {
+            "seconds": round(time.monotonic() - started, 3),
+            "rss_mb": round(rss_after, 1),
+            "rss_delta_mb": round(rss_after - rss_before, 1),
+            "rss_peak_mb": round(peak_rss_mb(), 1),
+        }
+        if tracing:
+            sample["traced_delta_kb"] = round((traced_after - traced_before) / 1024, 1)
+            sample["traced_peak_kb"] = round(max(0, traced_peak - traced_before) / 1024, 1)
+        metadata = result.get("metadata") or {}
+        result["metadata"] = metadata
+        _record(metadata, name, sample)
+        logger.info(
+            f"🧠 {name}: RSS={sample['rss_mb']}MB (Δ{sample['rss_delta_mb']}), "
+            f"峰值={sample['rss_peak_mb']}MB, tracemalloc峰值={sample.get('traced_peak_kb', '-')}KB"
+        )
+        return result
+
+    return tracked
@@ -1,17 +1,24 @@
 """
 Analyzer Node - Analyze top lane champion changes impact
-Simplified: no tool calls, direct LLM analysis to stay within 256MB RAM
+Direct LLM analysis by default (stays within 256MB RAM); with
+ANALYZER_USE_TOOLS=true the model may request websearch calls, which the
+tool executor runs before the analyzer is invoked again.
 """
-import json
 import logging
-import re
+import os
 
-from agents.llm import analyzer_llm
+from agents import budget
+from agents.llm import ainvoke_routed, analyzer_llm
+from agents.nodes.tool_executor import tool_budget_left
+from agents.prompt_codec import count_tokens
 from agents.state import WorkflowState
-from langchain_core.messages import HumanMessage, SystemMessage
+from agents.structured_output import parse_json, response_format
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
 logger = logging.getLogger(__name__)
 
+ANALYZER_USE_TOOLS = os.getenv("ANALYZER_USE_TOOLS", "false").lower() == "true"
+
 
 ANALYZER_PROMPT_TEMPLATE = """你是英雄联盟上单位置专业分析师。分析以下上单相关变更对游戏的影响。
 
@@ -56,14 +63,11 @@ ANALYZER_PROMPT_TEMPLATE = """你是英雄联盟上单位置专业分析师。
 
 
 async def analyzer_node(state: WorkflowState) -> WorkflowState:
-    """Analyzer Node: direct LLM analysis, no tool calls."""
+    """Analyzer Node: LLM analysis, optionally requesting tool calls while budget remains."""
     logger.info("=" * 60)
     logger.info("Node: Analyzer - 开始分析上单变更影响")
     logger.info("=" * 60)
 
-    # Free raw_content to reduce memory
-    state = {**state, "raw_content": ""}
-
     try:
         top_lane_changes = state.get("top_lane_changes", [])
 
@@ -75,40 +79,60 @@ async def analyzer_node(state: WorkflowState) -> WorkflowState:
 
         logger.info(f"收到 {len(top_lane_changes)} 个上单相关变更")
 
-        changes_summary = _format_changes_summary(top_lane_changes)
-
-        system_msg = SystemMessage(content="You are a League of Legends top lane expert analyst.")
-        prompt = ANALYZER_PROMPT_TEMPLATE.format(changes_summary=changes_summary)
-        user_msg = HumanMessage(content=prompt)
-        messages = [system_msg, user_msg]
-
-        model = analyzer_llm(temperature=0.7, bind_tools=False)
+        metadata = state.get("metadata") or {}
+        limit = budget.prompt_limit(metadata, "analyzer")
+        dropped = 0
+
+        # Resuming after tool calls: the conversation so far is in state["messages"]
+        messages = state.get("messages") or []
+        turn = sum(isinstance(m, AIMessage) for m in messages) + 1
+        if not messages:
+            system_msg = SystemMessage(content="You are a League of Legends top lane expert analyst.")
+            kept, prompt, _ = budget.fit_records(
+                top_lane_changes,
+                lambda changes: ANALYZER_PROMPT_TEMPLATE.format(changes_summary=_format_changes_summary(changes)),
+                limit - count_tokens(system_msg.content),
+            )
+            dropped = len(top_lane_changes) - len(kept)
+            messages = [system_msg, HumanMessage(content=prompt)]
+        estimated = sum(count_tokens(str(m.content)) for m in messages)
+
+        # Once the tool budget is spent, ask for the final answer without tools
+        use_tools = ANALYZER_USE_TOOLS and tool_budget_left(state)
+
+        def _parse(response):
+            # A tool-call turn has no JSON to validate yet
+            if use_tools and getattr(response, "tool_calls", None):
+                return None
+            return parse_json(response.content, "analyzer")
 
         logger.info("调用 LLM 进行影响分析...")
-        response = await model.ainvoke(messages)
+        response, data = await ainvoke_routed(
+            "analyzer",
+            messages,
+            lambda model: analyzer_llm(
+                temperature=0.7,
+                bind_tools=use_tools,
+                model=model,
+                # JSON mode would forbid the plain tool-call turns
+                response_format=None if use_tools else response_format("analyzer"),
+            ),
+            _parse,
+            metadata,
+        )
         logger.info("LLM 响应成功")
+        call = "analyzer" if turn == 1 else f"analyzer.turn{turn}"
+        budget.record(metadata, call, limit, estimated, response, dropped)
 
-        # Parse response
-        response_content = response.content
-        if not isinstance(response_content, str):
-            response_content = str(response_content)
-
-        try:
-            data = json.loads(response_content)
-        except json.JSONDecodeError:
-            logger.warning("响应不是纯 JSON，尝试提取...")
-            json_match = re.search(r'\{.*\}', response_content, re.DOTALL)
-            if json_match:
-                data = json.loads(json_match.group())
-            else:
-                raise ValueError("无法提取 JSON 分析结果")
+        if data is None:
+            logger.info(f"LLM 请求 {len(response.tool_calls)} 个工具调用")
+            return {**state, "messages": [*messages, response], "metadata": metadata}
 
         champion_analyses = data.get("champion_analyses", [])
         meta_overview = data.get("meta_overview", {})
 
         logger.info(f"✅ Analyzer 完成: 分析了 {len(champion_analyses)} 个英雄")
 
-        metadata = state.get("metadata") or {}
         if hasattr(response, "response_metadata") and response.response_metadata:
             usage = response.response_metadata.get("token_usage", {})
             if usage:
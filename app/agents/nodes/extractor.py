@@ -1,13 +1,18 @@
-import json
 import logging
-import re
+import os
 
-from agents.llm import extractor_llm
+from agents import budget, memory
+from agents.llm import ainvoke_routed, extractor_llm
+from agents.prompt_codec import count_tokens
 from agents.state import WorkflowState
+from agents.structured_output import parse_json, response_format
 from langchain_core.messages import HumanMessage, SystemMessage
 
 logger = logging.getLogger(__name__)
 
+# Long patches are extracted in up to this many budget-sized chunks
+EXTRACTOR_MAX_CHUNKS = int(os.getenv("EXTRACTOR_MAX_CHUNKS", "3"))
+
 EXTRACTOR_PROMPT_TEMPLATE = """你是英雄联盟上单位置专家。从以下更新公告中提取**仅与上单位置相关的变更**。
 
 关注点:
@@ -57,99 +62,83 @@ EXTRACTOR_PROMPT_TEMPLATE = """你是英雄联盟上单位置专家。从以下
 async def extractor_node(state: WorkflowState) -> WorkflowState:
     """
     Extractor Node: 提取上单相关变更
-    支持调用 WebSearch 工具获取额外信息
+
+    The full patch text is read from the (possibly spilled) state and sent in
+    chunks that fit the token budget, at most EXTRACTOR_MAX_CHUNKS calls;
+    changes found in later chunks are merged into the earlier ones.
     """
     logger.info("=" * 60)
     logger.info("Node: Extractor - 开始提取上单相关变更")
     logger.info("=" * 60)
 
     try:
-        # 1. 获取或创建消息列表
-        messages = state.get("messages", [])
-
-        # 如果messages为空，这是第一次调用，需要初始化
-        if not messages:
-            raw_content = state["raw_content"]
-            content = raw_content[:4000]  # Limit to reduce token count for 256MB containers
-
-            system_msg = SystemMessage(content=(
-                "You are a League of Legends top lane expert analyst.\n"
-                "If the patch notes lack detail about a champion's abilities or mechanics, "
-                "use the websearch tool to find more information.\n\n"
-                "Example: If you see \"剑姬 Q技能调整\" but no specifics, "
-                "search for \"剑姬 Q技能 破绽机制\"."
-            ))
-
-            prompt = EXTRACTOR_PROMPT_TEMPLATE.format(content=content)
-            user_msg = HumanMessage(content=prompt)
-            messages = [system_msg, user_msg]
-
-        # 2. 调用 LLM
-        model_with_tools = extractor_llm(temperature=0.3, bind_tools=False)
-
-        logger.info("调用 LLM 提取...")
-        response = await model_with_tools.ainvoke(messages)
-        logger.info("LLM 响应成功")
-
-        # 4. 解析 JSON
-        response_content = response.content
-
-        try:
-            data = json.loads(response_content)
-        except json.JSONDecodeError:
-            logger.warning("响应不是纯 JSON，尝试提取...")
-            json_match = re.search(r'\{.*\}', response_content, re.DOTALL)
-            if json_match:
-                data = json.loads(json_match.group())
-            else:
-                raise ValueError("无法提取 JSON")
-
-        # 5. 整合所有上单相关变更
-        top_lane_changes = []
-
-        # 英雄变更
-        for change in data.get("top_lane_changes", []):
-            top_lane_changes.append({
-                "type": "champion",
-                "champion": change.get("champion"),
-                "change_type": change.get("type"),
-                "relevance": change.get("relevance", "primary"),
-                "details": change.get("details", {})
-            })
-
-        # 装备变更
-        for item in data.get("item_changes", []):
-            top_lane_changes.append({
-                "type": "item",
-                "item": item.get("item"),
-                "change": item.get("change")
-            })
+        metadata = state.get("metadata") or {}
+        system_msg = SystemMessage(content=(
+            "You are a League of Legends top lane expert analyst.\n"
+            "If the patch notes lack detail about a champion's abilities or mechanics, "
+            "use the websearch tool to find more information.\n\n"
+            "Example: If you see \"剑姬 Q技能调整\" but no specifics, "
+            "search for \"剑姬 Q技能 破绽机制\"."
+        ))
+        overhead = count_tokens(system_msg.content) + count_tokens(EXTRACTOR_PROMPT_TEMPLATE.format(content=""))
+
+        # Chunks are sized to the first call's budget; later calls may get less from the run budget
+        raw_content = memory.load(state["raw_content"])
+        chunks = split_into_chunks(raw_content, max(1, budget.prompt_limit(metadata, "extractor") - overhead))
+        del raw_content
+        if len(chunks) > EXTRACTOR_MAX_CHUNKS:
+            logger.warning(f"公告分为 {len(chunks)} 段，仅提取前 {EXTRACTOR_MAX_CHUNKS} 段")
+
+        results = []
+        usage_total: dict = {}
+        for index, chunk in enumerate(chunks[:EXTRACTOR_MAX_CHUNKS]):
+            call = "extractor" if index == 0 else f"extractor.chunk{index + 1}"
+            limit = budget.prompt_limit(metadata, "extractor")
+            if index and limit <= overhead:
+                logger.warning(f"💰 Token 预算用尽，跳过剩余 {len(chunks) - index} 段")
+                break
+
+            # Cut the chunk to whatever the token budget leaves after the fixed prompt
+            content = budget.truncate_to_tokens(chunk, max(0, limit - overhead))
+            messages = [system_msg, HumanMessage(content=EXTRACTOR_PROMPT_TEMPLATE.format(content=content))]
+            estimated = sum(count_tokens(str(m.content)) for m in messages)
+
+            # 调用 LLM（按路由选择模型，输出校验失败时升级重试）
+            logger.info(f"调用 LLM 提取 ({index + 1}/{min(len(chunks), EXTRACTOR_MAX_CHUNKS)})...")
+            response, data = await ainvoke_routed(
+                "extractor",
+                messages,
+                lambda model: extractor_llm(
+                    temperature=0.3, bind_tools=False, model=model, response_format=response_format("extractor")
+                ),
+                lambda response: parse_json(response.content, "extractor"),
+                metadata,
+            )
+            logger.info("LLM 响应成功")
+            budget.record(metadata, call, limit, estimated, response)
+            results.append(data)
 
-        # 系统变更
-        for system in data.get("system_changes", []):
-            top_lane_changes.append({
-                "type": "system",
-                "category": system.get("category"),
-                "change": system.get("change")
-            })
+            usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+            for key, value in usage.items():
+                if isinstance(value, int):
+                    usage_total[key] = usage_total.get(key, 0) + value
 
+        top_lane_changes = merge_extracted(results)
         logger.info(f"✅ Extractor 完成: 提取到 {len(top_lane_changes)} 个上单相关变更")
 
         # 记录 token 使用
-        metadata = state.get("metadata", {})
-        if hasattr(response, "response_metadata"):
-            usage = response.response_metadata.get("token_usage", {})
-            metadata["extractor_tokens"] = usage
+        if usage_total:
+            metadata["extractor_tokens"] = usage_total
             logger.info(
-                f"Token 使用: 输入={usage.get('prompt_tokens', 0)}, "
-                f"输出={usage.get('completion_tokens', 0)}"
+                f"Token 使用: 输入={usage_total.get('prompt_tokens', 0)}, "
+                f"输出={usage_total.get('completion_tokens', 0)}"
             )
 
+        version = next((d.get("version") for d in results if d.get("version")), None)
         return {
             **state,
             "top_lane_changes": top_lane_changes,
-            "version": data.get("version", state.get("version")),
-            "raw_content": "",  # Free memory
+            "version": version or state.get("version"),
             "messages": [],     # Don't carry messages to next node
             "metadata": metadata
         }
@@ -162,3 +151,60 @@ async def extractor_node(state: WorkflowState) -> WorkflowState:
             **state,
             "error": f"Extractor 失败: {str(e)}"
         }
+
+
+def split_into_chunks(text: str, max_tokens: int) -> list[str]:
+    """Split patch text on line boundaries into chunks of at most `max_tokens` (a longer line is cut)."""
+    chunks: list[str] = []
+    lines: list[str] = []
+    tokens = 0
+    for line in text.splitlines(keepends=True):
+        line_tokens = count_tokens(line)
+        if lines and tokens + line_tokens > max_tokens:
+            chunks.append("".join(lines))
+            lines, tokens = [], 0
+        lines.append(line)
+        tokens += line_tokens
+    if lines:
+        chunks.append("".join(lines))
+    return chunks or [""]
+
+
+def merge_extracted(results: list[dict]) -> list[dict]:
+    """
+    整合所有上单相关变更 from one or more extractor replies. A champion seen in
+    several chunks keeps one entry with the details merged; items and system
+    changes are kept once per (name, change).
+    """
+    champions: dict = {}
+    items: list = []
+    systems: list = []
+
+    for data in results:
+        # 英雄变更
+        for change in data.get("top_lane_changes", []):
+            name = change.get("champion")
+            if name in champions:
+                champions[name]["details"].update(change.get("details") or {})
+                continue
+            champions[name] = {
+                "type": "champion",
+                "champion": name,
+                "change_type": change.get("type"),
+                "relevance": change.get("relevance", "primary"),
+                "details": dict(change.get("details") or {}),
+            }
+
+        # 装备变更
+        for item in data.get("item_changes", []):
+            entry = {"type": "item", "item": item.get("item"), "change": item.get("change")}
+            if entry not in items:
+                items.append(entry)
+
+        # 系统变更
+        for system in data.get("system_changes", []):
+            entry = {"type": "system", "category": system.get("category"), "change": system.get("change")}
+            if entry not in systems:
+                systems.append(entry)
+
+    return [*champions.values(), *items, *systems]
@@ -2,12 +2,14 @@
 LOL Top Lane Guide - Summarizer Node
 聚合 Analyzer 的分析结果，生成前端可用的完整报告
 """
-import json
 import logging
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional
 
-from agents.llm import summarizer_llm
+from agents import budget, memory
+from agents.llm import ainvoke_routed, summarizer_llm
+from agents.prompt_codec import compact_json, encode_table
 from agents.state import WorkflowState
+from agents.structured_output import parse_json, response_format
 from langchain_core.messages import HumanMessage
 
 logger = logging.getLogger(__name__)
@@ -30,7 +32,7 @@ async def summarizer_node(state: WorkflowState) -> WorkflowState:
     try:
         # 1. 提取输入数据
         top_lane_changes = state.get("top_lane_changes", [])
-        impact_analyses = state.get("impact_analyses", [])
+        impact_analyses = memory.load(state.get("impact_analyses")) or []
         version = state.get("version", "unknown")
 
         # 2. 验证Analyzer输出
@@ -57,11 +59,15 @@ async def summarizer_node(state: WorkflowState) -> WorkflowState:
                 }
             }
 
+        metadata = state.get("metadata") or {}
+
         # 4. Step 1: 聚合Tier List + Meta生态分析
         logger.info("Step 1: 聚合Tier List + Meta生态分析...")
         tier_and_meta_result = await _aggregate_tier_list_and_meta(
             champion_analyses,
-            analyzer_meta_overview
+            analyzer_meta_overview,
+            metadata=metadata,
+            top_lane_changes=top_lane_changes,
         )
 
         # 5. Step 2: 增强出装推荐 + 生成Counter Matrix
@@ -69,7 +75,8 @@ async def summarizer_node(state: WorkflowState) -> WorkflowState:
         builds_and_counters_result = await _enhance_builds_and_counters(
             champion_analyses,
             tier_and_meta_result["tier_list"],
-            top_lane_changes
+            top_lane_changes,
+            metadata=metadata,
         )
 
         # 6. 整合最终报告
@@ -84,7 +91,6 @@ async def summarizer_node(state: WorkflowState) -> WorkflowState:
         }
 
         # 7. 记录Token使用
-        metadata = state.get("metadata", {})
         metadata["summarizer_tokens"] = {
             "step1": tier_and_meta_result.get("tokens", {}),
             "step2": builds_and_counters_result.get("tokens", {})
@@ -110,81 +116,135 @@ async def summarizer_node(state: WorkflowState) -> WorkflowState:
 
 # ========== Helper Functions ==========
 
+# Only the analyzer fields each step reads; everything else is dropped from the prompt
+STEP1_COLUMNS = [
+    "champion",
+    "change_type",
+    "meta_impact.tier_prediction",
+    "meta_impact.tier_change",
+    "overall_assessment.strength_score",
+    "overall_assessment.win_rate_trend",
+    "gameplay_changes.laning_phase",
+    "gameplay_changes.teamfight_role",
+    "overall_assessment.reasoning",
+]
+STEP2_COLUMNS = [
+    "champion",
+    "change_type",
+    "gameplay_changes.laning_phase",
+    "gameplay_changes.teamfight_role",
+    "gameplay_changes.build_adjustment",
+    "meta_impact.synergy_items",
+    "meta_impact.counter_changes",
+]
+
+
+def _tier_names(tier_list: Dict) -> Dict[str, List[str]]:
+    """Step 2 only needs which tier each champion is in, not Step 1's reasons/tags."""
+    return {
+        tier: [c.get("champion", "") if isinstance(c, dict) else str(c) for c in champs]
+        for tier, champs in (tier_list or {}).items()
+        if isinstance(champs, list)
+    }
+
+
+def _relevance_rank(top_lane_changes: Optional[List[Dict]]) -> Callable[[Dict], int]:
+    """Drop order for analyses under budget pressure: secondary-relevance champions first."""
+    secondary = {
+        c.get("champion") for c in top_lane_changes or []
+        if c.get("type") == "champion" and c.get("relevance") == "secondary"
+    }
+    return lambda analysis: 1 if analysis.get("champion") in secondary else 0
+
+
 async def _aggregate_tier_list_and_meta(
     champion_analyses: List[Dict],
-    analyzer_meta_overview: Dict
+    analyzer_meta_overview: Dict,
+    metadata: Optional[Dict] = None,
+    top_lane_changes: Optional[List[Dict]] = None,
 ) -> Dict:
     """
     Step 1: 聚合Tier List + Meta生态分析
 
     ⚠️ 不是从头生成，而是聚合Analyzer已有的tier_prediction
     """
-    prompt = STEP1_AGGREGATE_TIER_LIST_PROMPT.format(
-        champion_analyses=json.dumps(champion_analyses, ensure_ascii=False, indent=2),
-        analyzer_meta_overview=json.dumps(analyzer_meta_overview, ensure_ascii=False, indent=2)
+    metadata = metadata if metadata is not None else {}
+    limit = budget.prompt_limit(metadata, "summarizer.step1")
+    kept, prompt, prompt_tokens = budget.fit_records(
+        champion_analyses,
+        lambda analyses: STEP1_AGGREGATE_TIER_LIST_PROMPT.format(
+            champion_analyses=encode_table(analyses, STEP1_COLUMNS),
+            analyzer_meta_overview=compact_json(analyzer_meta_overview)
+        ),
+        limit,
+        rank=_relevance_rank(top_lane_changes),
     )
 
-    llm = summarizer_llm(temperature=0.4)
-    response = await llm.ainvoke([HumanMessage(content=prompt)])
-
     try:
-        content = response.content
-        if not isinstance(content, str):
-            content = str(content)
-        # Try direct parse, then extract JSON block
-        try:
-            result = json.loads(content)
-        except json.JSONDecodeError:
-            import re
-            match = re.search(r'\{.*\}', content, re.DOTALL)
-            if match:
-                result = json.loads(match.group())
-            else:
-                raise
-        result["tokens"] = response.response_metadata.get("token_usage", {})
-        return result
-    except (json.JSONDecodeError, ValueError) as e:
-        logger.error(f"Failed to parse Summarizer Step 1 response:\n{response.content[:500]}")
+        response, result = await ainvoke_routed(
+            "summarizer.step1",
+            [HumanMessage(content=prompt)],
+            lambda model: summarizer_llm(
+                temperature=0.4, model=model, response_format=response_format("summarizer.step1")
+            ),
+            lambda response: parse_json(response.content, "summarizer.step1"),
+            metadata,
+        )
+    except ValueError as e:
         raise ValueError(f"Failed to decode JSON in _aggregate_tier_list_and_meta: {e}")
+    budget.record(metadata, "summarizer.step1", limit, prompt_tokens, response, len(champion_analyses) - len(kept))
+
+    result["tokens"] = response.response_metadata.get("token_usage", {})
+    result["tokens"]["estimated_prompt_tokens"] = prompt_tokens
+    return result
 
 
 async def _enhance_builds_and_counters(
     champion_analyses: List[Dict],
     tier_list: Dict,
-    top_lane_changes: List[Dict]
+    top_lane_changes: List[Dict],
+    metadata: Optional[Dict] = None,
 ) -> Dict:
     """
     Step 2: 增强出装推荐 + 生成Counter Matrix
 
     ⚠️ 基于Analyzer的synergy_items生成完整出装，基于counter_changes生成矩阵
     """
-    prompt = STEP2_ENHANCE_BUILDS_AND_COUNTERS_PROMPT.format(
-        champion_analyses=json.dumps(champion_analyses, ensure_ascii=False, indent=2),
-        tier_list=json.dumps(tier_list, ensure_ascii=False, indent=2),
-        top_lane_changes=json.dumps(top_lane_changes, ensure_ascii=False, indent=2)
-    )
+    metadata = metadata if metadata is not None else {}
+    tier_names = compact_json(_tier_names(tier_list))
+
+    def _render(analyses: List[Dict]) -> str:
+        # Raw changes of dropped champions are dropped with them
+        names = {a.get("champion") for a in analyses}
+        changes = [c for c in top_lane_changes or [] if c.get("type") != "champion" or c.get("champion") in names]
+        return STEP2_ENHANCE_BUILDS_AND_COUNTERS_PROMPT.format(
+            champion_analyses=encode_table(analyses, STEP2_COLUMNS),
+            tier_list=tier_names,
+            top_lane_changes=compact_json(changes)
+        )
 
-    llm = summarizer_llm(temperature=0.5)  # 适中创造性（出装+克制）
-    response = await llm.ainvoke([HumanMessage(content=prompt)])
+    limit = budget.prompt_limit(metadata, "summarizer.step2")
+    kept, prompt, prompt_tokens = budget.fit_records(
+        champion_analyses, _render, limit, rank=_relevance_rank(top_lane_changes)
+    )
 
     try:
-        content = response.content
-        if not isinstance(content, str):
-            content = str(content)
-        try:
-            result = json.loads(content)
-        except json.JSONDecodeError:
-            import re
-            match = re.search(r'\{.*\}', content, re.DOTALL)
-            if match:
-                result = json.loads(match.group())
-            else:
-                raise
-        result["tokens"] = response.response_metadata.get("token_usage", {})
-        return result
-    except (json.JSONDecodeError, ValueError) as e:
-        logger.error(f"Failed to parse Summarizer Step 2 response:\n{response.content[:500]}")
+        response, result = await ainvoke_routed(
+            "summarizer.step2",
+            [HumanMessage(content=prompt)],
+            lambda model: summarizer_llm(  # 适中创造性（出装+克制）
+                temperature=0.5, model=model, response_format=response_format("summarizer.step2")
+            ),
+            lambda response: parse_json(response.content, "summarizer.step2"),
+            metadata,
+        )
+    except ValueError as e:
         raise ValueError(f"Failed to decode JSON in _enhance_builds_and_counters: {e}")
+    budget.record(metadata, "summarizer.step2", limit, prompt_tokens, response, len(champion_analyses) - len(kept))
+
+    result["tokens"] = response.response_metadata.get("token_usage", {})
+    result["tokens"]["estimated_prompt_tokens"] = prompt_tokens
+    return result
 
 
 # ========== Prompt Templates ==========
@@ -194,7 +254,7 @@ STEP1_AGGREGATE_TIER_LIST_PROMPT = """
 
 任务：基于Analyzer已经提供的per-champion分析，聚合生成Tier List和Meta生态分析。
 
-输入数据（来自Analyzer）:
+输入数据（来自Analyzer；表格：首行为列名，每行一个英雄，字段以|分隔，列表以、分隔）:
 {champion_analyses}
 
 Analyzer的meta_overview:
@@ -203,9 +263,8 @@ Analyzer的meta_overview:
 注意：每个champion已经包含：
 - tier_prediction: Analyzer预测的tier (S/A/B/C/D)
 - strength_score: 强度评分 (1-10)
-- counter_changes: 本版本克制关系变化
-- synergy_items: 推荐装备
-- gameplay_changes: 对线/团战/出装变化
+- laning_phase / teamfight_role: 对线/团战变化
+- reasoning: 分析理由
 
 输出JSON格式:
 {{
@@ -258,7 +317,7 @@ Tier聚合规则:
    - B层: score 4-5
    - C层: score 2-3
    - D层: score <= 1
-3. 为每个英雄添加tags（从gameplay_changes推断，如"坦克", "战士", "单带", "团战"等）
+3. 为每个英雄添加tags（从laning_phase/teamfight_role推断，如"坦克", "战士", "单带", "团战"等）
 4. 合并Analyzer的meta_overview，生成更全面的meta_ecosystem
 
 只返回JSON，不要其他文字。
@@ -272,9 +331,14 @@ STEP2_ENHANCE_BUILDS_AND_COUNTERS_PROMPT = """
 任务2: 生成克制关系矩阵（基于Analyzer的counter_changes）
 
 输入数据:
-{champion_analyses}  # Analyzer已提供的分析
-{tier_list}          # Step 1生成的tier_list
-{top_lane_changes}   # Extractor提取的原始变更（用于key_highlights）
+Analyzer已提供的分析（表格：首行为列名，每行一个英雄，字段以|分隔，列表以、分隔）:
+{champion_analyses}
+
+Step 1生成的tier_list（tier -> 英雄）:
+{tier_list}
+
+Extractor提取的原始变更（用于key_highlights）:
+{top_lane_changes}
 
 输出JSON:
 {{
@@ -347,7 +411,7 @@ STEP2_ENHANCE_BUILDS_AND_COUNTERS_PROMPT = """
 }}
 
 要求:
-1. **复用Analyzer的gameplay_changes**（不要重新生成，直接使用）
+1. **复用Analyzer的laning_phase/teamfight_role/build_adjustment作为gameplay_impact**（不要重新生成，直接使用）
 2. **基于synergy_items生成2-3套完整出装**:
    - 每套有明确的name, core_items, boots, situational
    - 每套有详细reason（为什么这样出，配合本版本变更）
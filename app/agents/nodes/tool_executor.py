@@ -0,0 +1,82 @@
+"""
+Tool Executor Node - run every tool call from one LLM turn concurrently
+
+All calls of a turn are awaited together, so the turn costs as long as the
+slowest call. A per-run budget caps the number of calls (MAX_TOOL_CALLS,
+tracked in `tool_call_count`) and total tool time (TOOL_LATENCY_BUDGET_SECONDS,
+tracked in metadata["tool_seconds"]). Calls over budget still get a
+ToolMessage so the conversation stays valid for the next LLM turn.
+"""
+import asyncio
+import logging
+import os
+import time
+
+from agents.state import WorkflowState
+from agents.tools import websearch
+from langchain_core.messages import ToolMessage
+
+logger = logging.getLogger(__name__)
+
+MAX_TOOL_CALLS = int(os.getenv("MAX_TOOL_CALLS", "5"))
+TOOL_CALL_TIMEOUT_SECONDS = float(os.getenv("TOOL_CALL_TIMEOUT_SECONDS", "15"))
+TOOL_LATENCY_BUDGET_SECONDS = float(os.getenv("TOOL_LATENCY_BUDGET_SECONDS", "30"))
+
+TOOLS = {t.name: t for t in (websearch,)}
+
+
+def tool_budget_left(state: WorkflowState) -> bool:
+    """Whether the run may still call tools: both the call count and the latency budget remain."""
+    spent = (state.get("metadata") or {}).get("tool_seconds", 0.0)
+    return state.get("tool_call_count", 0) < MAX_TOOL_CALLS and spent < TOOL_LATENCY_BUDGET_SECONDS
+
+
+async def _run_tool_call(call: dict, timeout: float) -> str:
+    tool = TOOLS.get(call["name"])
+    if tool is None:
+        return f"Tool error: unknown tool {call['name']}"
+    try:
+        result = await asyncio.wait_for(tool.ainvoke(call.get("args") or {}), timeout=timeout)
+        return result if isinstance(result, str) else str(result)
+    except asyncio.TimeoutError:
+        logger.warning(f"⏱️ Tool {call['name']} 超时 ({timeout:.1f}s)")
+        return f"Tool error: {call['name']} timed out"
+    except Exception as e:
+        logger.error(f"Tool {call['name']} 失败: {e}")
+        return f"Tool error: {e}"
+
+
+async def tool_executor_node(state: WorkflowState) -> WorkflowState:
+    """Tool Executor Node: answer the last message's tool calls in one batch."""
+    messages = state.get("messages") or []
+    calls = list(getattr(messages[-1], "tool_calls", None) or []) if messages else []
+    used = state.get("tool_call_count", 0)
+    metadata = dict(state.get("metadata") or {})
+    spent = metadata.get("tool_seconds", 0.0)
+
+    remaining_time = TOOL_LATENCY_BUDGET_SECONDS - spent
+    allowed = MAX_TOOL_CALLS - used if tool_budget_left(state) else 0
+    run, skipped = calls[:allowed], calls[allowed:]
+
+    logger.info(f"Node: Tools - 并行执行 {len(run)} 个工具调用（跳过 {len(skipped)} 个，已用 {used}/{MAX_TOOL_CALLS}）")
+
+    started = time.monotonic()
+    timeout = min(TOOL_CALL_TIMEOUT_SECONDS, max(remaining_time, 0.0))
+    outputs = await asyncio.gather(*(_run_tool_call(call, timeout) for call in run))
+    metadata["tool_seconds"] = spent + (time.monotonic() - started)
+
+    tool_messages = [
+        ToolMessage(content=output, tool_call_id=call["id"], name=call["name"])
+        for call, output in zip(run, outputs)
+    ]
+    tool_messages += [
+        ToolMessage(content="Tool call skipped: tool budget exhausted", tool_call_id=call["id"], name=call["name"])
+        for call in skipped
+    ]
+
+    return {
+        **state,
+        "messages": [*messages, *tool_messages],
+        "tool_call_count": used + len(run),
+        "metadata": metadata,
+    }
@@ -0,0 +1,71 @@
+"""
+Compact prompt encodings and local token counting.
+
+LLM inputs are serialized without indentation, and lists of same-shaped
+records become a table (header once, one `|`-separated row per record) so
+keys are not repeated for every champion.
+"""
+import json
+import re
+from functools import lru_cache
+from typing import Any, Optional
+
+_CJK = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]")
+
+
+def compact_json(value: Any) -> str:
+    """Minified JSON (no indentation or spaces after separators)."""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _get(record: dict, path: str) -> Any:
+    for key in path.split("."):
+        if not isinstance(record, dict):
+            return None
+        record = record.get(key)
+    return record
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        text = "、".join(_cell(v) for v in value)
+    elif isinstance(value, dict):
+        text = compact_json(value)
+    else:
+        text = str(value)
+    return text.replace("|", "/").replace("\n", " ").strip()
+
+
+def encode_table(records: list[dict], columns: list[str]) -> str:
+    """
+    Encode records as a header row plus one row per record. Columns are
+    dotted paths into each record (e.g. "meta_impact.tier_prediction"); the
+    header uses the last path segment.
+    """
+    lines = ["|".join(column.rsplit(".", 1)[-1] for column in columns)]
+    for record in records:
+        lines.append("|".join(_cell(_get(record, column)) for column in columns))
+    return "\n".join(lines)
+
+
+@lru_cache(maxsize=1)
+def _encoder() -> Optional[Any]:
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None  # tiktoken missing or its encoding file cannot be downloaded
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count tokens locally: tiktoken when available, otherwise an estimate of
+    one token per CJK character plus one per four other characters.
+    """
+    encoder = _encoder()
+    if encoder is not None:
+        return len(encoder.encode(text))
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
@@ -4,14 +4,14 @@ from typing import Any, Dict, List, Optional, TypedDict
 
 class WorkflowState(TypedDict):
     """Main workflow state shared across all nodes."""
-    # Input
+    # Input — large values are agents.memory.SpillRef handles; read them with memory.load()
     raw_content: str
     version: str
 
     # Extractor output
     top_lane_changes: Optional[List[Dict[str, Any]]]
 
-    # Analyzer output
+    # Analyzer output (may be spilled, like raw_content)
     impact_analyses: Optional[List[Dict[str, Any]]]
 
     # Summarizer output
@@ -0,0 +1,139 @@
+"""
+Structured LLM output: JSON mode, per-task schemas and a repair parser.
+
+Calls request JSON output via `response_format` (LLM_RESPONSE_FORMAT:
+"json_object", "json_schema" or "none"). Responses are parsed with
+json.loads; if that fails, one linear scan extracts the first balanced
+object, which skips code fences and surrounding prose and drops trailing
+commas. The result is validated against the task's schema. Failures raise
+OutputParseError (a ValueError), so the router retries only that call.
+"""
+import json
+import os
+from typing import Any, Optional
+
+LLM_RESPONSE_FORMAT = os.getenv("LLM_RESPONSE_FORMAT", "json_object")
+
+# task -> {key: (type, required)}; optional keys may be missing or null
+SCHEMAS: dict[str, dict[str, tuple[type, bool]]] = {
+    "extractor": {
+        "version": (str, False),
+        "top_lane_changes": (list, True),
+        "item_changes": (list, False),
+        "system_changes": (list, False),
+    },
+    "analyzer": {
+        "champion_analyses": (list, True),
+        "meta_overview": (dict, False),
+    },
+    "summarizer.step1": {
+        "tier_list": (dict, True),
+        "meta_ecosystem": (dict, False),
+        "executive_summary": (str, False),
+    },
+    "summarizer.step2": {
+        "champion_details": (list, False),
+        "counter_matrix": (dict, False),
+        "key_highlights": (list, False),
+    },
+}
+
+_JSON_TYPES = {list: "array", dict: "object", str: "string", bool: "boolean"}
+
+
+class OutputParseError(ValueError):
+    """LLM output is not valid JSON for its task, even after repair."""
+
+
+def json_schema(task: str) -> dict:
+    """JSON Schema for a task's top-level object."""
+    fields = SCHEMAS.get(task, {})
+    return {
+        "type": "object",
+        "properties": {key: {"type": _JSON_TYPES[typ]} for key, (typ, _) in fields.items()},
+        "required": [key for key, (_, required) in fields.items() if required],
+    }
+
+
+def response_format(task: str) -> Optional[dict]:
+    """`response_format` request parameter for a task, or None when disabled."""
+    if LLM_RESPONSE_FORMAT == "json_schema" and task in SCHEMAS:
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": task.replace(".", "_"), "schema": json_schema(task)},
+        }
+    if LLM_RESPONSE_FORMAT in ("json_object", "json_schema"):
+        return {"type": "json_object"}
+    return None
+
+
+def repair_json(text: str) -> str:
+    """
+    Return the first balanced JSON object in `text` with trailing commas
+    removed. Single pass; string contents are copied untouched.
+    """
+    start = text.find("{")
+    if start < 0:
+        raise OutputParseError("no JSON object in response")
+
+    out: list[str] = []
+    depth = 0
+    in_string = escaped = pending_comma = False
+    for index in range(start, len(text)):
+        ch = text[index]
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == ",":
+            pending_comma = True  # emitted only if another value follows
+        elif ch in "}]":
+            pending_comma = False
+            out.append(ch)
+            depth -= 1
+            if depth == 0:
+                return "".join(out)
+        elif ch in " \t\r\n":
+            out.append(ch)
+        else:
+            if pending_comma:
+                out.append(",")
+                pending_comma = False
+            if ch in "{[":
+                depth += 1
+            elif ch == '"':
+                in_string = True
+            out.append(ch)
+    raise OutputParseError("unterminated JSON object (response truncated?)")
+
+
+def validate(data: Any, task: Optional[str]) -> dict:
+    """Check `data` against the task's schema and return it."""
+    if not isinstance(data, dict):
+        raise OutputParseError("expected a JSON object")
+    for key, (typ, required) in SCHEMAS.get(task, {}).items():
+        value = data.get(key)
+        if value is None:
+            if required:
+                raise OutputParseError(f"missing required field {key!r}")
+        elif not isinstance(value, typ):
+            raise OutputParseError(f"field {key!r} should be {_JSON_TYPES[typ]}")
+    return data
+
+
+def parse_json(content: Any, task: Optional[str] = None) -> dict:
+    """Parse and validate one LLM response body for `task`."""
+    if not isinstance(content, str):
+        content = str(content)
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        try:
+            data = json.loads(repair_json(content), strict=False)
+        except json.JSONDecodeError as e:
+            raise OutputParseError(f"invalid JSON after repair: {e}") from e
+    return validate(data, task)
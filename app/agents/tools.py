@@ -1,14 +1,145 @@
+"""
+Agent tools.
 
+websearch is async and shares one pooled HTTP client for Tavily. Results are
+cached (TTL + LRU) by normalized query, and concurrent identical queries share
+a single in-flight request. WEBSEARCH_BACKEND=stub returns canned results for
+offline runs.
+"""
+import asyncio
 import logging
 import os
+import time
+from collections import OrderedDict
+from typing import Optional
 
+import httpx
 from langchain.tools import tool
 
 logger = logging.getLogger(__name__)
 
+TAVILY_API_URL = "https://api.tavily.com"
+WEBSEARCH_BACKEND = os.getenv("WEBSEARCH_BACKEND", "tavily")  # "tavily" or "stub"
+WEBSEARCH_CACHE_TTL_SECONDS = float(os.getenv("WEBSEARCH_CACHE_TTL_SECONDS", "3600"))
+WEBSEARCH_CACHE_SIZE = int(os.getenv("WEBSEARCH_CACHE_SIZE", "256"))
+
+
+class SearchCache:
+    """LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int = WEBSEARCH_CACHE_SIZE, ttl: float = WEBSEARCH_CACHE_TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: str) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+_cache = SearchCache()
+_inflight: dict[str, asyncio.Task] = {}
+# One pooled client per event loop (connections cannot cross loops)
+_http_clients: dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+_closing: set[asyncio.Task] = set()
+
+
+def normalize_query(query: str) -> str:
+    """Cache key for a query: case- and whitespace-insensitive."""
+    return " ".join(query.split()).lower()
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """The running loop's pooled client; clients left behind by closed loops are closed in the background."""
+    loop = asyncio.get_running_loop()
+    for stale in [other for other in _http_clients if other.is_closed()]:
+        task = loop.create_task(_http_clients.pop(stale).aclose())
+        _closing.add(task)
+        task.add_done_callback(_closing.discard)
+    client = _http_clients.get(loop)
+    if client is None or client.is_closed:
+        client = _http_clients[loop] = httpx.AsyncClient(base_url=TAVILY_API_URL, timeout=30.0)
+    return client
+
+
+async def aclose_search_client() -> None:
+    """Close the running loop's client and any left behind by loops that have since closed."""
+    loop = asyncio.get_running_loop()
+    for owner in [other for other in _http_clients if other is loop or other.is_closed()]:
+        await _http_clients.pop(owner).aclose()
+
+
+async def _tavily_search(query: str) -> str:
+    tavily_api_key = os.getenv("TAVILY_API_KEY")
+    if not tavily_api_key:
+        raise RuntimeError("TAVILY_API_KEY not configured. Cannot perform web search.")
+
+    resp = await _get_http_client().post("/search", json={
+        "api_key": tavily_api_key,
+        "query": query,
+        "max_results": 3,
+        "search_depth": "basic",
+        "include_raw_content": False,
+    })
+    resp.raise_for_status()
+
+    # 格式化搜索结果
+    results = []
+    for result in resp.json().get("results", []):
+        results.append(f"标题: {result.get('title', 'N/A')}\n内容: {result.get('content', 'N/A')}\n")
+
+    return "\n---\n".join(results) if results else "No results found."
+
+
+async def _stub_search(query: str) -> str:
+    """Offline backend: deterministic canned result, no network."""
+    return f"标题: [stub] {query}\n内容: Offline search stub — no live results for this query.\n"
+
+
+async def search(query: str) -> str:
+    """Run a web search through the cache and in-flight dedup. Errors are raised and not cached."""
+    key = normalize_query(query)
+    cached = _cache.get(key)
+    if cached is not None:
+        logger.info(f"🔎 WebSearch 缓存命中: {key}")
+        return cached
+
+    task = _inflight.get(key)
+    if task is None:
+        backend = _stub_search if WEBSEARCH_BACKEND == "stub" else _tavily_search
+
+        async def _lookup() -> str:
+            try:
+                result = await backend(query)
+                _cache.put(key, result)
+                return result
+            finally:
+                _inflight.pop(key, None)
+
+        task = asyncio.ensure_future(_lookup())
+        _inflight[key] = task
+    # shield: one caller being cancelled must not cancel the shared request
+    return await asyncio.shield(task)
+
 
 @tool
-def websearch(query: str) -> str:
+async def websearch(query: str) -> str:
     """Search the web for League of Legends patch analysis and champion information.
 
     Use this tool when you need additional information about:
@@ -24,27 +155,7 @@ def websearch(query: str) -> str:
         Search results as a string
     """
     try:
-        from tavily import TavilyClient
-
-        tavily_api_key = os.getenv("TAVILY_API_KEY")
-        if not tavily_api_key:
-            return "Error: TAVILY_API_KEY not configured. Cannot perform web search."
-
-        tavily_client = TavilyClient(api_key=tavily_api_key)
-        response = tavily_client.search(
-            query,
-            max_results=3,
-            search_depth="basic",
-            include_raw_content=False
-        )
-
-        # 格式化搜索结果
-        results = []
-        for result in response.get('results', []):
-            results.append(f"标题: {result.get('title', 'N/A')}\n内容: {result.get('content', 'N/A')}\n")
-
-        return "\n---\n".join(results) if results else "No results found."
-
+        return await search(query)
     except Exception as e:
         logger.error(f"WebSearch 失败: {str(e)}")
         return f"Search error: {str(e)}"
@@ -1,13 +1,16 @@
 """
 LOL Top Lane Guide - Main Workflow
-Linear LangGraph pipeline: Extractor -> Analyzer -> Summarizer
+LangGraph pipeline: Extractor -> Analyzer (<-> Tools) -> Summarizer
 """
 import logging
+from functools import lru_cache
 from typing import Any, Dict
 
+from agents import memory
 from agents.nodes.analyzer import analyzer_node
 from agents.nodes.extractor import extractor_node
 from agents.nodes.summarizer import summarizer_node
+from agents.nodes.tool_executor import tool_budget_left, tool_executor_node
 from agents.state import WorkflowState
 from dotenv import load_dotenv
 from langgraph.graph import END, StateGraph
@@ -18,9 +21,9 @@ logger = logging.getLogger(__name__)
 
 
 def build_initial_state(raw_content: str, version: str) -> WorkflowState:
-    """Build a fresh workflow state for each execution."""
+    """Build a fresh workflow state for each execution (a long patch text is spilled to disk)."""
     return {
-        "raw_content": raw_content,
+        "raw_content": memory.spill(raw_content, "raw_content"),
         "version": version,
         "top_lane_changes": None,
         "impact_analyses": None,
@@ -32,31 +35,67 @@ def build_initial_state(raw_content: str, version: str) -> WorkflowState:
     }
 
 
+def should_continue(state: WorkflowState) -> str:
+    """Route after the analyzer: run requested tools while the budget allows, else summarize."""
+    if not tool_budget_left(state):
+        return "summarizer"
+    messages = state.get("messages") or []
+    if messages and getattr(messages[-1], "tool_calls", None):
+        return "tools"
+    return "summarizer"
+
+
+@lru_cache(maxsize=1)
 def create_workflow():
     """
-    Create a linear pipeline: extractor -> analyzer -> summarizer
+    Create the pipeline: extractor -> analyzer -> summarizer
 
-    No tool call loop — keeps memory usage low for constrained containers.
+    The analyzer loops through the tools node only when it requests tool calls
+    (ANALYZER_USE_TOOLS); by default the path is linear to keep memory low.
+    Compiled once and shared: the graph holds no per-run state. Every node runs
+    through memory.track (spilling, footprint accounting, memory ceiling).
     """
     workflow = StateGraph(WorkflowState)
 
-    workflow.add_node("extractor", extractor_node)
-    workflow.add_node("analyzer", analyzer_node)
-    workflow.add_node("summarizer", summarizer_node)
+    workflow.add_node("extractor", memory.track("extractor", extractor_node))
+    workflow.add_node("analyzer", memory.track("analyzer", analyzer_node))
+    workflow.add_node("tools", memory.track("tools", tool_executor_node))
+    workflow.add_node("summarizer", memory.track("summarizer", summarizer_node))
 
     workflow.set_entry_point("extractor")
     workflow.add_edge("extractor", "analyzer")
-    workflow.add_edge("analyzer", "summarizer")
+    workflow.add_conditional_edges("analyzer", should_continue, {"tools": "tools", "summarizer": "summarizer"})
+    workflow.add_edge("tools", "analyzer")
     workflow.add_edge("summarizer", END)
 
     return workflow.compile()
 
 
+@lru_cache(maxsize=1)
+def create_analysis_workflow():
+    """
+    Analyzer (<-> Tools) only, ending before the summarizer. Used to re-analyse
+    a subset of changes that is merged with earlier analyses before summarizing.
+    """
+    workflow = StateGraph(WorkflowState)
+
+    workflow.add_node("analyzer", memory.track("analyzer", analyzer_node))
+    workflow.add_node("tools", memory.track("tools", tool_executor_node))
+
+    workflow.set_entry_point("analyzer")
+    workflow.add_conditional_edges("analyzer", should_continue, {"tools": "tools", "summarizer": END})
+    workflow.add_edge("tools", "analyzer")
+
+    return workflow.compile()
+
+
 async def run_workflow(raw_content: str, version: str = "unknown") -> Dict[str, Any]:
     """Run the full analysis pipeline."""
     graph = create_workflow()
-    initial_state = build_initial_state(raw_content, version)
-    result = await graph.ainvoke(initial_state)
+    # Spill files are removed on exit even if ainvoke raises or the job is cancelled
+    with memory.run_scope():
+        initial_state = build_initial_state(raw_content, version)
+        result = memory.materialize(await graph.ainvoke(initial_state))
 
     if result.get("error"):
         raise ValueError(result["error"])
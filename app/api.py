@@ -2,21 +2,41 @@
 LOL Top Lane Guide - FastAPI REST API
 提供版本更新分析的 REST API 接口
 """
+import asyncio
+import codecs
+import copy
+import csv
+import hmac
+import inspect
+import io
 import json
 import logging
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+from collections import OrderedDict
 from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, Optional
-
-from agents.workflow import run_workflow
+from typing import Any, Dict, List, Optional
+
+import history
+import jobs
+import leader
+import outbox
+import preview
+from agents import memory
 from crawlers.lol_official import LOLOfficialCrawler
-from fastapi import BackgroundTasks, FastAPI, HTTPException, Query
+from fastapi import BackgroundTasks, Depends, FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
+from report_diff import diff_summary_reports
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,13 +46,44 @@ CACHE_DIR = Path("data/cache")
 CACHE_DIR.mkdir(parents=True, exist_ok=True)
 VERSIONS_INDEX = CACHE_DIR / "versions.json"
 MAX_CACHED_VERSIONS = 5
+MAX_BATCH_VERSIONS = 20
+
+# Subscriber import/export endpoints are disabled unless ADMIN_TOKEN is set
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+SUBSCRIBER_IMPORT_BATCH_SIZE = int(os.getenv("SUBSCRIBER_IMPORT_BATCH_SIZE", "1000"))
+
+# Startup warmup; the "latest" version it resolves is trusted for LATEST_VERSION_TTL_SECONDS
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", "30"))
+LATEST_VERSION_TTL_SECONDS = float(os.getenv("LATEST_VERSION_TTL_SECONDS", "300"))
+
+# Top-level report sections; summary_report is also split one level deeper
+REPORT_SECTIONS = ("version", "top_lane_changes", "impact_analyses", "summary_report", "metadata")
+_FIELD_PATTERN = re.compile(r"^[A-Za-z_]+(\.[A-Za-z_]+)?$")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
-    from scheduler import start_scheduler, stop_scheduler
+    from scheduler import leader_elector, start_scheduler, stop_scheduler
+    await leader_elector.start()
     start_scheduler()
+    # Spill files left by a process that was killed mid-run
+    memory.sweep_spill_dir()
+    await job_pool.start()
+    # Warm up in the background: /health answers at once, /health/ready once warm
+    warmup_task = asyncio.create_task(warm_up()) if WARMUP_ENABLED else None
+    if warmup_task is None:
+        readiness["ready"] = True
     yield
+    if warmup_task is not None:
+        warmup_task.cancel()
+    await job_pool.stop()
+    # Only close what was opened: importing the LLM stack just to close it would undo lazy loading
+    if "agents.tools" in sys.modules:
+        await sys.modules["agents.tools"].aclose_search_client()
+    if "agents.llm" in sys.modules:
+        await sys.modules["agents.llm"].aclose_llm_clients()
     stop_scheduler()
+    await leader_elector.stop()
 
 
 # 创建 FastAPI 应用
@@ -73,14 +124,54 @@ class SubscribeRequest(BaseModel):
     email: str
 
 
+class PreviewRequest(BaseModel):
+    """Preview (PBE) notes for an upcoming version: inline text or a URL to fetch."""
+    version: str
+    raw_content: Optional[str] = None
+    url: Optional[str] = None
+
+
+class BatchVersionsRequest(BaseModel):
+    """Bulk version fetch: versions plus an optional fields= style projection."""
+    versions: List[str]
+    fields: Optional[str] = None
+
+
+# ==================== Cache File Memo ====================
+
+# Parsed cache files, reused while the file's (mtime, size) is unchanged; the lock
+# guards the OrderedDict, which /api/versions:batch touches from to_thread workers
+_JSON_MEMO_SIZE = MAX_CACHED_VERSIONS * 2 + 2
+_json_memo: "OrderedDict[str, tuple[tuple[int, int], Any]]" = OrderedDict()
+_json_memo_lock = threading.Lock()
+
+
+def _load_json_file(path: Path) -> Any:
+    """json.load a cache file, kept in memory until the file changes on disk."""
+    stat = path.stat()
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    key = str(path)
+    with _json_memo_lock:
+        memo = _json_memo.get(key)
+    if memo is None or memo[0] != stamp:
+        # Parse outside the lock so readers of other files are not blocked
+        with open(path, "r", encoding="utf-8") as f:
+            memo = (stamp, json.load(f))
+    with _json_memo_lock:
+        _json_memo[key] = memo
+        _json_memo.move_to_end(key)
+        while len(_json_memo) > _JSON_MEMO_SIZE:
+            _json_memo.popitem(last=False)
+    return memo[1]
+
+
 # ==================== Version Index ====================
 
 def load_versions_index() -> Dict[str, Any]:
-    """Load the version index file."""
+    """Load the version index file (a copy: callers modify and save it)."""
     if VERSIONS_INDEX.exists():
         try:
-            with open(VERSIONS_INDEX, "r", encoding="utf-8") as f:
-                return json.load(f)
+            return copy.deepcopy(_load_json_file(VERSIONS_INDEX))
         except Exception as e:
             logger.warning(f"读取版本索引失败: {e}")
     return {"latest": None, "versions": []}
@@ -113,6 +204,7 @@ def update_versions_index(version: str) -> None:
         if evicted_file.exists():
             evicted_file.unlink()
             logger.info(f"🗑️ 淘汰旧版本缓存: {evicted['version']}")
+        shutil.rmtree(CACHE_DIR / "sections" / evicted["version"], ignore_errors=True)
 
     index["latest"] = versions[0]["version"]
     index["versions"] = versions
@@ -120,19 +212,81 @@ def update_versions_index(version: str) -> None:
     logger.info(f"📋 版本索引已更新: latest={index['latest']}, total={len(versions)}")
 
 
+# ==================== History Index ====================
+
+def build_history_entries(version: str, result: Dict[str, Any]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """
+    Flatten one analysis result into per-champion and per-item history entries.
+
+    Tier and strength come from the summarizer's tier_list, falling back to the
+    analyzer's predictions; change_type comes from the extractor.
+    """
+    champions: Dict[str, Dict[str, Any]] = {}
+    items: Dict[str, Dict[str, Any]] = {}
+
+    def _champion(name: str) -> Dict[str, Any]:
+        return champions.setdefault(name, {
+            "version": version,
+            "tier": None,
+            "strength_score": None,
+            "change_type": None,
+            "details": None,
+        })
+
+    for i, change in enumerate(result.get("top_lane_changes") or []):
+        if change.get("type") == "champion" and change.get("champion"):
+            _champion(change["champion"])["change_type"] = change.get("change_type")
+        elif change.get("type") == "item" and change.get("item"):
+            items[change["item"]] = {
+                "version": version,
+                "change": change.get("change"),
+                "details": {"section": "top_lane_changes", "index": i},
+            }
+
+    impact_analyses = result.get("impact_analyses")
+    for analysis in impact_analyses if isinstance(impact_analyses, list) else []:
+        if not isinstance(analysis, dict):
+            continue
+        for champ in analysis.get("champion_analyses") or []:
+            if not champ.get("champion"):
+                continue
+            entry = _champion(champ["champion"])
+            entry["tier"] = (champ.get("meta_impact") or {}).get("tier_prediction")
+            entry["strength_score"] = (champ.get("overall_assessment") or {}).get("strength_score")
+            entry["change_type"] = entry["change_type"] or champ.get("change_type")
+
+    summary_report = result.get("summary_report")
+    if not isinstance(summary_report, dict):
+        summary_report = {}
+    for tier_entries in (summary_report.get("tier_list") or {}).values():
+        for champ in tier_entries:
+            if not isinstance(champ, dict) or not champ.get("champion"):
+                continue
+            entry = _champion(champ["champion"])
+            entry["tier"] = champ.get("tier", entry["tier"])
+            entry["strength_score"] = champ.get("strength_score", entry["strength_score"])
+            entry["change_type"] = champ.get("change_type") or entry["change_type"]
+
+    for i, detail in enumerate(summary_report.get("champion_details") or []):
+        if detail.get("champion") in champions:
+            champions[detail["champion"]]["details"] = {"section": "champion_details", "index": i}
+
+    return {"champions": champions, "items": items}
+
+
 # ==================== 缓存助手 ====================
 
 def get_cached_analysis(version: str) -> Optional[Dict[str, Any]]:
-    """尝试获取缓存的分析结果"""
+    """尝试获取缓存的分析结果（内存中共享，调用方不要修改）"""
     if version == "latest" or version == "unknown":
         return None
 
     cache_file = CACHE_DIR / f"{version}.json"
     if cache_file.exists():
         try:
-            with open(cache_file, "r", encoding="utf-8") as f:
-                logger.info(f"🚀 命中缓存: {version}")
-                return json.load(f)
+            cached = _load_json_file(cache_file)
+            logger.info(f"🚀 命中缓存: {version}")
+            return cached
         except Exception as e:
             logger.warning(f"读取缓存失败 {version}: {e}")
     return None
@@ -153,14 +307,120 @@ def save_analysis_to_cache(version: str, result: Dict[str, Any]):
         }
         with open(cache_file, "w", encoding="utf-8") as f:
             json.dump(serializable_result, f, ensure_ascii=False, indent=2)
+        save_report_sections(version, serializable_result)
         logger.info(f"💾 结果已缓存: {version}")
 
         # Update version index
         update_versions_index(version)
+        kept_versions = [v["version"] for v in load_versions_index().get("versions", [])]
+        history.record(version, build_history_entries(version, serializable_result))
+        _invalidate_diffs(version, kept_versions)
     except Exception as e:
         logger.error(f"保存缓存失败 {version}: {e}")
 
 
+# ==================== Report Sections ====================
+
+def save_report_sections(version: str, report: Dict[str, Any]) -> None:
+    """
+    Pre-split a report into one compact JSON file per section so that
+    projected responses can be served by splicing bytes, without parsing.
+    """
+    section_dir = CACHE_DIR / "sections" / version
+    shutil.rmtree(section_dir, ignore_errors=True)
+    section_dir.mkdir(parents=True, exist_ok=True)
+
+    def _write(name: str, value: Any) -> None:
+        with open(section_dir / f"{name}.json", "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False, separators=(",", ":"))
+
+    for key in REPORT_SECTIONS:
+        _write(key, report.get(key))
+    summary_report = report.get("summary_report")
+    if isinstance(summary_report, dict):
+        for key, value in summary_report.items():
+            if _FIELD_PATTERN.match(key):
+                _write(f"summary_report.{key}", value)
+
+
+def parse_fields(fields: str) -> list[str]:
+    """
+    Parse a comma-separated fields= value like "summary_report.tier_list,top_lane_changes".
+
+    Raises ValueError on unknown top-level sections or malformed names.
+    """
+    parsed = []
+    for field in (f.strip() for f in fields.split(",")):
+        if not field:
+            continue
+        if not _FIELD_PATTERN.match(field) or field.split(".")[0] not in REPORT_SECTIONS:
+            raise ValueError(f"未知字段: {field}")
+        parsed.append(field)
+    if not parsed:
+        raise ValueError("fields 不能为空")
+    return parsed
+
+
+def _field_tree(fields: list[str]) -> Dict[str, Any]:
+    """Group dotted fields by parent; a whole section wins over its sub-fields."""
+    tree: Dict[str, Any] = {"version": True}
+    for field in fields:
+        parent, _, child = field.partition(".")
+        if not child or tree.get(parent) is True:
+            tree[parent] = True
+        else:
+            tree.setdefault(parent, {})[child] = True
+    return tree
+
+
+def get_report_section(version: str, field: str) -> Optional[bytes]:
+    """Return the raw JSON bytes of one pre-split section, or None if absent."""
+    section_file = CACHE_DIR / "sections" / version / f"{field}.json"
+    if version in ("latest", "unknown") or not section_file.exists():
+        return None
+    return section_file.read_bytes()
+
+
+def _project(report: Dict[str, Any], tree: Dict[str, Any]) -> Dict[str, Any]:
+    projected = {}
+    for key, sub in tree.items():
+        if key not in report:
+            continue
+        if sub is True:
+            projected[key] = report[key]
+        else:
+            section = report[key] if isinstance(report[key], dict) else {}
+            projected[key] = {k: section[k] for k in sub if k in section}
+    return projected
+
+
+def get_projected_analysis(version: str, fields: list[str]) -> Optional[bytes | Dict[str, Any]]:
+    """
+    Return only the requested sections of a cached analysis.
+
+    Served as spliced raw bytes from the pre-split section files; falls back to
+    projecting the full cache file for versions saved before sections existed.
+    """
+    tree = _field_tree(fields)
+    section_dir = CACHE_DIR / "sections" / version
+    if version in ("latest", "unknown") or not section_dir.is_dir():
+        cached = get_cached_analysis(version)
+        return None if cached is None else _project(cached, tree)
+
+    def _splice(node: Dict[str, Any], prefix: str = "") -> bytes:
+        parts = []
+        for key, sub in node.items():
+            if sub is True:
+                raw = get_report_section(version, prefix + key)
+            else:
+                raw = _splice(sub, f"{key}.")
+            if raw is not None:
+                parts.append(json.dumps(key, ensure_ascii=False).encode("utf-8") + b":" + raw)
+        return b"{" + b",".join(parts) + b"}"
+
+    return _splice(tree)
+
+
 # ==================== API 路由 ====================
 
 async def _fetch_raw_content(version: str) -> tuple[str, str]:
@@ -169,22 +429,39 @@ async def _fetch_raw_content(version: str) -> tuple[str, str]:
     crawler = LOLOfficialCrawler()
     raw_content, real_version = await crawler.fetch_patch_notes(version=version)
     logger.info(f"✅ 爬取成功: {real_version} ({len(raw_content)} 字符)")
+    if version == "latest":
+        remember_latest_version(real_version)
     return raw_content, real_version
 
 
-async def _analyze(raw_content: str, version: str):
-    """Run analysis workflow with common logging and caching."""
+async def run_workflow(raw_content: str, version: str = "unknown") -> Dict[str, Any]:
+    """Run the analysis pipeline; the LLM stack is imported on first use, not at startup."""
+    from agents.workflow import run_workflow as _run_workflow
+    return await _run_workflow(raw_content, version=version)
+
+
+async def _analyze(raw_content: str, version: str, notify: bool = False):
+    """Run analysis workflow with common logging and caching; optionally queue subscriber emails."""
     # 1. 尝试从缓存获取
     cached_result = get_cached_analysis(version)
     if cached_result:
         return cached_result
 
-    # 2. 执行分析
+    # 2. 执行分析（有预览分析时只重新分析变化的部分）
     logger.info(f"🤖 开始分析工作流 (Version: {version})...")
-    result = await run_workflow(raw_content, version=version)
+    provisional = preview.load_provisional(version)
+    if provisional is not None:
+        result = await preview.analyze_release(raw_content, version, provisional)
+    else:
+        result = await run_workflow(raw_content, version=version)
     logger.info("✅ 分析完成")
 
-    # 3. 写入缓存
+    # 3. 先排队通知再写缓存：缓存后调度器视该版本为已知，不会再重试通知
+    if notify:
+        from scheduler import _queue_patch_notifications
+        _queue_patch_notifications(version, result)
+
+    # 4. 写入缓存
     save_analysis_to_cache(version, result)
 
     return result
@@ -193,32 +470,154 @@ FRONTEND_DIR = Path(__file__).resolve().parent.parent / "frontend" / "dist"
 
 
 @app.get("/health")
+@app.get("/health/live")
 async def health_check():
-    """健康检查"""
+    """存活检查：进程可以响应请求"""
     return {"status": "healthy"}
 
 
-_analyzing: dict[str, str] = {}  # version -> "running" | "done" | "error:<msg>"
+@app.get("/health/ready")
+async def readiness_check():
+    """就绪检查：启动预热完成前返回 503"""
+    ready = readiness["ready"]
+    body = {"status": "ready" if ready else "warming", "warmup": readiness["steps"]}
+    return JSONResponse(body, status_code=200 if ready else 503)
 
 
-async def _run_analysis_bg(version: str, raw_content: str) -> None:
-    """Background task: run analysis and update status."""
-    try:
-        await _analyze(raw_content, version)
-        _analyzing[version] = "done"
-    except Exception as e:
-        logger.error(f"❌ Background analysis failed for {version}: {e}")
-        _analyzing[version] = f"error:{e}"
+# ==================== Startup Warmup ====================
+
+readiness: Dict[str, Any] = {"ready": False, "steps": {}}
+_latest_version: Optional[tuple[str, float]] = None
+
+
+def remember_latest_version(version: Optional[str]) -> None:
+    """Record the newest version seen on the official site."""
+    global _latest_version
+    if version and version not in ("latest", "unknown"):
+        _latest_version = (version, time.monotonic())
+
+
+def known_latest_version() -> Optional[str]:
+    """The remembered latest version, if resolved within LATEST_VERSION_TTL_SECONDS."""
+    if _latest_version is None or time.monotonic() - _latest_version[1] > LATEST_VERSION_TTL_SECONDS:
+        return None
+    return _latest_version[0]
+
+
+def _cached_latest_analysis() -> Optional[Dict[str, Any]]:
+    version = known_latest_version()
+    return get_cached_analysis(version) if version else None
+
+
+async def _resolve_latest_version() -> str:
+    _, version = await asyncio.wait_for(LOLOfficialCrawler().probe_latest_version(), WARMUP_TIMEOUT_SECONDS)
+    remember_latest_version(version)
+    return version
+
+
+def _load_latest_analysis() -> Optional[str]:
+    version = known_latest_version() or load_versions_index().get("latest")
+    return version if version and get_cached_analysis(version) is not None else None
+
+
+def _compile_workflows() -> bool:
+    from agents.workflow import create_analysis_workflow, create_workflow
+    return bool(create_workflow() and create_analysis_workflow())
+
+
+def warm_up_clients() -> List[str]:
+    from agents.llm import warm_up_clients as _warm_up_clients
+    return _warm_up_clients()
+
+
+async def warm_up() -> Dict[str, Any]:
+    """
+    Pay one-time costs before the first request: compile the workflow graphs,
+    build the LLM clients, load the versions index and the latest analysis
+    into memory, and resolve "latest". A failed step is logged and reported
+    under /health/ready but does not block readiness. The LLM clients built
+    off-loop share the sync pool; the async pool is created on the first call.
+    """
+    steps = [
+        ("workflow_graph", _compile_workflows),
+        ("llm_clients", warm_up_clients),
+        ("versions_index", lambda: load_versions_index().get("latest")),
+        ("latest_version", _resolve_latest_version),
+        ("latest_analysis", _load_latest_analysis),
+    ]
+    for name, step in steps:
+        started = time.monotonic()
+        try:
+            # Sync steps (imports, client setup, file loads) run in a thread so /health keeps answering
+            value = await step() if inspect.iscoroutinefunction(step) else await asyncio.to_thread(step)
+            entry = {"ok": True, "result": value}
+        except Exception as e:
+            logger.warning(f"⚠️ 预热步骤 {name} 失败: {e}")
+            entry = {"ok": False, "error": str(e) or type(e).__name__}
+        entry["seconds"] = round(time.monotonic() - started, 3)
+        readiness["steps"][name] = entry
+    readiness["ready"] = True
+    logger.info(f"🔥 预热完成: {readiness['steps']}")
+    return readiness
+
+
+# ==================== Analysis Jobs ====================
+
+async def _run_analysis_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Job handler: fetch content if the job carries none, then analyze and cache."""
+    version = job["version"]
+    payload = job.get("payload") or {}
+    raw_content = payload.get("raw_content")
+    if not raw_content:
+        raw_content, version = await _fetch_raw_content(version)
+    await _analyze(raw_content, version, notify=bool(payload.get("notify")))
+    return {"version": version}
+
+
+async def _run_notification_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Job handler: deliver the outbox rows queued for a version."""
+    return await outbox.deliver(job["version"])
+
+
+async def _run_preview_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Job handler: analyze preview notes ahead of release and store them as provisional."""
+    payload = job.get("payload") or {}
+    raw_content = payload.get("raw_content")
+    if not raw_content:
+        raw_content = await preview.fetch_preview(payload["url"])
+    await preview.analyze_preview(raw_content, job["version"], source=payload.get("url") or "upload")
+    return {"version": job["version"]}
+
+
+job_pool = jobs.JobWorkerPool({
+    "analyze": _run_analysis_job,
+    "notify": _run_notification_job,
+    "preview": _run_preview_job,
+})
+
+
+def _start_analysis_job(version: str, raw_content: Optional[str], notify: bool = False) -> Dict[str, Any]:
+    """Queue an analysis (deduplicated per version) and wake the worker pool."""
+    payload: Dict[str, Any] = {"raw_content": raw_content}
+    if notify:
+        payload["notify"] = True
+    job, created = jobs.enqueue("analyze", version, payload)
+    if created:
+        logger.info(f"🧵 Queued analysis job {job['id']} for {version}")
+        job_pool.notify()
+    return {"status": "analyzing", "version": version, "job_id": job["id"]}
 
 
 @app.get("/api/analyze")
 async def analyze_version_get(
-    background_tasks: BackgroundTasks,
     version: str = Query(default="latest", description="版本号，如 14.24 或 latest"),
 ):
-    """Trigger analysis. Returns cached result or starts background job."""
+    """Trigger analysis. Returns cached result or queues an analysis job."""
     logger.info(f"收到 GET 分析请求: version={version}")
 
+    if version == "latest" and (cached := _cached_latest_analysis()):
+        return cached
+
     try:
         raw_content, real_version = await _fetch_raw_content(version)
 
@@ -227,14 +626,7 @@ async def analyze_version_get(
         if cached:
             return cached
 
-        # Already running
-        if _analyzing.get(real_version) == "running":
-            return {"status": "analyzing", "version": real_version}
-
-        # Start background analysis
-        _analyzing[real_version] = "running"
-        background_tasks.add_task(_run_analysis_bg, real_version, raw_content)
-        return {"status": "analyzing", "version": real_version}
+        return _start_analysis_job(real_version, raw_content)
 
     except Exception as e:
         logger.error(f"❌ 分析失败: {str(e)}")
@@ -242,10 +634,7 @@ async def analyze_version_get(
 
 
 @app.post("/api/analyze")
-async def analyze_version_post(
-    request: AnalysisRequest,
-    background_tasks: BackgroundTasks,
-):
+async def analyze_version_post(request: AnalysisRequest):
     """Trigger analysis via POST. Same async behavior as GET."""
     logger.info(f"收到 POST 分析请求: version={request.version}")
 
@@ -253,6 +642,9 @@ async def analyze_version_post(
         raw_content = request.raw_content
         version = request.version or "latest"
 
+        if not raw_content and version == "latest" and (cached := _cached_latest_analysis()):
+            return cached
+
         if not raw_content:
             raw_content, version = await _fetch_raw_content(version)
 
@@ -260,18 +652,23 @@ async def analyze_version_post(
         if cached:
             return cached
 
-        if _analyzing.get(version) == "running":
-            return {"status": "analyzing", "version": version}
-
-        _analyzing[version] = "running"
-        background_tasks.add_task(_run_analysis_bg, version, raw_content)
-        return {"status": "analyzing", "version": version}
+        return _start_analysis_job(version, raw_content)
 
     except Exception as e:
         logger.error(f"❌ 分析失败: {str(e)}")
         raise HTTPException(status_code=500, detail=f"分析失败: {str(e)}")
 
 
+@app.get("/api/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Return state, attempts, timestamps and result of an analysis job."""
+    job = jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"任务 {job_id} 不存在")
+    job.pop("payload", None)  # may hold the full raw patch text
+    return job
+
+
 # ==================== Version Endpoints ====================
 
 @app.get("/api/versions")
@@ -281,12 +678,151 @@ async def list_versions():
 
 
 @app.get("/api/versions/{version}")
-async def get_version(version: str):
-    """Return cached analysis for a specific version."""
+async def get_version(
+    version: str,
+    fields: Optional[str] = Query(
+        default=None, description="逗号分隔的字段，如 top_lane_changes,summary_report.tier_list",
+    ),
+):
+    """Return cached analysis for a specific version, optionally projected to `fields`."""
+    if fields is None:
+        cached = get_cached_analysis(version)
+        if cached is None:
+            raise HTTPException(status_code=404, detail=f"版本 {version} 未找到缓存")
+        return cached
+
+    try:
+        parsed = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    projected = get_projected_analysis(version, parsed)
+    if projected is None:
+        raise HTTPException(status_code=404, detail=f"版本 {version} 未找到缓存")
+    if isinstance(projected, bytes):
+        return Response(content=projected, media_type="application/json")
+    return projected
+
+
+@app.get("/api/versions/{version}/{section}")
+async def get_version_section(version: str, section: str):
+    """Return a single report section, e.g. /api/versions/26.3/summary_report.tier_list."""
+    try:
+        parse_fields(section)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    raw = get_report_section(version, section)
+    if raw is not None:
+        return Response(content=raw, media_type="application/json")
+
     cached = get_cached_analysis(version)
     if cached is None:
         raise HTTPException(status_code=404, detail=f"版本 {version} 未找到缓存")
-    return cached
+    parent, _, child = section.partition(".")
+    value = cached.get(parent)
+    if child:
+        if not isinstance(value, dict) or child not in value:
+            raise HTTPException(status_code=404, detail=f"版本 {version} 没有字段 {section}")
+        value = value[child]
+    return value
+
+
+@app.get("/api/champions/{name}/history")
+async def get_champion_history(name: str):
+    """Return per-version tier / strength / change history for a champion or item."""
+    found = history.find(name)
+    if found is None:
+        raise HTTPException(status_code=404, detail=f"{name} 没有历史记录")
+    kind, matched_name, entries = found
+    return {"name": matched_name, "kind": kind[:-1], "history": entries}
+
+
+def _read_version_line(version: str, fields: Optional[list[str]]) -> bytes:
+    """Read one (optionally projected) analysis as a single NDJSON line."""
+    try:
+        payload = get_cached_analysis(version) if fields is None else get_projected_analysis(version, fields)
+    except Exception as e:
+        logger.warning(f"批量读取失败 {version}: {e}")
+        payload = None
+    if payload is None:
+        payload = {"version": version, "error": "not_found"}
+    if not isinstance(payload, bytes):
+        payload = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    return payload + b"\n"
+
+
+@app.post("/api/versions:batch")
+async def batch_get_versions(request: BatchVersionsRequest):
+    """
+    Return several cached versions in one response, streamed as NDJSON.
+
+    Reads run concurrently; lines are emitted in completion order and each
+    carries its own "version" key. Missing versions yield {"version", "error"}.
+    """
+    versions = list(dict.fromkeys(v.strip() for v in request.versions if v.strip()))
+    if not versions:
+        raise HTTPException(status_code=400, detail="versions 不能为空")
+    if len(versions) > MAX_BATCH_VERSIONS:
+        raise HTTPException(status_code=400, detail=f"最多一次请求 {MAX_BATCH_VERSIONS} 个版本")
+
+    fields = None
+    if request.fields is not None:
+        try:
+            fields = parse_fields(request.fields)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    async def _stream():
+        reads = [asyncio.to_thread(_read_version_line, v, fields) for v in versions]
+        for next_line in asyncio.as_completed(reads):
+            yield await next_line
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
+
+
+# ==================== Version Diff ====================
+
+_diff_cache: dict[tuple[str, str], dict] = {}  # (from, to) -> diff payload
+
+
+def _invalidate_diffs(version: str, kept_versions: list[str]) -> None:
+    """Drop memoized diffs that involve a re-analyzed or evicted version."""
+    kept = set(kept_versions)
+    for pair in list(_diff_cache):
+        if version in pair or not kept.issuperset(pair):
+            del _diff_cache[pair]
+
+
+def get_version_diff(from_version: str, to_version: str) -> Optional[Dict[str, Any]]:
+    """Return the (memoized) diff between two cached versions, or None if either is missing."""
+    pair = (from_version, to_version)
+    if pair in _diff_cache:
+        return _diff_cache[pair]
+
+    old, new = get_cached_analysis(from_version), get_cached_analysis(to_version)
+    if old is None or new is None:
+        return None
+
+    diff = {
+        "from": from_version,
+        "to": to_version,
+        **diff_summary_reports(old.get("summary_report") or {}, new.get("summary_report") or {}),
+    }
+    _diff_cache[pair] = diff
+    return diff
+
+
+@app.get("/api/diff")
+async def diff_versions(
+    from_version: str = Query(..., alias="from", description="旧版本号，如 26.2"),
+    to_version: str = Query(..., alias="to", description="新版本号，如 26.3"),
+):
+    """Return tier / champion / build / counter deltas between two cached versions."""
+    diff = get_version_diff(from_version, to_version)
+    if diff is None:
+        raise HTTPException(status_code=404, detail=f"版本 {from_version} 或 {to_version} 未找到缓存")
+    return diff
 
 
 # ==================== Subscription Endpoints ====================
@@ -294,12 +830,10 @@ async def get_version(version: str):
 @app.post("/api/subscribe")
 async def subscribe(request: SubscribeRequest):
     """Subscribe an email to patch notifications."""
-    import re
-
-    from subscribers import upsert_active
+    from subscribers import normalize_email, upsert_active
 
-    email = request.email.strip().lower()
-    if not re.match(r"^[^@\s]+@[^@\s]+\.[^@\s]+$", email):
+    email = normalize_email(request.email)
+    if email is None:
         raise HTTPException(status_code=400, detail="Invalid email address")
 
     subscriber, action = upsert_active(email)
@@ -324,16 +858,164 @@ async def unsubscribe(token: str = Query(..., description="Unsubscribe token")):
     )
 
 
-# ==================== Backfill ====================
+# ==================== Subscriber Admin ====================
+
+def _require_admin(x_admin_token: Optional[str] = Header(default=None)) -> None:
+    if not ADMIN_TOKEN or not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+async def _iter_body_lines(request: Request) -> AsyncIterator[str]:
+    """Yield non-empty lines of the request body as it streams in."""
+    # Incremental: a multi-byte character split across two chunks decodes intact
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = ""
+    async for chunk in request.stream():
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            if line.strip():
+                yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer.strip():
+        yield buffer.rstrip("\r")
+
+
+def _email_from_line(line: str, fmt: str, email_column: int) -> str:
+    if fmt == "ndjson":
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            return ""
+        value = record.get("email", "") if isinstance(record, dict) else record
+        return value if isinstance(value, str) else ""
+    row = next(csv.reader([line]), [])
+    return row[email_column] if len(row) > email_column else ""
+
+
+@app.post("/api/admin/subscribers:import", dependencies=[Depends(_require_admin)])
+async def import_subscribers(
+    request: Request,
+    format: str = Query(default="csv", pattern="^(csv|ndjson)$", description="csv（含 email 列）或 ndjson"),
+):
+    """
+    Bulk-add subscribers from a streamed CSV (an `email` header column, or the
+    first column) or NDJSON ({"email": ...} per line) body. Addresses are
+    validated, deduplicated and written one transaction per batch; existing
+    subscribers, including unsubscribed ones, are left unchanged.
+    """
+    from subscribers import bulk_insert, normalize_email
+
+    totals = {"created": 0, "already_active": 0, "unsubscribed": 0, "invalid": 0}
+    invalid_samples: list[str] = []
+    batch: list[str] = []
+    email_column = 0
+    first = True
+
+    async def _flush() -> None:
+        counts = await asyncio.to_thread(bulk_insert, batch)
+        for key, value in counts.items():
+            totals[key] += value
+        batch.clear()
+
+    async for line in _iter_body_lines(request):
+        if first and format == "csv":
+            first = False
+            header = [h.strip().lower() for h in next(csv.reader([line]), [])]
+            if "email" in header:
+                email_column = header.index("email")
+                continue
+        first = False
+
+        raw = _email_from_line(line, format, email_column)
+        email = normalize_email(raw)
+        if email is None:
+            totals["invalid"] += 1
+            if len(invalid_samples) < 10:
+                invalid_samples.append(raw or line[:100])
+            continue
+        batch.append(email)
+        if len(batch) >= SUBSCRIBER_IMPORT_BATCH_SIZE:
+            await _flush()
+    if batch:
+        await _flush()
+
+    logger.info(f"📥 Subscriber import: {totals}")
+    return {"ok": True, **totals, "invalid_samples": invalid_samples}
+
+
+_EXPORT_COLUMNS = ("email", "status", "unsubscribe_token", "created_at", "updated_at")
 
-_backfill_running = False
 
+@app.get("/api/admin/subscribers:export", dependencies=[Depends(_require_admin)])
+async def export_subscribers(
+    format: str = Query(default="csv", pattern="^(csv|ndjson)$"),
+    status: Optional[str] = Query(default=None, description="只导出该状态，如 active"),
+):
+    """Stream all subscribers (or those with `status`) as CSV or NDJSON."""
+    from subscribers import iter_subscribers
+
+    def _csv_lines():
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(_EXPORT_COLUMNS)
+        for sub in iter_subscribers(status):
+            writer.writerow([sub[c] for c in _EXPORT_COLUMNS])
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate()
+        yield out.getvalue()
+
+    def _ndjson_lines():
+        for sub in iter_subscribers(status):
+            yield json.dumps({c: sub[c] for c in _EXPORT_COLUMNS}, ensure_ascii=False) + "\n"
+
+    if format == "ndjson":
+        return StreamingResponse(_ndjson_lines(), media_type="application/x-ndjson")
+    return StreamingResponse(
+        _csv_lines(),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="subscribers.csv"'},
+    )
+
+
+# ==================== Preview (PBE) Pre-analysis ====================
+
+@app.post("/api/admin/previews", dependencies=[Depends(_require_admin)])
+async def submit_preview(request: PreviewRequest):
+    """Queue a speculative analysis of preview notes; the live release reuses it."""
+    if not request.raw_content and not request.url:
+        raise HTTPException(status_code=400, detail="需要 raw_content 或 url")
+    if get_cached_analysis(request.version):
+        raise HTTPException(status_code=409, detail=f"版本 {request.version} 已有正式分析")
+
+    job, created = jobs.enqueue("preview", request.version, {"raw_content": request.raw_content, "url": request.url})
+    if created:
+        logger.info(f"🧪 Queued preview job {job['id']} for {request.version}")
+        job_pool.notify()
+    return {"status": "analyzing", "version": request.version, "job_id": job["id"]}
+
+
+@app.get("/api/previews/{version}")
+async def get_preview(version: str):
+    """Return the provisional (pre-release) analysis of a version."""
+    record = preview.load_provisional(version)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"版本 {version} 没有预览分析")
+    return {
+        **record["result"],
+        "provisional": True,
+        "source": record.get("source"),
+        "analyzed_at": record.get("analyzed_at"),
+    }
+
+
+# ==================== Backfill ====================
 
 @app.post("/api/backfill")
 async def backfill_recent_versions(background_tasks: BackgroundTasks):
     """Trigger background analysis of recent versions not yet cached."""
-    global _backfill_running
-    if _backfill_running:
+    if leader.current_holder("backfill") is not None:
         return {"ok": True, "message": "Backfill already running"}
 
     index = load_versions_index()
@@ -344,35 +1026,31 @@ async def backfill_recent_versions(background_tasks: BackgroundTasks):
 
 
 async def _run_backfill(cached_versions: set[str]) -> None:
-    global _backfill_running
-    _backfill_running = True
-    try:
-        crawler = LOLOfficialCrawler()
-        recent = await crawler.list_recent_versions(count=5)
+    """List recent versions and queue an analysis job for each one not yet cached."""
+    async with leader.hold("backfill") as acquired:
+        if not acquired:
+            logger.info("Backfill already running in another process")
+            return
+        try:
+            crawler = LOLOfficialCrawler()
+            recent = await crawler.list_recent_versions(count=5)
 
-        for version in recent:
-            if version in cached_versions:
-                continue
-            try:
+            for version in recent:
+                if version in cached_versions:
+                    continue
                 logger.info(f"🔄 Backfilling version {version}...")
-                raw_content, real_version = await crawler.fetch_patch_notes(version=version)
-                result = await run_workflow(raw_content, version=real_version)
-                save_analysis_to_cache(real_version, result)
-                cached_versions.add(real_version)
-                logger.info(f"✅ Backfill complete: {real_version}")
-            except Exception as e:
-                logger.warning(f"⚠️ Backfill failed for {version}: {e}")
-    finally:
-        _backfill_running = False
+                _start_analysis_job(version, None)
+        except Exception as e:
+            logger.warning(f"⚠️ Backfill failed: {e}")
 
 
 # ==================== Scheduler Trigger ====================
 
 @app.post("/api/check-update")
 async def manual_check_update():
-    """Manually trigger a version check (for testing/debugging)."""
-    from scheduler import check_for_new_version
-    result = await check_for_new_version()
+    """Manually trigger a version check (for testing/debugging); a new version is analyzed by a queued job."""
+    from scheduler import run_exclusive_check
+    result = await run_exclusive_check()
     return result
 
 
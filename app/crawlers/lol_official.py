@@ -1,13 +1,19 @@
+import codecs
 import logging
 import re
-
-import aiohttp
-from bs4 import BeautifulSoup
+from collections.abc import AsyncIterable
+from typing import Optional
 
 from .base import BaseCrawler
 
 logger = logging.getLogger(__name__)
 
+# 新闻列表中的版本公告链接（用于流式探测，无需完整解析HTML）
+_NEWS_LINK_PATTERN = re.compile(
+    r"""<a\b[^>]*?href=["']([^"']*/gicp/news/410/\d+\.html)["'][^>]*>(.*?)</a>""",
+    re.IGNORECASE | re.DOTALL,
+)
+
 
 class LOLOfficialCrawler(BaseCrawler):
     """英雄联盟官网爬虫"""
@@ -80,6 +86,70 @@ class LOLOfficialCrawler(BaseCrawler):
 
         return content, version
 
+    async def probe_latest_version(
+        self, chunk_size: int = 8192, max_bytes: int = 512 * 1024
+    ) -> tuple[Optional[str], str]:
+        """
+        轻量探测最新版本：流式读取新闻列表页，匹配到第一个版本公告链接后立即停止下载
+
+        Args:
+            chunk_size: 每次读取的字节数
+            max_bytes: 最多读取的字节数，超过仍未匹配则放弃
+
+        Returns:
+            tuple[Optional[str], str]: (公告URL, 版本号)；未匹配到时为 (None, "unknown")
+        """
+        logger.info(f"探测最新版本: {self.news_list_url}")
+
+        async def _probe():
+            import aiohttp
+
+            async with aiohttp.ClientSession(headers=self.headers) as session:
+                async with session.get(
+                    self.news_list_url, timeout=aiohttp.ClientTimeout(total=30)
+                ) as response:
+                    response.raise_for_status()
+                    return await self._scan_first_news_link(
+                        response.content.iter_chunked(chunk_size), max_bytes
+                    )
+
+        return await self.fetch_with_retry(_probe)
+
+    async def _scan_first_news_link(
+        self, chunks: AsyncIterable[bytes], max_bytes: int
+    ) -> tuple[Optional[str], str]:
+        """
+        增量解码（GB2312）并扫描第一个版本公告链接
+
+        只保留最后一个未闭合的 <a 之后的内容，扫描总量与读取量成线性关系。
+        """
+        decoder = codecs.getincrementaldecoder("gb2312")(errors="ignore")
+        buffer = ""
+        read = 0
+
+        async for chunk in chunks:
+            read += len(chunk)
+            buffer += decoder.decode(chunk)
+
+            match = _NEWS_LINK_PATTERN.search(buffer)
+            if match:
+                href, title_html = match.groups()
+                title = re.sub(r"<[^>]+>", "", title_html).strip()
+                version_match = re.search(r"(\d+\.\d+)", title)
+                detected_version = version_match.group(1) if version_match else "unknown"
+                url = href if href.startswith("http") else f"https://lol.qq.com{href}"
+                logger.info(f"✅ 探测到最新版本: {title} (Version: {detected_version}, 读取 {read} 字节)")
+                return url, detected_version
+
+            last_anchor = buffer.rfind("<a")
+            buffer = buffer[last_anchor:] if last_anchor != -1 else buffer[-1:]
+
+            if read >= max_bytes:
+                break
+
+        logger.warning(f"探测未找到版本公告链接 (读取 {read} 字节)")
+        return None, "unknown"
+
     async def _search_version_in_news_list(
         self, version: str, max_pages: int = 10
     ) -> str:
@@ -109,6 +179,9 @@ class LOLOfficialCrawler(BaseCrawler):
             f"在新闻列表中搜索版本 {normalised_version}，最多扫描 {max_pages} 页..."
         )
 
+        import aiohttp
+        from bs4 import BeautifulSoup
+
         async with aiohttp.ClientSession(headers=self.headers) as session:
             for page_number in range(1, max_pages + 1):
                 page_url = f"https://lol.qq.com/gicp/news/423/2/1334/{page_number}.html"
@@ -161,6 +234,9 @@ class LOLOfficialCrawler(BaseCrawler):
         version_pattern = re.compile(r"^(\d+\.\d+)\s*版本公告")
         found: list[str] = []
 
+        import aiohttp
+        from bs4 import BeautifulSoup
+
         async with aiohttp.ClientSession(headers=self.headers) as session:
             for page_number in range(1, max_pages + 1):
                 page_url = f"https://lol.qq.com/gicp/news/423/2/1334/{page_number}.html"
@@ -202,6 +278,9 @@ class LOLOfficialCrawler(BaseCrawler):
         logger.info(f"爬取新闻列表页: {self.news_list_url}")
 
         async def _fetch():
+            import aiohttp
+            from bs4 import BeautifulSoup
+
             async with aiohttp.ClientSession(headers=self.headers) as session:
                 async with session.get(
                     self.news_list_url, timeout=aiohttp.ClientTimeout(total=30)
@@ -266,6 +345,9 @@ class LOLOfficialCrawler(BaseCrawler):
         self.last_url = url
 
         async def _fetch():
+            import aiohttp
+            from bs4 import BeautifulSoup
+
             async with aiohttp.ClientSession(headers=self.headers) as session:
                 async with session.get(
                     url, timeout=aiohttp.ClientTimeout(total=30)
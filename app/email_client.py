@@ -1,19 +1,148 @@
 """
 Email client using Resend API.
+
+One pooled httpx.AsyncClient is reused for every message; requests go through
+a token bucket and are retried on 429/5xx, honouring Retry-After. send_batch
+posts up to RESEND_BATCH_SIZE messages per request and retries only the
+messages Resend rejected.
 """
+import asyncio
 import logging
 import os
+import time
+from typing import Optional
 
 import httpx
 
 logger = logging.getLogger(__name__)
 
+RESEND_API_URL = "https://api.resend.com"
+EMAIL_CONCURRENCY = int(os.getenv("EMAIL_CONCURRENCY", "10"))
+EMAIL_RATE_LIMIT_PER_SECOND = float(os.getenv("EMAIL_RATE_LIMIT_PER_SECOND", "10"))
+EMAIL_MAX_RETRIES = int(os.getenv("EMAIL_MAX_RETRIES", "3"))
+EMAIL_RETRY_BACKOFF_SECONDS = float(os.getenv("EMAIL_RETRY_BACKOFF_SECONDS", "1"))
+# Resend's /emails/batch accepts at most 100 messages per request
+RESEND_BATCH_SIZE = 100
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def _retry_after(resp: httpx.Response, attempt: int) -> float:
+    """Seconds to wait before retrying: Retry-After if given, else exponential backoff."""
+    header = resp.headers.get("retry-after")
+    if header:
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            pass
+    return EMAIL_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)
+
+
+def _email_payload(
+    *,
+    from_addr: str,
+    to: str,
+    subject: str,
+    html: str,
+    text: str,
+    headers: dict[str, str] | None = None,
+    reply_to: str | None = None,
+) -> dict:
+    payload: dict = {
+        "from": from_addr,
+        "to": [to],
+        "subject": subject,
+        "html": html,
+        "text": text,
+    }
+    if headers:
+        payload["headers"] = headers
+    if reply_to:
+        payload["reply_to"] = [reply_to]
+    return payload
+
 
 class ResendEmailClient:
     """Send emails via Resend (https://resend.com)."""
 
-    def __init__(self, api_key: str | None = None):
+    def __init__(
+        self,
+        api_key: str | None = None,
+        *,
+        rate_limit: float = EMAIL_RATE_LIMIT_PER_SECOND,
+        max_retries: int = EMAIL_MAX_RETRIES,
+        client: httpx.AsyncClient | None = None,
+    ):
         self.api_key = api_key or os.getenv("RESEND_API_KEY", "")
+        self.max_retries = max_retries
+        self._bucket = TokenBucket(rate_limit)
+        self._client = client
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=RESEND_API_URL,
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json",
+                },
+                timeout=30.0,
+                limits=httpx.Limits(max_connections=EMAIL_CONCURRENCY, max_keepalive_connections=EMAIL_CONCURRENCY),
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self) -> "ResendEmailClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+    async def _post(self, path: str, payload: dict | list, headers: dict | None = None) -> httpx.Response:
+        """POST with rate limiting; retry 429/5xx and transport errors."""
+        client = self._get_client()
+        for attempt in range(1, self.max_retries + 2):
+            await self._bucket.acquire()
+            try:
+                resp = await client.post(path, json=payload, headers=headers)
+            except httpx.TransportError as e:
+                if attempt > self.max_retries:
+                    raise
+                logger.warning(f"Resend request error (attempt {attempt}): {e}")
+                await asyncio.sleep(EMAIL_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+                continue
+
+            if (resp.status_code == 429 or resp.status_code >= 500) and attempt <= self.max_retries:
+                wait = _retry_after(resp, attempt)
+                logger.warning(f"Resend {resp.status_code}, retrying in {wait:.1f}s (attempt {attempt})")
+                await asyncio.sleep(wait)
+                continue
+            return resp
+        raise RuntimeError("unreachable")
 
     async def send_email(
         self,
@@ -27,28 +156,12 @@ class ResendEmailClient:
         reply_to: str | None = None,
     ) -> str:
         """Send a single email. Returns the Resend message ID."""
-        payload: dict = {
-            "from": from_addr,
-            "to": [to],
-            "subject": subject,
-            "html": html,
-            "text": text,
-        }
-        if headers:
-            payload["headers"] = headers
-        if reply_to:
-            payload["reply_to"] = [reply_to]
-
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(
-                "https://api.resend.com/emails",
-                json=payload,
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                },
-                timeout=30.0,
-            )
+        resp = await self._post(
+            "/emails",
+            _email_payload(
+                from_addr=from_addr, to=to, subject=subject, html=html, text=text, headers=headers, reply_to=reply_to
+            ),
+        )
 
         data = resp.json()
         if not resp.is_success or "id" not in data:
@@ -56,3 +169,54 @@ class ResendEmailClient:
 
         logger.info(f"Email sent to {to}: {data['id']}")
         return data["id"]
+
+    async def send_batch(self, messages: list[dict], idempotency_key: str | None = None) -> list[dict]:
+        """
+        Send up to RESEND_BATCH_SIZE messages (send_email keyword arguments) in
+        one request. Messages rejected inside the batch are retried on their
+        own; returns one {"id": ...} or {"error": ...} per message, in order.
+        Errors of a batch whose outcome is unknown (429/5xx) carry "retryable": True.
+
+        With `idempotency_key`, replaying the same batch (e.g. after a crash)
+        returns Resend's original response instead of sending again.
+        """
+        if len(messages) > RESEND_BATCH_SIZE:
+            raise ValueError(f"At most {RESEND_BATCH_SIZE} messages per batch")
+
+        results: list[dict] = [{} for _ in messages]
+        pending = list(range(len(messages)))
+        for attempt in range(1, self.max_retries + 2):
+            # Permissive mode sends the valid messages and reports the rest per index
+            headers = {"x-batch-validation": "permissive"}
+            if idempotency_key:
+                # Retries carry a different subset, so each gets its own derived key
+                headers["Idempotency-Key"] = idempotency_key if attempt == 1 else f"{idempotency_key}-retry{attempt}"
+            resp = await self._post("/emails/batch", [_email_payload(**messages[i]) for i in pending], headers=headers)
+            data = resp.json()
+            if not resp.is_success:
+                error = data.get("message", f"Resend failed: {resp.status_code}")
+                # After a 429/5xx Resend may still have accepted the batch: replay it under the same key
+                retryable = resp.status_code == 429 or resp.status_code >= 500
+                for i in pending:
+                    results[i] = {"error": error, "retryable": retryable}
+                break
+
+            rejected = {e["index"]: e.get("message", "rejected") for e in data.get("errors") or []}
+            sent = iter(data.get("data") or [])
+            failed = []
+            for position, i in enumerate(pending):
+                if position in rejected:
+                    results[i] = {"error": rejected[position]}
+                    failed.append(i)
+                else:
+                    results[i] = {"id": next(sent, {}).get("id")}
+
+            pending = failed
+            if not pending or attempt > self.max_retries:
+                break
+            logger.warning(f"Resend rejected {len(pending)}/{len(messages)} batch messages, retrying")
+            await asyncio.sleep(EMAIL_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+
+        sent_count = sum(1 for r in results if r.get("id"))
+        logger.info(f"Batch sent {sent_count}/{len(messages)} emails")
+        return results
@@ -1,7 +1,11 @@
 """
 Email template for patch analysis notifications.
+
+PatchEmailTemplate renders the version-specific body once; only the
+unsubscribe URL is substituted per recipient.
 """
 import html
+import uuid
 
 
 def render_patch_email(
@@ -84,3 +88,30 @@ Unsubscribe: {unsubscribe_url}"""
             "List-Unsubscribe-Post": "List-Unsubscribe=One-Click",
         },
     }
+
+
+class PatchEmailTemplate:
+    """
+    A patch email rendered once with a placeholder unsubscribe URL, split
+    around it so each recipient costs one join instead of a full render.
+    """
+
+    def __init__(self, version: str, summary: str, tier_highlights: list[str], app_base_url: str):
+        # Random marker: cannot collide with (escaped) summary or highlight text
+        marker = f"UNSUBSCRIBE-{uuid.uuid4().hex}"
+        rendered = render_patch_email(version, summary, tier_highlights, app_base_url, marker)
+        self.subject = rendered["subject"]
+        self._html_parts = rendered["html"].split(marker)
+        self._text_parts = rendered["text"].split(marker)
+
+    def render(self, unsubscribe_url: str) -> dict:
+        """Returns {"subject": str, "html": str, "text": str, "headers": dict} for one recipient."""
+        return {
+            "subject": self.subject,
+            "html": html.escape(unsubscribe_url).join(self._html_parts),
+            "text": unsubscribe_url.join(self._text_parts),
+            "headers": {
+                "List-Unsubscribe": f"<{unsubscribe_url}>",
+                "List-Unsubscribe-Post": "List-Unsubscribe=One-Click",
+            },
+        }
@@ -0,0 +1,165 @@
+"""
+Champion / item history — SQLite storage, one row per (kind, name, version).
+
+History is kept for the newest HISTORY_MAX_VERSIONS versions, independent of
+which reports are still in the cache, and a lookup reads only the rows of the
+requested name. The legacy history.json index is imported once when the
+database is first created.
+"""
+import json
+import logging
+import os
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+HISTORY_DB = Path(os.getenv("HISTORY_DB", "data/history.db"))
+# Legacy single-file index, migrated into HISTORY_DB on first use
+HISTORY_FILE = Path("data/cache/history.json")
+HISTORY_MAX_VERSIONS = int(os.getenv("HISTORY_MAX_VERSIONS", "20"))
+
+KINDS = ("champions", "items")
+
+_SCHEMA_VERSION = 1
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    version TEXT NOT NULL,
+    version_key TEXT NOT NULL,
+    entry TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (kind, name, version)
+);
+CREATE INDEX IF NOT EXISTS idx_history_version ON history (version_key, version)
+"""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def version_key(version: str) -> str:
+    """Sortable form of a version: numeric parts zero-padded ("26.3" -> "00026.00003")."""
+    return ".".join(part.zfill(5) if part.isdigit() else part for part in version.split("."))
+
+
+def _connect() -> sqlite3.Connection:
+    HISTORY_DB.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(HISTORY_DB, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    if conn.execute("PRAGMA user_version").fetchone()[0] < _SCHEMA_VERSION:
+        _migrate(conn)
+    return conn
+
+
+def _load_legacy_file() -> Dict[str, Any]:
+    if HISTORY_FILE.exists():
+        try:
+            with open(HISTORY_FILE, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Failed to load legacy history file: {e}")
+    return {}
+
+
+def _rows(kind: str, entries: Dict[str, Dict[str, Any]], now: str) -> list[tuple]:
+    return [
+        (kind, name, entry["version"], version_key(entry["version"]), json.dumps(entry, ensure_ascii=False), now)
+        for name, entry in entries.items()
+    ]
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    """Create the schema and import the legacy JSON index (once, guarded by user_version)."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= _SCHEMA_VERSION:
+            conn.execute("COMMIT")  # another process migrated first
+            return
+        for statement in filter(str.strip, _SCHEMA.split(";")):
+            conn.execute(statement)
+        legacy = _load_legacy_file()
+        now = _now()
+        rows = [
+            row
+            for kind in KINDS
+            for name, entries in (legacy.get(kind) or {}).items()
+            for entry in entries
+            for row in _rows(kind, {name: entry}, now)
+        ]
+        conn.executemany("INSERT OR REPLACE INTO history VALUES (?, ?, ?, ?, ?, ?)", rows)
+        conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+        conn.execute("COMMIT")
+        if rows:
+            logger.info(f"📦 Migrated {len(rows)} history entries from {HISTORY_FILE} to {HISTORY_DB}")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def record(version: str, entries: Dict[str, Dict[str, Dict[str, Any]]]) -> None:
+    """
+    Replace `version`'s entries ({"champions": {name: entry}, "items": {...}},
+    see api.build_history_entries) and drop versions beyond HISTORY_MAX_VERSIONS.
+    """
+    now = _now()
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM history WHERE version = ?", (version,))
+        for kind in KINDS:
+            conn.executemany(
+                "INSERT INTO history VALUES (?, ?, ?, ?, ?, ?)", _rows(kind, entries.get(kind) or {}, now)
+            )
+        conn.execute(
+            "DELETE FROM history WHERE version NOT IN ("
+            "SELECT version FROM history GROUP BY version ORDER BY MAX(version_key) DESC LIMIT ?)",
+            (HISTORY_MAX_VERSIONS,),
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def _entries(conn: sqlite3.Connection, kind: str, name: str) -> list[dict]:
+    rows = conn.execute(
+        "SELECT entry FROM history WHERE kind = ? AND name = ? ORDER BY version_key DESC", (kind, name)
+    ).fetchall()
+    return [json.loads(row["entry"]) for row in rows]
+
+
+def find(name: str) -> Optional[tuple[str, str, list]]:
+    """
+    Look up a champion or item by exact name, falling back to a match on one
+    part of a "title name" champion key (e.g. "贝蕾亚" -> "狂厄蔷薇 贝蕾亚").
+
+    Returns (kind, matched_name, entries newest first) or None.
+    """
+    name = name.strip()
+    if not name:
+        return None
+    conn = _connect()
+    try:
+        for kind in KINDS:
+            entries = _entries(conn, kind, name)
+            if entries:
+                return kind, name, entries
+        for kind in KINDS:
+            candidates = conn.execute(
+                "SELECT DISTINCT name FROM history WHERE kind = ? AND instr(name, ?) > 0 ORDER BY name",
+                (kind, name),
+            ).fetchall()
+            for row in candidates:
+                if name in row["name"].split():
+                    return kind, row["name"], _entries(conn, kind, row["name"])
+        return None
+    finally:
+        conn.close()
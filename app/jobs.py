@@ -0,0 +1,373 @@
+"""
+Durable job queue — SQLite-backed analysis jobs with a bounded async worker pool.
+
+Jobs survive restarts, are retried with backoff up to MAX_JOB_ATTEMPTS, and at
+most MAX_CONCURRENT_JOBS handlers run at once per process. Running jobs carry
+their owner's heartbeat, so any process can requeue jobs whose owner died
+without stealing work from live peers.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+from leader import LEASE_TTL_SECONDS, OWNER_ID
+
+logger = logging.getLogger(__name__)
+
+JOBS_DB = Path(os.getenv("JOBS_DB", "data/jobs.db"))
+MAX_CONCURRENT_JOBS = int(os.getenv("MAX_CONCURRENT_JOBS", "1"))
+MAX_JOB_ATTEMPTS = int(os.getenv("MAX_JOB_ATTEMPTS", "3"))
+JOB_RETRY_DELAY_SECONDS = float(os.getenv("JOB_RETRY_DELAY_SECONDS", "60"))
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "5"))
+JOB_RETENTION_DAYS = int(os.getenv("JOB_RETENTION_DAYS", "7"))
+
+ACTIVE_STATES = ("queued", "running")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    version TEXT NOT NULL,
+    payload TEXT,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    result TEXT,
+    run_after TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    owner TEXT,
+    heartbeat_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_state_run_after ON jobs (state, run_after);
+CREATE INDEX IF NOT EXISTS idx_jobs_kind_version ON jobs (kind, version);
+"""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# Databases whose schema this process has already created / upgraded
+_schema_ready: set[Path] = set()
+_schema_lock = threading.Lock()
+
+
+def _ensure_schema(conn: sqlite3.Connection) -> None:
+    with _schema_lock:
+        if JOBS_DB in _schema_ready:
+            return
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for column in ("owner", "heartbeat_at"):
+            if column not in columns:  # databases created before leases existed
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} TEXT")
+        _schema_ready.add(JOBS_DB)
+
+
+def _connect() -> sqlite3.Connection:
+    JOBS_DB.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(JOBS_DB, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    _ensure_schema(conn)
+    return conn
+
+
+def _to_dict(row: Optional[sqlite3.Row]) -> Optional[dict]:
+    if row is None:
+        return None
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"]) if job["payload"] else None
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+
+def enqueue(kind: str, version: str, payload: Optional[dict] = None) -> tuple[dict, bool]:
+    """
+    Queue a job unless an identical (kind, version) job is already queued or running.
+
+    Returns (job, created).
+    """
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        existing = conn.execute(
+            "SELECT * FROM jobs WHERE kind = ? AND version = ? AND state IN (?, ?) ORDER BY created_at LIMIT 1",
+            (kind, version, *ACTIVE_STATES),
+        ).fetchone()
+        if existing is not None:
+            conn.execute("COMMIT")
+            return _to_dict(existing), False
+
+        now = _now()
+        job_id = uuid.uuid4().hex
+        conn.execute(
+            "INSERT INTO jobs (id, kind, version, payload, state, run_after, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, 'queued', ?, ?, ?)",
+            (job_id, kind, version, json.dumps(payload or {}, ensure_ascii=False), now, now, now),
+        )
+        conn.execute("COMMIT")
+        return get_job(job_id), True
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def get_job(job_id: str) -> Optional[dict]:
+    """Return a job by ID, or None."""
+    conn = _connect()
+    try:
+        return _to_dict(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+    finally:
+        conn.close()
+
+
+def find_active(kind: str, version: str) -> Optional[dict]:
+    """Return the queued or running job for (kind, version), if any."""
+    conn = _connect()
+    try:
+        return _to_dict(conn.execute(
+            "SELECT * FROM jobs WHERE kind = ? AND version = ? AND state IN (?, ?) ORDER BY created_at LIMIT 1",
+            (kind, version, *ACTIVE_STATES),
+        ).fetchone())
+    finally:
+        conn.close()
+
+
+def claim_next() -> Optional[dict]:
+    """Atomically move the oldest runnable queued job to running and return it."""
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        now = _now()
+        row = conn.execute(
+            "SELECT id FROM jobs WHERE state = 'queued' AND run_after <= ? ORDER BY created_at LIMIT 1",
+            (now,),
+        ).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        conn.execute(
+            "UPDATE jobs SET state = 'running', attempts = attempts + 1, owner = ?, heartbeat_at = ?, "
+            "started_at = ?, updated_at = ? WHERE id = ?",
+            (OWNER_ID, now, now, now, row["id"]),
+        )
+        job = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+        conn.execute("COMMIT")
+        return _to_dict(job)
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def complete(job_id: str, result: Optional[dict] = None) -> None:
+    """Mark a job done and drop its payload (raw patch text is no longer needed)."""
+    conn = _connect()
+    try:
+        now = _now()
+        conn.execute(
+            "UPDATE jobs SET state = 'done', result = ?, error = NULL, payload = NULL, "
+            "finished_at = ?, updated_at = ? WHERE id = ?",
+            (json.dumps(result or {}, ensure_ascii=False), now, now, job_id),
+        )
+    finally:
+        conn.close()
+
+
+def fail(job_id: str, error: str) -> str:
+    """
+    Record a failed attempt: requeue with linear backoff, or mark failed once
+    MAX_JOB_ATTEMPTS is reached. Returns the new state.
+    """
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        attempts = row["attempts"] if row else MAX_JOB_ATTEMPTS
+        now = datetime.now(timezone.utc)
+        if attempts < MAX_JOB_ATTEMPTS:
+            run_after = now + timedelta(seconds=JOB_RETRY_DELAY_SECONDS * attempts)
+            conn.execute(
+                "UPDATE jobs SET state = 'queued', error = ?, run_after = ?, updated_at = ? WHERE id = ?",
+                (error, run_after.isoformat(), now.isoformat(), job_id),
+            )
+            return "queued"
+        conn.execute(
+            "UPDATE jobs SET state = 'failed', error = ?, payload = NULL, finished_at = ?, updated_at = ? "
+            "WHERE id = ?",
+            (error, now.isoformat(), now.isoformat(), job_id),
+        )
+        return "failed"
+    finally:
+        conn.close()
+
+
+def heartbeat(job_ids: list[str]) -> None:
+    """Refresh the heartbeat of running jobs owned by this process."""
+    if not job_ids:
+        return
+    conn = _connect()
+    try:
+        conn.executemany(
+            "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND state = 'running' AND owner = ?",
+            [(_now(), job_id, OWNER_ID) for job_id in job_ids],
+        )
+    finally:
+        conn.close()
+
+
+def requeue_stale(ttl: float = LEASE_TTL_SECONDS) -> int:
+    """Return running jobs whose owner stopped heartbeating to the queue."""
+    cutoff = (datetime.now(timezone.utc) - timedelta(seconds=ttl)).isoformat()
+    conn = _connect()
+    try:
+        cur = conn.execute(
+            "UPDATE jobs SET state = 'queued', owner = NULL, updated_at = ? "
+            "WHERE state = 'running' AND (heartbeat_at IS NULL OR heartbeat_at < ?)",
+            (_now(), cutoff),
+        )
+        return cur.rowcount
+    finally:
+        conn.close()
+
+
+def release_owned() -> int:
+    """Requeue this process's running jobs (used on shutdown) without counting an attempt."""
+    conn = _connect()
+    try:
+        cur = conn.execute(
+            "UPDATE jobs SET state = 'queued', owner = NULL, attempts = MAX(attempts - 1, 0), updated_at = ? "
+            "WHERE state = 'running' AND owner = ?",
+            (_now(), OWNER_ID),
+        )
+        return cur.rowcount
+    finally:
+        conn.close()
+
+
+def purge_finished(older_than_days: int = JOB_RETENTION_DAYS) -> int:
+    """Delete done/failed jobs older than the retention window."""
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=older_than_days)).isoformat()
+    conn = _connect()
+    try:
+        cur = conn.execute(
+            "DELETE FROM jobs WHERE state IN ('done', 'failed') AND updated_at < ?", (cutoff,)
+        )
+        return cur.rowcount
+    finally:
+        conn.close()
+
+
+JobHandler = Callable[[dict], Awaitable[Optional[dict]]]
+
+
+class JobWorkerPool:
+    """
+    Run queued jobs with at most `concurrency` handlers in flight. Queue
+    operations are blocking sqlite calls, so they run in worker threads.
+    """
+
+    def __init__(
+        self,
+        handlers: dict[str, JobHandler],
+        concurrency: int = MAX_CONCURRENT_JOBS,
+        poll_interval: float = JOB_POLL_INTERVAL_SECONDS,
+    ):
+        self.handlers = handlers
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._running: set[str] = set()
+
+    async def run_next(self) -> bool:
+        """Claim and run one job. Returns False if nothing was runnable."""
+        job = await asyncio.to_thread(claim_next)
+        if job is None:
+            return False
+        self._running.add(job["id"])
+
+        handler = self.handlers.get(job["kind"])
+        logger.info(f"🧵 Job {job['id']} ({job['kind']} {job['version']}) attempt {job['attempts']}")
+        try:
+            if handler is None:
+                raise ValueError(f"No handler for job kind: {job['kind']}")
+            result = await handler(job)
+            await asyncio.to_thread(complete, job["id"], result)
+            logger.info(f"✅ Job {job['id']} done")
+        except Exception as e:
+            state = await asyncio.to_thread(fail, job["id"], str(e))
+            logger.error(f"❌ Job {job['id']} failed ({state}): {e}")
+        finally:
+            self._running.discard(job["id"])
+        return True
+
+    async def _heartbeat(self) -> None:
+        """Keep our running jobs alive and recover jobs from dead peers."""
+        while True:
+            try:
+                await asyncio.to_thread(heartbeat, list(self._running))
+                recovered = await asyncio.to_thread(requeue_stale)
+                if recovered:
+                    logger.info(f"🧵 Requeued {recovered} job(s) from unresponsive workers")
+                    self.notify()
+            except Exception as e:
+                logger.warning(f"Job heartbeat error: {e}")
+            await asyncio.sleep(LEASE_TTL_SECONDS / 3)
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                ran = await self.run_next()
+            except Exception as e:
+                logger.error(f"Job worker error: {e}")
+                ran = False
+            if ran:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def notify(self) -> None:
+        """Wake idle workers after enqueueing."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        """Start the worker tasks and the heartbeat that recovers interrupted jobs."""
+        if self._tasks:
+            return
+        purged = await asyncio.to_thread(purge_finished)
+        if purged:
+            logger.info(f"🧵 Job queue: purged {purged} old jobs")
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+        logger.info(f"🧵 Job worker pool started: {self.concurrency} worker(s)")
+
+    async def stop(self) -> None:
+        """Cancel worker tasks and hand in-flight jobs back to the queue."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._wakeup = None
+        released = await asyncio.to_thread(release_owned)
+        self._running.clear()
+        logger.info(f"🧵 Job worker pool stopped ({released} job(s) requeued)")
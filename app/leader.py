@@ -0,0 +1,168 @@
+"""
+Cross-process coordination — named leases in SQLite with expiry and heartbeat.
+
+Every uvicorn worker runs the same lifespan, so singleton work (scheduled
+version checks, backfill) is gated on holding a lease. A lease expires unless
+its owner renews it, so a crashed process is replaced after LEASE_TTL_SECONDS.
+"""
+import asyncio
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+LEASE_DB = Path(os.getenv("LEASE_DB", "data/leases.db"))
+LEASE_TTL_SECONDS = float(os.getenv("LEASE_TTL_SECONDS", "60"))
+
+# Unique per process; the suffix guards against PID reuse across restarts
+OWNER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    acquired_at REAL NOT NULL
+);
+"""
+
+
+# Databases whose schema this process has already created
+_schema_ready: set[Path] = set()
+_schema_lock = threading.Lock()
+
+
+def _connect() -> sqlite3.Connection:
+    LEASE_DB.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(LEASE_DB, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    with _schema_lock:
+        if LEASE_DB not in _schema_ready:
+            conn.executescript(_SCHEMA)
+            _schema_ready.add(LEASE_DB)
+    return conn
+
+
+def try_acquire(name: str, owner: str = OWNER_ID, ttl: float = LEASE_TTL_SECONDS) -> bool:
+    """
+    Acquire or renew a lease. Succeeds if the lease is free, expired, or
+    already held by `owner`; returns whether `owner` holds it afterwards.
+    """
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        now = time.time()
+        row = conn.execute("SELECT owner, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+        if row is not None and row["owner"] != owner and row["expires_at"] > now:
+            conn.execute("COMMIT")
+            return False
+        if row is not None and row["owner"] == owner:
+            conn.execute("UPDATE leases SET expires_at = ? WHERE name = ?", (now + ttl, name))
+        else:
+            conn.execute(
+                "INSERT OR REPLACE INTO leases (name, owner, expires_at, acquired_at) VALUES (?, ?, ?, ?)",
+                (name, owner, now + ttl, now),
+            )
+        conn.execute("COMMIT")
+        return True
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def release(name: str, owner: str = OWNER_ID) -> None:
+    """Release a lease if `owner` holds it."""
+    conn = _connect()
+    try:
+        conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+    finally:
+        conn.close()
+
+
+def current_holder(name: str) -> Optional[str]:
+    """Return the owner of an unexpired lease, or None."""
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT owner FROM leases WHERE name = ? AND expires_at > ?", (name, time.time())
+        ).fetchone()
+        return row["owner"] if row else None
+    finally:
+        conn.close()
+
+
+@asynccontextmanager
+async def hold(name: str, ttl: float = LEASE_TTL_SECONDS) -> AsyncIterator[bool]:
+    """
+    Hold a lease for the duration of the block, renewing it in the background.
+
+    Yields False (and runs nothing extra) if another process holds it. The
+    blocking sqlite calls run in worker threads.
+    """
+    if not await asyncio.to_thread(try_acquire, name, ttl=ttl):
+        yield False
+        return
+
+    async def _heartbeat() -> None:
+        while True:
+            await asyncio.sleep(ttl / 3)
+            if not await asyncio.to_thread(try_acquire, name, ttl=ttl):
+                logger.warning(f"🔒 Lost lease {name}")
+
+    heartbeat = asyncio.create_task(_heartbeat())
+    try:
+        yield True
+    finally:
+        heartbeat.cancel()
+        await asyncio.to_thread(release, name)
+
+
+class LeaderElector:
+    """Keep trying to hold a named lease; `is_leader` tells whether this process has it."""
+
+    def __init__(self, name: str, ttl: float = LEASE_TTL_SECONDS):
+        self.name = name
+        self.ttl = ttl
+        self.is_leader = False
+        self._task: Optional[asyncio.Task] = None
+
+    def heartbeat(self) -> bool:
+        """Acquire or renew the lease once and update `is_leader`."""
+        try:
+            leader = try_acquire(self.name, ttl=self.ttl)
+        except Exception as e:
+            logger.warning(f"🔒 Lease check failed for {self.name}: {e}")
+            leader = False
+        if leader != self.is_leader:
+            logger.info(f"🔒 {OWNER_ID} {'acquired' if leader else 'lost'} leadership of {self.name}")
+        self.is_leader = leader
+        return leader
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.to_thread(self.heartbeat)
+            await asyncio.sleep(self.ttl / 3)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.is_leader:
+            await asyncio.to_thread(release, self.name)
+            self.is_leader = False
@@ -7,7 +7,6 @@ import asyncio
 import logging
 from typing import Any, Dict, List, Tuple
 
-from agents.workflow import run_workflow
 from crawlers.lol_official import LOLOfficialCrawler
 
 logging.basicConfig(level=logging.INFO)
@@ -42,6 +41,13 @@ async def load_raw_content(args, emit=print):
         emit(f"✅ 读取成功: {len(raw_content)} 字符\n")
         return raw_content
 
+    if getattr(args, "url", None):
+        from preview import fetch_preview
+        emit(f"🌐 从 URL 读取: {args.url}")
+        raw_content = await fetch_preview(args.url)
+        emit(f"✅ 读取成功: {len(raw_content)} 字符\n")
+        return raw_content
+
     emit(f"🔍 爬取版本: {args.version}")
     crawler = LOLOfficialCrawler()
     raw_content = await crawler.fetch_patch_notes(version=args.version)
@@ -130,6 +136,49 @@ def display_result(result: Dict[str, Any], version: str, emit=print):
         emit(f"   预估成本: ¥{cost:.4f}")
         emit()
 
+    token_budget = metadata.get("token_budget")
+    if token_budget:
+        emit(f"📊 Token 预算 (单次运行 {token_budget['run_budget']:,}):")
+        for call, entry in token_budget["calls"].items():
+            actual = entry.get("actual_prompt_tokens", "-")
+            line = (
+                f"   {call}: 预算 {entry['budget']:,} / "
+                f"预估输入 {entry['estimated_prompt_tokens']:,} / 实际输入 {actual}"
+            )
+            if entry.get("dropped"):
+                line += f" / 丢弃 {entry['dropped']} 条"
+            emit(line)
+        emit()
+
+    model_usage = metadata.get("model_usage")
+    if model_usage:
+        emit("🧭 模型路由:")
+        for task, model in metadata.get("model_routes", {}).items():
+            emit(f"   {task} -> {model}")
+        for model, stats in model_usage.items():
+            line = (
+                f"   {model}: {stats['calls']} 次 / {stats['latency_seconds']:.2f}s / "
+                f"输入 {stats['prompt_tokens']:,} / 输出 {stats['completion_tokens']:,}"
+            )
+            if stats.get("escalations"):
+                line += f" / 升级 {stats['escalations']} 次"
+            emit(line)
+        emit()
+
+    memory_usage = metadata.get("memory")
+    if memory_usage:
+        ceiling = memory_usage.get("ceiling_mb")
+        emit(f"🧠 内存 (上限 {f'{ceiling:.0f}MB' if ceiling else '未设置'}):")
+        for node, entry in memory_usage["nodes"].items():
+            if entry.get("skipped"):
+                emit(f"   {node}: 跳过 (RSS {entry['rss_mb']}MB)")
+                continue
+            emit(
+                f"   {node}: RSS {entry['rss_mb']}MB (Δ{entry['rss_delta_mb']}) / 峰值 {entry['rss_peak_mb']}MB"
+                f" / tracemalloc 峰值 {entry.get('traced_peak_kb', '-')}KB"
+            )
+        emit()
+
     emit("=" * 70)
     emit("✅ 分析完成")
     emit("=" * 70)
@@ -150,6 +199,16 @@ async def main():
         type=str,
         help='从文件读取公告内容'
     )
+    parser.add_argument(
+        '--url',
+        type=str,
+        help='从网页读取公告内容（如 PBE 预览公告）'
+    )
+    parser.add_argument(
+        '--preview',
+        action='store_true',
+        help='作为预览（PBE）公告分析，结果保存为临时分析，正式公告发布时只重新分析变化部分'
+    )
 
     args = parser.parse_args()
 
@@ -160,13 +219,16 @@ async def main():
 
     # 1. 获取公告内容
     version = args.version
+    if args.preview and (version == "latest" or not (args.file or args.url)):
+        print("❌ --preview 需要指定 --version 以及 --file 或 --url")
+        return
 
     try:
         raw_content = await load_raw_content(args)
     except Exception as e:
-        action = "读取文件" if args.file else "爬取"
+        action = "读取文件" if args.file else "读取网页" if args.url else "爬取"
         print(f"❌ {action}失败: {str(e)}")
-        if not args.file:
+        if not args.file and not args.url:
             print("\n💡 提示: 可以使用 --file 参数指定本地文件")
             print("   例如: --file data/sample_patch_14.24.txt")
         return
@@ -176,7 +238,14 @@ async def main():
     print("-" * 70)
 
     try:
-        result = await run_workflow(raw_content, version=version)
+        if args.preview:
+            from preview import analyze_preview
+            result = await analyze_preview(raw_content, version, source=args.file or args.url)
+            print(f"🧪 已保存为 {version} 的预览分析")
+        else:
+            # Imported only once there is content to analyze: the LLM stack dominates startup
+            from agents.workflow import run_workflow
+            result = await run_workflow(raw_content, version=version)
         display_result(result, version)
 
     except Exception as e:
@@ -0,0 +1,328 @@
+"""
+Notification outbox — durable (version, subscriber) email deliveries in SQLite.
+
+When a new version is analyzed, one row per active subscriber is written in a
+single transaction (duplicates are ignored, so re-triggering never resends).
+A "notify" job drains the rows in batches; each batch is stamped with an
+idempotency key before it is sent, so a batch interrupted by a crash, or one
+whose send failed ambiguously (timeout, 429/5xx), is replayed with the same
+key and Resend delivers it only once.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import uuid
+from collections.abc import Iterable
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_DB = Path(os.getenv("OUTBOX_DB", "data/outbox.db"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "3"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS announcements (
+    version TEXT PRIMARY KEY,
+    requested_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS notifications (
+    version TEXT PRIMARY KEY,
+    summary TEXT NOT NULL,
+    highlights TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    version TEXT NOT NULL,
+    email TEXT NOT NULL,
+    unsubscribe_token TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    batch_key TEXT,
+    message_id TEXT,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    UNIQUE (version, email)
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_version_status ON outbox (version, status, id);
+CREATE INDEX IF NOT EXISTS idx_outbox_batch_key ON outbox (batch_key);
+"""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _connect() -> sqlite3.Connection:
+    OUTBOX_DB.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(OUTBOX_DB, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def request_announcement(version: str) -> None:
+    """Record that subscribers should be emailed about `version` once its analysis is ready."""
+    conn = _connect()
+    try:
+        conn.execute(
+            "INSERT OR IGNORE INTO announcements (version, requested_at) VALUES (?, ?)", (version, _now())
+        )
+    finally:
+        conn.close()
+
+
+def announcement_missing(version: str) -> bool:
+    """True if `version` was requested for announcement but has no notification queued yet."""
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT 1 FROM announcements a LEFT JOIN notifications n ON n.version = a.version "
+            "WHERE a.version = ? AND n.version IS NULL",
+            (version,),
+        ).fetchone()
+        return row is not None
+    finally:
+        conn.close()
+
+
+def enqueue(version: str, summary: str, highlights: list[str], subscribers: Iterable[dict]) -> int:
+    """
+    Record the notification content and one pending row per subscriber in one
+    transaction. `subscribers` is consumed lazily, so a streaming iterator keeps
+    memory flat. Subscribers already queued for `version` are skipped.
+    Returns the number of new rows.
+    """
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        now = _now()
+        conn.execute(
+            "INSERT OR IGNORE INTO notifications (version, summary, highlights, created_at) VALUES (?, ?, ?, ?)",
+            (version, summary, json.dumps(highlights, ensure_ascii=False), now),
+        )
+        cur = conn.executemany(
+            "INSERT OR IGNORE INTO outbox (version, email, unsubscribe_token, status, created_at, updated_at) "
+            "VALUES (?, ?, ?, 'pending', ?, ?)",
+            ((version, sub["email"], sub["unsubscribe_token"], now, now) for sub in subscribers),
+        )
+        conn.execute("COMMIT")
+        return cur.rowcount
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def get_notification(version: str) -> Optional[dict]:
+    """Return the summary and highlights recorded for `version`, or None."""
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT * FROM notifications WHERE version = ?", (version,)).fetchone()
+        if row is None:
+            return None
+        return {"version": row["version"], "summary": row["summary"], "highlights": json.loads(row["highlights"])}
+    finally:
+        conn.close()
+
+
+def reclaim_interrupted(version: str) -> list[tuple[str, list[dict]]]:
+    """
+    Batches left in 'sending' (by a process that died mid-send, or after an
+    ambiguous failure) with their original keys; each replay counts as an attempt.
+    """
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "UPDATE outbox SET attempts = attempts + 1, updated_at = ? WHERE version = ? AND status = 'sending'",
+            (_now(), version),
+        )
+        rows = conn.execute(
+            "SELECT * FROM outbox WHERE version = ? AND status = 'sending' ORDER BY batch_key, id", (version,)
+        ).fetchall()
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    batches: dict[str, list[dict]] = {}
+    for row in rows:
+        batches.setdefault(row["batch_key"], []).append(dict(row))
+    return list(batches.items())
+
+
+def claim_batch(version: str, limit: int, after_id: int = 0) -> tuple[Optional[str], list[dict]]:
+    """
+    Move up to `limit` pending rows with id > after_id to 'sending' under a new
+    idempotency key. Returns (batch_key, rows); (None, []) when nothing is left.
+    """
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        rows = conn.execute(
+            "SELECT * FROM outbox WHERE version = ? AND status = 'pending' AND id > ? ORDER BY id LIMIT ?",
+            (version, after_id, limit),
+        ).fetchall()
+        if not rows:
+            conn.execute("COMMIT")
+            return None, []
+        batch_key = f"patch-{version}-{uuid.uuid4().hex}"
+        conn.executemany(
+            "UPDATE outbox SET status = 'sending', batch_key = ?, attempts = attempts + 1, updated_at = ? "
+            "WHERE id = ?",
+            [(batch_key, _now(), row["id"]) for row in rows],
+        )
+        claimed = conn.execute("SELECT * FROM outbox WHERE batch_key = ? ORDER BY id", (batch_key,)).fetchall()
+        conn.execute("COMMIT")
+        return batch_key, [dict(row) for row in claimed]
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def record_results(rows: list[dict], results: list[dict]) -> tuple[int, int]:
+    """
+    Store per-message outcomes of a batch: sent rows get their message id.
+    Until OUTBOX_MAX_ATTEMPTS, rows of an ambiguous failure ("retryable") stay
+    'sending' under their batch key so the replay is deduplicated, and rejected
+    rows go back to pending for a new batch. Returns (sent, failed).
+    """
+    sent = failed = 0
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        now = _now()
+        for row, outcome in zip(rows, results):
+            if outcome.get("id"):
+                conn.execute(
+                    "UPDATE outbox SET status = 'sent', message_id = ?, error = NULL, updated_at = ? WHERE id = ?",
+                    (outcome["id"], now, row["id"]),
+                )
+                sent += 1
+            elif row["attempts"] < OUTBOX_MAX_ATTEMPTS and outcome.get("retryable"):
+                conn.execute(
+                    "UPDATE outbox SET status = 'sending', error = ?, updated_at = ? WHERE id = ?",
+                    (outcome.get("error"), now, row["id"]),
+                )
+                failed += 1
+            else:
+                status = "failed" if row["attempts"] >= OUTBOX_MAX_ATTEMPTS else "pending"
+                conn.execute(
+                    "UPDATE outbox SET status = ?, batch_key = NULL, error = ?, updated_at = ? WHERE id = ?",
+                    (status, outcome.get("error"), now, row["id"]),
+                )
+                failed += 1
+        conn.execute("COMMIT")
+        return sent, failed
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def counts(version: str) -> dict[str, int]:
+    """Row counts per status for `version`."""
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT status, COUNT(*) AS n FROM outbox WHERE version = ? GROUP BY status", (version,)
+        ).fetchall()
+        return {row["status"]: row["n"] for row in rows}
+    finally:
+        conn.close()
+
+
+async def deliver(version: str) -> dict:
+    """
+    Drain the outbox for `version`: replay interrupted batches with their
+    original idempotency keys, then send pending rows in RESEND_BATCH_SIZE
+    batches through EMAIL_CONCURRENCY workers. Each pending row is tried at
+    most once per call; raises if retryable rows remain so the job is retried
+    with backoff.
+    """
+    resend_key = os.getenv("RESEND_API_KEY")
+    from_email = os.getenv("EMAIL_FROM")
+    app_base_url = os.getenv("APP_BASE_URL")
+    if not all([resend_key, from_email, app_base_url]):
+        logger.info("Email not configured, leaving outbox untouched")
+        return counts(version)
+
+    from email_client import EMAIL_CONCURRENCY, RESEND_BATCH_SIZE, ResendEmailClient
+    from email_template import PatchEmailTemplate
+
+    notification = get_notification(version)
+    if notification is None:
+        logger.info(f"No notification queued for v{version}")
+        return {}
+
+    # Render once per run; each recipient only gets its unsubscribe URL spliced in
+    template = PatchEmailTemplate(version, notification["summary"], notification["highlights"], app_base_url)
+
+    def _message(row: dict) -> dict:
+        email = template.render(f"{app_base_url}/api/unsubscribe?token={row['unsubscribe_token']}")
+        return {
+            "from_addr": from_email,
+            "to": row["email"],
+            "subject": email["subject"],
+            "html": email["html"],
+            "text": email["text"],
+            "headers": email.get("headers"),
+        }
+
+    async def _send(client: "ResendEmailClient", batch_key: str, rows: list[dict]) -> None:
+        try:
+            results = await client.send_batch([_message(row) for row in rows], idempotency_key=batch_key)
+        except Exception as e:
+            # Timeouts and connection errors: Resend may have accepted the batch
+            results = [{"error": str(e), "retryable": True} for _ in rows]
+        sent, failed = record_results(rows, results)
+        if failed:
+            logger.warning(f"📧 {failed}/{len(rows)} emails in batch {batch_key} failed")
+
+    cursor = 0
+
+    async def _worker(client: "ResendEmailClient") -> None:
+        nonlocal cursor
+        while True:
+            batch_key, rows = claim_batch(version, RESEND_BATCH_SIZE, after_id=cursor)
+            if not rows:
+                return
+            cursor = max(cursor, rows[-1]["id"])
+            await _send(client, batch_key, rows)
+
+    async with ResendEmailClient(resend_key) as client:
+        for batch_key, rows in reclaim_interrupted(version):
+            logger.info(f"📧 Resuming interrupted batch {batch_key} ({len(rows)} emails)")
+            await _send(client, batch_key, rows)
+        await asyncio.gather(*(_worker(client) for _ in range(EMAIL_CONCURRENCY)))
+
+    result = counts(version)
+    logger.info(f"📧 Outbox for v{version}: {result}")
+    undelivered = result.get("pending", 0) + result.get("sending", 0)
+    if undelivered:
+        raise RuntimeError(f"{undelivered} notification emails for v{version} still pending")
+    return result
+
+
+def undelivered_versions() -> list[str]:
+    """Versions that still have rows waiting to be sent or replayed."""
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT DISTINCT version FROM outbox WHERE status IN ('pending', 'sending') ORDER BY version"
+        ).fetchall()
+        return [row["version"] for row in rows]
+    finally:
+        conn.close()
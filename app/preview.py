@@ -0,0 +1,264 @@
+"""
+Speculative pre-analysis from patch previews (PBE notes).
+
+Preview notes are analyzed days before release and stored as a provisional
+report in PROVISIONAL_DIR/<version>.json, next to a hash of the preview text.
+When the live notes for that version arrive, analyze_release() starts from
+the provisional report:
+
+- identical text: the provisional report is promoted without any LLM call;
+- otherwise the extractor runs on the live notes, and only the changes that
+  differ from the preview (new or edited entries) go through the analyzer.
+  "Differ" is judged on the source text of each champion/item section, not
+  on the LLM's wording, which varies between extractions.
+  Their analyses replace the provisional ones and the summarizer
+  re-aggregates the merged set.
+"""
+import hashlib
+import json
+import logging
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from agents import memory
+
+logger = logging.getLogger(__name__)
+
+PROVISIONAL_DIR = Path("data/cache/provisional")
+_RESULT_KEYS = ("version", "top_lane_changes", "impact_analyses", "summary_report", "metadata")
+
+
+def _workflow():
+    # The LLM stack is imported on first analysis so that reading provisional
+    # reports (GET /api/previews) stays cheap
+    from agents import workflow
+    return workflow
+
+
+def content_hash(raw_content: str) -> str:
+    return hashlib.sha256(raw_content.strip().encode("utf-8")).hexdigest()
+
+
+def _provisional_file(version: str) -> Path:
+    return PROVISIONAL_DIR / f"{version}.json"
+
+
+def save_provisional(version: str, raw_content: str, result: Dict[str, Any], source: str) -> Dict[str, Any]:
+    """Store a provisional analysis for `version`, replacing any earlier one."""
+    record = {
+        "version": version,
+        "source": source,
+        "content_hash": content_hash(raw_content),
+        "raw_content": raw_content,  # kept to diff section texts against the live notes
+        "analyzed_at": datetime.now(timezone.utc).isoformat(),
+        "result": {key: result.get(key) for key in _RESULT_KEYS},
+    }
+    PROVISIONAL_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = _provisional_file(version).with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(record, f, ensure_ascii=False)
+    tmp.replace(_provisional_file(version))
+    logger.info(f"🧪 预览分析已保存: {version} ({source})")
+    return record
+
+
+def load_provisional(version: str) -> Optional[Dict[str, Any]]:
+    """Return the provisional record for `version`, or None."""
+    path = _provisional_file(version)
+    if version in ("latest", "unknown") or not path.exists():
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"读取预览分析失败 {version}: {e}")
+        return None
+
+
+def discard_provisional(version: str) -> None:
+    _provisional_file(version).unlink(missing_ok=True)
+
+
+async def fetch_preview(url: str) -> str:
+    """Fetch a preview page and return its text (article body when present)."""
+    import httpx
+    from bs4 import BeautifulSoup
+
+    async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
+        resp = await client.get(url)
+        resp.raise_for_status()
+    soup = BeautifulSoup(resp.text, "html.parser")
+    node = soup.find("article") or soup.find("div", class_="article") or soup.body or soup
+    return node.get_text(separator="\n", strip=True)
+
+
+async def analyze_preview(raw_content: str, version: str, source: str = "manual") -> Dict[str, Any]:
+    """Run the full workflow on preview notes and store the result as provisional."""
+    logger.info(f"🧪 开始预览分析: {version} ({len(raw_content)} 字符)")
+    result = await _workflow().run_workflow(raw_content, version=version)
+    save_provisional(version, raw_content, result, source)
+    return result
+
+
+# ==================== Live release ====================
+
+def change_key(change: Dict[str, Any]) -> tuple:
+    """Identity of an extracted change: its type plus champion, item or category."""
+    kind = change.get("type")
+    name = change.get("champion") or change.get("item") or change.get("category")
+    return kind, name
+
+
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+
+def _structured_fingerprint(change: Dict[str, Any]) -> str:
+    """Stable fields only: type, name, change_type and the numbers quoted in the change."""
+    kind, name = change_key(change)
+    text = json.dumps(change.get("details") if kind == "champion" else change.get("change"), ensure_ascii=False)
+    return json.dumps([kind, name, change.get("change_type"), sorted(_NUMBER.findall(text))], ensure_ascii=False)
+
+
+def source_sections(raw_content: str, names: set) -> Dict[str, str]:
+    """
+    Hash of the patch-note lines belonging to each name: a line mentioning a
+    name starts its section, and following lines without a name stay in it.
+    """
+    sections: Dict[str, list] = {}
+    owners: list = []
+    for line in raw_content.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        mentioned = [name for name in names if name in line]
+        if mentioned:
+            owners = mentioned
+        for name in owners:
+            sections.setdefault(name, []).append(line)
+    return {name: hashlib.sha256("\n".join(lines).encode("utf-8")).hexdigest() for name, lines in sections.items()}
+
+
+def diff_changes(
+    preview_changes: list, live_changes: list, preview_raw: Optional[str] = None, live_raw: Optional[str] = None
+) -> tuple[list, set]:
+    """
+    Compare extracted changes. Returns (changed, stale): live entries that are
+    new or differ from the preview, and champion names whose provisional
+    analysis must be dropped (edited or no longer in the live notes).
+
+    With both note texts, an entry whose section is found in both is compared
+    on that text; otherwise on its structured fields. The LLM's free-text
+    wording never counts on its own.
+    """
+    names = {name for kind, name in map(change_key, [*preview_changes, *live_changes]) if kind != "system" and name}
+    both = bool(preview_raw and live_raw)
+    preview_sections = source_sections(preview_raw, names) if both else {}
+    live_sections = source_sections(live_raw, names) if both else {}
+
+    def differs(live: Dict[str, Any], preview: Optional[Dict[str, Any]]) -> bool:
+        if preview is None:
+            return True
+        name = change_key(live)[1]
+        if name in preview_sections and name in live_sections:
+            return preview_sections[name] != live_sections[name]
+        return _structured_fingerprint(preview) != _structured_fingerprint(live)
+
+    preview_by_key = {change_key(c): c for c in preview_changes}
+    live_keys = {change_key(c) for c in live_changes}
+
+    changed = [c for c in live_changes if differs(c, preview_by_key.get(change_key(c)))]
+    stale = {c.get("champion") for c in changed if c.get("type") == "champion"}
+    stale |= {name for kind, name in preview_by_key if kind == "champion" and (kind, name) not in live_keys}
+    return changed, stale
+
+
+def _merge_meta_overview(old: Dict[str, Any], new: Dict[str, Any], stale: set) -> Dict[str, Any]:
+    merged = dict(old or {})
+    for key, value in (new or {}).items():
+        if isinstance(value, list):
+            kept = [name for name in merged.get(key) or [] if name not in stale and name not in value]
+            merged[key] = kept + value
+        elif value:
+            merged[key] = value
+    return merged
+
+
+def merge_analyses(base: list, fresh: list, stale: set, version: str) -> list:
+    """Provisional champion analyses minus `stale`, plus the fresh ones (fresh wins)."""
+    base_entry = (base or [{}])[0]
+    fresh_entry = (fresh or [{}])[0]
+    fresh_analyses = fresh_entry.get("champion_analyses") or []
+    replaced = stale | {a.get("champion") for a in fresh_analyses}
+    kept = [a for a in base_entry.get("champion_analyses") or [] if a.get("champion") not in replaced]
+    return [{
+        "champion_analyses": kept + fresh_analyses,
+        "meta_overview": _merge_meta_overview(base_entry.get("meta_overview"), fresh_entry.get("meta_overview"), stale),
+        "analysis_timestamp": version,
+    }]
+
+
+def _raise_on_error(state: Dict[str, Any]) -> None:
+    if state.get("error"):
+        raise ValueError(state["error"])
+
+
+async def _reanalyze_changed(
+    raw_content: str, version: str, base: Dict[str, Any], preview_raw: Optional[str] = None
+) -> Dict[str, Any]:
+    workflow = _workflow()
+    extract = memory.track("extractor", workflow.extractor_node)
+    state = await extract(workflow.build_initial_state(raw_content, version))
+    _raise_on_error(state)
+    live_changes = state.get("top_lane_changes") or []
+    changed, stale = diff_changes(base.get("top_lane_changes") or [], live_changes, preview_raw, raw_content)
+    metadata = state.get("metadata") or {}
+    state = {**state, "metadata": metadata}
+    metadata["preview"] = {"mode": "incremental", "reanalyzed": len(changed), "stale": sorted(stale)}
+
+    if not changed and not stale:
+        # The text moved but no top-lane change did: the provisional report stands
+        metadata["preview"]["mode"] = "unchanged_changes"
+        return {**base, "version": version, "metadata": {**(base.get("metadata") or {}), **metadata}}
+
+    logger.info(f"🧪 重新分析 {len(changed)} 个变更，复用其余预览分析（失效英雄: {sorted(stale)}）")
+    fresh: list = []
+    if changed:
+        state = await workflow.create_analysis_workflow().ainvoke({**state, "top_lane_changes": changed})
+        _raise_on_error(state)
+        fresh = memory.load(state.get("impact_analyses")) or []
+
+    state = await memory.track("summarizer", workflow.summarizer_node)({
+        **state,
+        "top_lane_changes": live_changes,
+        "impact_analyses": merge_analyses(base.get("impact_analyses"), fresh, stale, version),
+        "messages": [],
+    })
+    _raise_on_error(state)
+    return memory.materialize(state)
+
+
+async def analyze_release(
+    raw_content: str, version: str, provisional: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Analyze live patch notes, reusing the provisional analysis for `version`
+    when there is one; without it this is a plain workflow run.
+    """
+    provisional = provisional or load_provisional(version)
+    if provisional is None:
+        return await _workflow().run_workflow(raw_content, version=version)
+
+    base = provisional["result"]
+    if provisional.get("content_hash") == content_hash(raw_content):
+        logger.info(f"🧪 正式公告与预览一致，直接采用预览分析: {version}")
+        metadata = {**(base.get("metadata") or {}), "preview": {"mode": "promoted", "reanalyzed": 0}}
+        result = {**base, "version": version, "metadata": metadata}
+    else:
+        with memory.run_scope():  # removes this run's spill files, however it ends
+            result = await _reanalyze_changed(raw_content, version, base, provisional.get("raw_content"))
+
+    result["metadata"]["preview"].update(source=provisional.get("source"), analyzed_at=provisional.get("analyzed_at"))
+    discard_provisional(version)
+    return result
@@ -0,0 +1,116 @@
+"""
+Version diff — compare two stored summary reports and return a compact delta.
+"""
+from typing import Any, Dict, List, Optional
+
+TIER_ORDER = ["S", "A", "B", "C", "D"]
+
+
+def _tier_rank(tier: Optional[str]) -> Optional[float]:
+    """Numeric rank for a tier label (higher is stronger); "B+" ranks just above "B"."""
+    if not tier or tier[0] not in TIER_ORDER:
+        return None
+    rank = float(len(TIER_ORDER) - TIER_ORDER.index(tier[0]))
+    if tier.endswith("+"):
+        rank += 0.3
+    elif tier.endswith("-"):
+        rank -= 0.3
+    return rank
+
+
+def _tier_entries(report: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Map champion name -> tier_list entry."""
+    entries = {}
+    for tier, champions in (report.get("tier_list") or {}).items():
+        for champ in champions:
+            if isinstance(champ, dict) and champ.get("champion"):
+                entries[champ["champion"]] = {
+                    "tier": champ.get("tier", tier),
+                    "strength_score": champ.get("strength_score"),
+                }
+    return entries
+
+
+def _build_items(report: Dict[str, Any]) -> Dict[str, set]:
+    """Map champion name -> set of core and situational items across all recommended builds."""
+    items: Dict[str, set] = {}
+    for detail in report.get("champion_details") or []:
+        champion = detail.get("champion")
+        if not champion:
+            continue
+        pool = items.setdefault(champion, set())
+        for build in detail.get("recommended_builds") or []:
+            pool.update(build.get("core_items") or [])
+            pool.update(build.get("situational") or [])
+    return items
+
+
+def _matchups(entries: List[Any]) -> set:
+    return {e["champion"] if isinstance(e, dict) else str(e) for e in entries or []}
+
+
+def _set_delta(old: set, new: set) -> Optional[Dict[str, List[str]]]:
+    added, removed = sorted(new - old), sorted(old - new)
+    if not added and not removed:
+        return None
+    return {"added": added, "removed": removed}
+
+
+def diff_summary_reports(from_report: Dict[str, Any], to_report: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compute tier movements, new/removed champions, build changes and
+    counter-matrix deltas between two summary_report dicts.
+    """
+    old_tiers, new_tiers = _tier_entries(from_report), _tier_entries(to_report)
+
+    tier_changes = []
+    for champion in sorted(old_tiers.keys() & new_tiers.keys()):
+        old, new = old_tiers[champion], new_tiers[champion]
+        if old == new:
+            continue
+        old_rank, new_rank = _tier_rank(old["tier"]), _tier_rank(new["tier"])
+        if old_rank is not None and new_rank is not None and old_rank != new_rank:
+            direction = "up" if new_rank > old_rank else "down"
+        else:
+            direction = "same"
+        tier_changes.append({
+            "champion": champion,
+            "from_tier": old["tier"],
+            "to_tier": new["tier"],
+            "from_score": old["strength_score"],
+            "to_score": new["strength_score"],
+            "direction": direction,
+        })
+
+    new_champions = [{"champion": c, **new_tiers[c]} for c in sorted(new_tiers.keys() - old_tiers.keys())]
+    removed_champions = [{"champion": c, **old_tiers[c]} for c in sorted(old_tiers.keys() - new_tiers.keys())]
+
+    old_builds, new_builds = _build_items(from_report), _build_items(to_report)
+    build_changes = {}
+    for champion in sorted(old_builds.keys() & new_builds.keys()):
+        delta = _set_delta(old_builds[champion], new_builds[champion])
+        if delta:
+            build_changes[champion] = delta
+
+    old_matrix = from_report.get("counter_matrix") or {}
+    new_matrix = to_report.get("counter_matrix") or {}
+    counter_changes = {}
+    for champion in sorted(old_matrix.keys() & new_matrix.keys()):
+        champion_delta = {}
+        for relation in ("counters", "countered_by"):
+            delta = _set_delta(
+                _matchups(old_matrix[champion].get(relation)),
+                _matchups(new_matrix[champion].get(relation)),
+            )
+            if delta:
+                champion_delta[relation] = delta
+        if champion_delta:
+            counter_changes[champion] = champion_delta
+
+    return {
+        "tier_changes": tier_changes,
+        "new_champions": new_champions,
+        "removed_champions": removed_champions,
+        "build_changes": build_changes,
+        "counter_changes": counter_changes,
+    }
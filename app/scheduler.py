@@ -1,83 +1,269 @@
 """
-Scheduled version check — periodically polls for new LOL patch notes,
-runs the analysis pipeline when a new version is detected, and saves results.
+Scheduled version check — periodically polls for new LOL patch notes and
+queues an analysis job (which also notifies subscribers) when a new version is detected.
+
+Polling is adaptive: the release cadence is learned from `analyzed_at` in the
+version index, so checks are rare far from the expected release and frequent
+inside the release window, with jitter and exponential backoff on errors.
 """
 import logging
 import os
+import random
+import statistics
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from crawlers.lol_official import LOLOfficialCrawler
+from leader import LeaderElector, hold
 
 logger = logging.getLogger(__name__)
 
 _scheduler: AsyncIOScheduler | None = None
 
+# Steady interval used without cadence history, and once a release is overdue
 CHECK_INTERVAL_SECONDS = int(os.getenv("CHECK_INTERVAL_SECONDS", "3600"))
+MIN_CHECK_INTERVAL_SECONDS = int(os.getenv("MIN_CHECK_INTERVAL_SECONDS", "60"))
+MAX_CHECK_INTERVAL_SECONDS = int(os.getenv("MAX_CHECK_INTERVAL_SECONDS", "21600"))
+# Inside the window the interval ramps from RELEASE_EDGE_INTERVAL_SECONDS at its
+# edges down to MIN_CHECK_INTERVAL_SECONDS at the expected release time
+RELEASE_WINDOW_SECONDS = int(os.getenv("RELEASE_WINDOW_SECONDS", "10800"))
+RELEASE_EDGE_INTERVAL_SECONDS = int(os.getenv("RELEASE_EDGE_INTERVAL_SECONDS", "600"))
+CHECK_JITTER_RATIO = 0.1
+DEFAULT_RELEASE_CADENCE = timedelta(days=14)
+# Gaps shorter than this come from backfill or re-analysis, not real releases
+MIN_RELEASE_GAP = timedelta(days=3)
+
+_consecutive_errors = 0
+
+# Only the process holding this lease runs scheduled checks; every worker still serves reads
+leader_elector = LeaderElector("scheduler")
 
 
 async def check_for_new_version() -> dict:
     """
     Check the LOL official site for a new patch version.
-    If a new version is detected, run the full analysis pipeline.
+    If a new version is detected, queue an "analyze" job for it on the worker pool.
 
     Returns a dict describing what happened:
-      {"status": "new", "version": "26.5"} or {"status": "unchanged"}
+      {"status": "new", "version": "26.5", "job_id": "..."} or {"status": "unchanged"}
     """
     # Import here to avoid circular import (api imports workflow, scheduler imports api)
-    from agents.workflow import run_workflow
-    from api import load_versions_index, save_analysis_to_cache
+    from api import _start_analysis_job, load_versions_index, remember_latest_version
 
     logger.info("🔍 Checking for new patch version...")
 
     try:
         crawler = LOLOfficialCrawler()
-        raw_content, detected_version = await crawler.fetch_latest_patch_notes()
-
         index = load_versions_index()
         current_latest = index.get("latest")
 
+        # Cheap probe: stream the news list only until the first patch link
+        _, probed_version = await crawler.probe_latest_version()
+        remember_latest_version(probed_version)
+        if probed_version == current_latest:
+            logger.info(f"✅ No new version (current: {current_latest})")
+            _notify_if_missing(current_latest)
+            return {"status": "unchanged", "version": current_latest}
+
+        # Version changed (or probe inconclusive): do the full list + article fetch
+        raw_content, detected_version = await crawler.fetch_latest_patch_notes()
+        remember_latest_version(detected_version)
         if detected_version == current_latest:
             logger.info(f"✅ No new version (current: {current_latest})")
+            _notify_if_missing(current_latest)
             return {"status": "unchanged", "version": current_latest}
 
         logger.info(f"🆕 New version detected: {detected_version} (was: {current_latest})")
 
-        # Run full analysis pipeline (lesson: do NOT hold file locks during this)
-        result = await run_workflow(raw_content, version=detected_version)
-
-        # Save to cache + update version index (short file I/O only)
-        save_analysis_to_cache(detected_version, result)
-
-        # Send email notifications to subscribers
-        await _send_patch_notifications(detected_version, result)
-
-        logger.info(f"✅ New version {detected_version} analyzed and cached")
-        return {"status": "new", "version": detected_version}
+        # Analyze on the worker pool, deduplicated per version with /api/analyze; the job
+        # queues email notifications before caching, so a failed run is retried by the next poll.
+        # The announcement lets later polls recover the emails if another job analyzed it first
+        import outbox
+        outbox.request_announcement(detected_version)
+        job = _start_analysis_job(detected_version, raw_content, notify=True)
+        return {"status": "new", "version": detected_version, "job_id": job["job_id"]}
 
     except Exception as e:
         logger.error(f"❌ Version check failed: {e}")
         return {"status": "error", "error": str(e)}
 
 
-async def _send_patch_notifications(version: str, result: dict) -> None:
-    """Send email notifications to all active subscribers."""
-    resend_key = os.getenv("RESEND_API_KEY")
-    from_email = os.getenv("EMAIL_FROM")
-    app_base_url = os.getenv("APP_BASE_URL")
+async def run_exclusive_check() -> dict:
+    """Run check_for_new_version unless another process is already running one."""
+    async with hold("check_for_new_version") as acquired:
+        if not acquired:
+            logger.info("Version check already running in another process")
+            return {"status": "busy"}
+        return await check_for_new_version()
 
-    if not all([resend_key, from_email, app_base_url]):
-        logger.info("Email not configured, skipping notifications")
+
+def release_times(versions: list[dict]) -> list[datetime]:
+    """
+    Release times from `analyzed_at` history, oldest first. An entry within
+    MIN_RELEASE_GAP of the previous release is a backfill or re-analysis and
+    is skipped.
+    """
+    times = []
+    for entry in versions:
+        try:
+            times.append(datetime.fromisoformat(entry["analyzed_at"]))
+        except (KeyError, TypeError, ValueError):
+            continue
+
+    releases: list[datetime] = []
+    for at in sorted(times):
+        if not releases or at - releases[-1] >= MIN_RELEASE_GAP:
+            releases.append(at)
+    return releases
+
+
+def estimate_next_release(versions: list[dict]) -> Optional[datetime]:
+    """
+    Estimate the next release time: the last real release plus the median
+    gap between releases (default two weeks).
+    """
+    releases = release_times(versions)
+    if not releases:
+        return None
+    gaps = [later - earlier for earlier, later in zip(releases, releases[1:])]
+    cadence = statistics.median(gaps) if gaps else DEFAULT_RELEASE_CADENCE
+    return releases[-1] + cadence
+
+
+def compute_next_check_delay(
+    versions: list[dict],
+    now: Optional[datetime] = None,
+    consecutive_errors: int = 0,
+    rng: random.Random = random,
+) -> float:
+    """
+    Seconds until the next version check.
+
+    Inside the release window the interval ramps linearly from
+    RELEASE_EDGE_INTERVAL_SECONDS at the edges to MIN_CHECK_INTERVAL_SECONDS at
+    the expected time; before it, sleep until the window opens (capped at
+    MAX_CHECK_INTERVAL_SECONDS); once the release is overdue fall back to
+    CHECK_INTERVAL_SECONDS. Over a cycle this stays below fixed hourly polling.
+    Errors back off exponentially and every delay gets ±CHECK_JITTER_RATIO jitter.
+    """
+    now = now or datetime.now(timezone.utc)
+    expected = estimate_next_release(versions)
+
+    if expected is None:
+        delay = CHECK_INTERVAL_SECONDS
+    else:
+        until_release = (expected - now).total_seconds()
+        if abs(until_release) <= RELEASE_WINDOW_SECONDS:
+            ramp = abs(until_release) / RELEASE_WINDOW_SECONDS
+            delay = MIN_CHECK_INTERVAL_SECONDS + (RELEASE_EDGE_INTERVAL_SECONDS - MIN_CHECK_INTERVAL_SECONDS) * ramp
+        elif until_release > 0:
+            delay = min(MAX_CHECK_INTERVAL_SECONDS, until_release - RELEASE_WINDOW_SECONDS)
+        else:
+            delay = CHECK_INTERVAL_SECONDS
+
+    if consecutive_errors:
+        delay = max(delay, MIN_CHECK_INTERVAL_SECONDS * 2 ** consecutive_errors)
+
+    delay = min(MAX_CHECK_INTERVAL_SECONDS, max(MIN_CHECK_INTERVAL_SECONDS, delay))
+    return delay * (1 + rng.uniform(-CHECK_JITTER_RATIO, CHECK_JITTER_RATIO))
+
+
+def _schedule_next_check() -> None:
+    """(Re)schedule the single one-shot check job based on the current cadence estimate."""
+    from api import load_versions_index
+
+    if _scheduler is None:
+        return
+    delay = compute_next_check_delay(
+        load_versions_index().get("versions", []),
+        consecutive_errors=_consecutive_errors,
+    )
+    _scheduler.add_job(
+        _scheduled_check,
+        "date",
+        run_date=datetime.now(timezone.utc) + timedelta(seconds=delay),
+        id="check_new_version",
+        name="Check for new LOL patch version",
+        replace_existing=True,
+    )
+    logger.info(f"📅 Next version check in {delay:.0f}s")
+
+
+async def _scheduled_check() -> None:
+    """Scheduler entry point: only the elected leader polls the official site."""
+    global _consecutive_errors
+    try:
+        if not leader_elector.is_leader:
+            logger.info("Not the scheduler leader, skipping version check")
+            return
+        result = await run_exclusive_check()
+        if result.get("status") == "error":
+            _consecutive_errors += 1
+        elif result.get("status") != "busy":
+            _consecutive_errors = 0
+        _requeue_undelivered_notifications()
+    finally:
+        _schedule_next_check()
+
+
+def _email_configured() -> bool:
+    return all(os.getenv(name) for name in ("RESEND_API_KEY", "EMAIL_FROM", "APP_BASE_URL"))
+
+
+def _notify_if_missing(version: Optional[str]) -> None:
+    """
+    Queue notifications for a cached release the scheduler asked to announce
+    but that has none, e.g. when an /api/analyze job (which does not notify)
+    analyzed it first. Versions never requested for announcement (emailed
+    before announcements were recorded, backfilled, analyzed via the API) are left alone.
+    """
+    if not version or not _email_configured():
+        return
+
+    import outbox
+    from api import get_cached_analysis
+
+    if not outbox.announcement_missing(version):
         return
+    result = get_cached_analysis(version)
+    if result is not None:
+        _queue_patch_notifications(version, result)
 
-    from email_client import ResendEmailClient
-    from email_template import render_patch_email
-    from subscribers import list_active
 
-    active = list_active()
-    if not active:
-        logger.info("No active subscribers, skipping notifications")
+def _requeue_undelivered_notifications() -> None:
+    """
+    Queue a "notify" job for every version with emails still pending, e.g.
+    after its job used up MAX_JOB_ATTEMPTS (active jobs are deduplicated).
+    """
+    if not _email_configured():
         return
 
+    import jobs
+    import outbox
+    from api import job_pool
+
+    try:
+        for version in outbox.undelivered_versions():
+            job, created = jobs.enqueue("notify", version)
+            if created:
+                job_pool.notify()
+                logger.info(f"📧 Re-queued undelivered notifications for v{version} (job {job['id']})")
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to re-queue notifications: {e}")
+
+
+def _queue_patch_notifications(version: str, result: dict) -> None:
+    """Write one outbox row per active subscriber and queue a "notify" job to deliver them."""
+    if not _email_configured():
+        logger.info("Email not configured, skipping notifications")
+        return
+
+    import jobs
+    import outbox
+    from api import job_pool
+    from subscribers import iter_active
+
     # Extract summary and tier highlights from result
     summary_report = result.get("summary_report") or {}
     summary_text = summary_report.get("executive_summary", f"Patch {version} analysis is ready.")
@@ -90,25 +276,16 @@ async def _send_patch_notifications(version: str, result: dict) -> None:
     if not highlights:
         highlights = ["View the full analysis for details"]
 
-    client = ResendEmailClient(resend_key)
-    sent_count = 0
-    for sub in active:
-        try:
-            unsub_url = f"{app_base_url}/api/unsubscribe?token={sub['unsubscribe_token']}"
-            email = render_patch_email(version, summary_text, highlights, app_base_url, unsub_url)
-            await client.send_email(
-                from_addr=from_email,
-                to=sub["email"],
-                subject=email["subject"],
-                html=email["html"],
-                text=email["text"],
-                headers=email.get("headers"),
-            )
-            sent_count += 1
-        except Exception as e:
-            logger.warning(f"Failed to send email to {sub['email']}: {e}")
-
-    logger.info(f"📧 Sent {sent_count}/{len(active)} notification emails for v{version}")
+    # Subscribers stream from the store straight into the outbox insert, page by page
+    queued = outbox.enqueue(version, summary_text, highlights, iter_active())
+    # Rows left pending by an earlier attempt still need a delivery job
+    if not outbox.counts(version).get("pending"):
+        logger.info("No active subscribers to notify, skipping notifications")
+        return
+    job, created = jobs.enqueue("notify", version)
+    if created:
+        job_pool.notify()
+    logger.info(f"📧 Queued {queued} notification emails for v{version} (job {job['id']})")
 
 
 def start_scheduler() -> None:
@@ -118,15 +295,9 @@ def start_scheduler() -> None:
         return
 
     _scheduler = AsyncIOScheduler()
-    _scheduler.add_job(
-        check_for_new_version,
-        "interval",
-        seconds=CHECK_INTERVAL_SECONDS,
-        id="check_new_version",
-        name="Check for new LOL patch version",
-    )
+    _schedule_next_check()
     _scheduler.start()
-    logger.info(f"📅 Scheduler started: checking every {CHECK_INTERVAL_SECONDS}s")
+    logger.info("📅 Scheduler started (adaptive polling)")
 
 
 def stop_scheduler() -> None:
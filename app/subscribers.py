@@ -1,33 +1,115 @@
 """
-Subscriber management — JSON file-based storage for MVP.
+Subscriber management — SQLite storage with unique email and token indexes.
+
+Subscribe/unsubscribe are single indexed lookups inside a transaction, so they
+stay O(log n) and concurrent requests cannot lose each other's updates. The
+legacy JSON file is imported once when the database is first created.
 """
 import json
 import logging
+import os
+import re
 import secrets
+import sqlite3
+from collections.abc import Iterable, Iterator
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
 
 logger = logging.getLogger(__name__)
 
+SUBSCRIBERS_DB = Path(os.getenv("SUBSCRIBERS_DB", "data/subscribers.db"))
+# Legacy MVP storage, migrated into SUBSCRIBERS_DB on first use
 SUBSCRIBERS_FILE = Path("data/subscribers.json")
+SUBSCRIBER_PAGE_SIZE = int(os.getenv("SUBSCRIBER_PAGE_SIZE", "500"))
+
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+_SCHEMA_VERSION = 1
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscribers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email TEXT NOT NULL,
+    status TEXT NOT NULL,
+    unsubscribe_token TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_subscribers_email ON subscribers (email);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_subscribers_token ON subscribers (unsubscribe_token);
+CREATE INDEX IF NOT EXISTS idx_subscribers_status ON subscribers (status, id);
+"""
+
+_COLUMNS = "email, status, unsubscribe_token, created_at, updated_at"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
 
 
-def _load() -> list[dict]:
+def _connect() -> sqlite3.Connection:
+    SUBSCRIBERS_DB.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(SUBSCRIBERS_DB, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    if conn.execute("PRAGMA user_version").fetchone()[0] < _SCHEMA_VERSION:
+        _migrate(conn)
+    return conn
+
+
+def _load_legacy_file() -> list[dict]:
     if SUBSCRIBERS_FILE.exists():
         try:
             with open(SUBSCRIBERS_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                return data.get("subscribers", [])
+                return json.load(f).get("subscribers", [])
         except Exception as e:
-            logger.warning(f"Failed to load subscribers: {e}")
+            logger.warning(f"Failed to load legacy subscribers file: {e}")
     return []
 
 
-def _save(subscribers: list[dict]) -> None:
-    SUBSCRIBERS_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(SUBSCRIBERS_FILE, "w", encoding="utf-8") as f:
-        json.dump({"subscribers": subscribers}, f, ensure_ascii=False, indent=2)
+def _migrate(conn: sqlite3.Connection) -> None:
+    """Create the schema and import the legacy JSON file (once, guarded by user_version)."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= _SCHEMA_VERSION:
+            conn.execute("COMMIT")  # another process migrated first
+            return
+        for statement in filter(str.strip, _SCHEMA.split(";")):
+            conn.execute(statement)
+        legacy = _load_legacy_file()
+        now = _now()
+        conn.executemany(
+            f"INSERT OR IGNORE INTO subscribers ({_COLUMNS}) VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    sub["email"],
+                    sub.get("status", "active"),
+                    sub.get("unsubscribe_token") or secrets.token_urlsafe(32),
+                    sub.get("created_at", now),
+                    sub.get("updated_at", now),
+                )
+                for sub in legacy
+            ],
+        )
+        conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+        conn.execute("COMMIT")
+        if legacy:
+            logger.info(f"📦 Migrated {len(legacy)} subscribers from {SUBSCRIBERS_FILE} to {SUBSCRIBERS_DB}")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def normalize_email(raw: str) -> Optional[str]:
+    """Lower-case and strip an address; None if it does not look like an email."""
+    email = raw.strip().lower()
+    return email if EMAIL_PATTERN.match(email) else None
+
+
+def _to_dict(row: sqlite3.Row) -> dict:
+    sub = dict(row)
+    sub.pop("id", None)
+    return sub
 
 
 def upsert_active(email: str) -> tuple[dict, str]:
@@ -35,41 +117,126 @@ def upsert_active(email: str) -> tuple[dict, str]:
     Subscribe or reactivate an email.
     Returns (subscriber_dict, action) where action is "created"|"reactivated"|"already_active".
     """
-    subscribers = _load()
-
-    for sub in subscribers:
-        if sub["email"] == email:
-            if sub["status"] == "active":
-                return sub, "already_active"
-            sub["status"] = "active"
-            sub["updated_at"] = datetime.now(timezone.utc).isoformat()
-            _save(subscribers)
-            return sub, "reactivated"
-
-    new_sub = {
-        "email": email,
-        "status": "active",
-        "unsubscribe_token": secrets.token_urlsafe(32),
-        "created_at": datetime.now(timezone.utc).isoformat(),
-        "updated_at": datetime.now(timezone.utc).isoformat(),
-    }
-    subscribers.append(new_sub)
-    _save(subscribers)
-    return new_sub, "created"
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT * FROM subscribers WHERE email = ?", (email,)).fetchone()
+        now = _now()
+        if row is not None and row["status"] == "active":
+            action = "already_active"
+        elif row is not None:
+            conn.execute("UPDATE subscribers SET status = 'active', updated_at = ? WHERE id = ?", (now, row["id"]))
+            action = "reactivated"
+        else:
+            conn.execute(
+                f"INSERT INTO subscribers ({_COLUMNS}) VALUES (?, 'active', ?, ?, ?)",
+                (email, secrets.token_urlsafe(32), now, now),
+            )
+            action = "created"
+        sub = conn.execute("SELECT * FROM subscribers WHERE email = ?", (email,)).fetchone()
+        conn.execute("COMMIT")
+        return _to_dict(sub), action
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
 
 
 def unsubscribe_by_token(token: str) -> Optional[dict]:
     """Unsubscribe by token. Returns the subscriber or None if not found."""
-    subscribers = _load()
-    for sub in subscribers:
-        if sub["unsubscribe_token"] == token:
-            sub["status"] = "unsubscribed"
-            sub["updated_at"] = datetime.now(timezone.utc).isoformat()
-            _save(subscribers)
-            return sub
-    return None
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "UPDATE subscribers SET status = 'unsubscribed', updated_at = ? WHERE unsubscribe_token = ?",
+            (_now(), token),
+        )
+        row = conn.execute("SELECT * FROM subscribers WHERE unsubscribe_token = ?", (token,)).fetchone()
+        conn.execute("COMMIT")
+        return _to_dict(row) if row else None
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def bulk_insert(emails: Iterable[str]) -> dict[str, int]:
+    """
+    Add many (already normalized) emails in one transaction.
+
+    New addresses are created active; existing ones are left untouched, so an
+    import never resubscribes someone who unsubscribed. Returns counts of
+    "created", "already_active" and "unsubscribed" (skipped).
+    """
+    emails = list(dict.fromkeys(emails))
+    counts = {"created": 0, "already_active": 0, "unsubscribed": 0}
+    if not emails:
+        return counts
+
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        existing: dict[str, str] = {}
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(emails), 500):
+            chunk = emails[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for row in conn.execute(
+                f"SELECT email, status FROM subscribers WHERE email IN ({placeholders})", chunk
+            ):
+                existing[row["email"]] = row["status"]
+
+        now = _now()
+        conn.executemany(
+            f"INSERT INTO subscribers ({_COLUMNS}) VALUES (?, 'active', ?, ?, ?)",
+            [(email, secrets.token_urlsafe(32), now, now) for email in emails if email not in existing],
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    counts["created"] = len(emails) - len(existing)
+    for status in existing.values():
+        counts["already_active" if status == "active" else "unsubscribed"] += 1
+    return counts
+
+
+def iter_subscribers(status: Optional[str] = None, page_size: int = SUBSCRIBER_PAGE_SIZE) -> Iterator[dict]:
+    """
+    Yield subscribers (optionally only those with `status`) in id order, one
+    keyset page (id > last seen) at a time, so memory stays bounded by
+    `page_size` however large the list grows. Each page uses its own short-lived
+    connection: a streaming response may resume the generator on another
+    thread, and a slow reader must not hold a read transaction open.
+    """
+    where = "status = ? AND id > ?" if status else "id > ?"
+    last_id = 0
+    while True:
+        params = (status, last_id) if status else (last_id,)
+        conn = _connect()
+        try:
+            rows = conn.execute(
+                f"SELECT * FROM subscribers WHERE {where} ORDER BY id LIMIT ?", (*params, page_size)
+            ).fetchall()
+        finally:
+            conn.close()
+        if not rows:
+            return
+        last_id = rows[-1]["id"]
+        for row in rows:
+            yield _to_dict(row)
+
+
+def iter_active(page_size: int = SUBSCRIBER_PAGE_SIZE) -> Iterator[dict]:
+    """Stream active subscribers page by page (see iter_subscribers)."""
+    return iter_subscribers("active", page_size)
 
 
 def list_active() -> list[dict]:
-    """Return all active subscribers."""
-    return [s for s in _load() if s["status"] == "active"]
+    """Return all active subscribers (prefer iter_active for large lists)."""
+    return list(iter_active())
@@ -16,6 +16,14 @@ import {
 
 const POLL_INTERVAL = 5000; // 5s
 
+// Sections rendered by the page components; metadata etc. are never fetched
+const REPORT_FIELDS = [
+  'top_lane_changes',
+  'impact_analyses',
+  'summary_report.tier_list',
+  'summary_report.executive_summary',
+];
+
 const App: React.FC = () => {
   const [data, setData] = useState<AnalysisResult | null>(null);
   const [loading, setLoading] = useState(true);
@@ -47,7 +55,7 @@ const App: React.FC = () => {
         const found = index.versions.find(v => v.version === targetVersion);
         if (found) {
           // Analysis done — load result
-          const result = await fetchVersionData(targetVersion);
+          const result = await fetchVersionData(targetVersion, REPORT_FIELDS);
           setData(result);
           setCurrentVersion(targetVersion);
           setVersion(targetVersion);
@@ -84,7 +92,7 @@ const App: React.FC = () => {
 
         if (index.latest) {
           // Cache exists — load instantly
-          const result = await fetchVersionData(index.latest);
+          const result = await fetchVersionData(index.latest, REPORT_FIELDS);
           setData(result);
           setCurrentVersion(index.latest);
           setVersion(index.latest);
@@ -151,7 +159,7 @@ const App: React.FC = () => {
     setLoading(true);
     setError(null);
     try {
-      const result = await fetchVersionData(ver);
+      const result = await fetchVersionData(ver, REPORT_FIELDS);
       setData(result);
       setCurrentVersion(ver);
       setVersion(ver);
@@ -90,9 +90,11 @@ export async function fetchVersions(): Promise<VersionsIndex> {
 
 /**
  * Fetch cached analysis for a specific version
+ * @param fields 只返回这些字段（如 "summary_report.tier_list"），默认返回全部
  */
-export async function fetchVersionData(version: string): Promise<AnalysisResult> {
-  const response = await fetch(`${API_BASE_URL}/api/versions/${version}`);
+export async function fetchVersionData(version: string, fields?: string[]): Promise<AnalysisResult> {
+  const query = fields?.length ? `?fields=${encodeURIComponent(fields.join(','))}` : '';
+  const response = await fetch(`${API_BASE_URL}/api/versions/${version}${query}`);
   if (!response.ok) {
     throw new Error(`Version ${version} not found`);
   }
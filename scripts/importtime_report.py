@@ -0,0 +1,84 @@
+"""
+启动耗时报告：汇总 `python -X importtime` 的输出
+
+用法（项目根目录）:
+    python scripts/importtime_report.py            # import api
+    python scripts/importtime_report.py main --top 15
+
+tests/test_importtime.py 用同一函数检查冷启动预算，以及只读路径不会加载 LLM 依赖。
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+APP_DIR = os.path.join(PROJECT_ROOT, "app")
+
+# Packages that make up the LLM stack; read-only code paths must not import them
+HEAVY_PACKAGES = ("langchain_core", "langchain_openai", "langgraph", "openai", "tiktoken")
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Parse `-X importtime` lines into {module, self_us, cumulative_us, depth}."""
+    entries = []
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append({
+                "module": module,
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+                "depth": len(indent) // 2,
+            })
+    return entries
+
+
+def measure(module: str = "api", top: int = 10) -> Dict[str, Any]:
+    """Import `module` in a fresh interpreter (cwd app/) and summarize the cost."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_DIR, capture_output=True, text=True, timeout=120,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    entries = parse_importtime(proc.stderr)
+    total = next(e for e in reversed(entries) if e["module"] == module and e["depth"] == 0)
+    # Top-level packages by their outermost (cumulative) import
+    packages: Dict[str, int] = {}
+    for e in entries:
+        root = e["module"].split(".")[0]
+        if e["module"] == root or root not in packages:
+            packages[root] = max(packages.get(root, 0), e["cumulative_us"])
+    loaded = {e["module"].split(".")[0] for e in entries}
+    return {
+        "module": module,
+        "total_ms": round(total["cumulative_us"] / 1000, 1),
+        "module_count": len(entries),
+        "top": sorted(((name, round(us / 1000, 1)) for name, us in packages.items()), key=lambda x: -x[1])[:top],
+        "heavy_loaded": sorted(p for p in HEAVY_PACKAGES if p in loaded),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize `python -X importtime` for an app module")
+    parser.add_argument("module", nargs="?", default="api", help="Module to import from app/ (default: api)")
+    parser.add_argument("--top", type=int, default=10, help="Number of packages to list")
+    args = parser.parse_args()
+
+    report = measure(args.module, args.top)
+    print(f"⏱️ import {report['module']}: {report['total_ms']} ms ({report['module_count']} modules)")
+    for name, ms in report["top"]:
+        print(f"  {ms:>8.1f} ms  {name}")
+    heavy = ", ".join(report["heavy_loaded"]) or "无"
+    print(f"LLM 依赖已加载: {heavy}")
+
+
+if __name__ == "__main__":
+    main()
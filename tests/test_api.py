@@ -1,6 +1,9 @@
+import asyncio
 import os
 import sys
+import tempfile
 import unittest
+from pathlib import Path
 from unittest.mock import AsyncMock, patch
 
 from fastapi.testclient import TestClient
@@ -11,6 +14,7 @@ if APP_DIR not in sys.path:
     sys.path.insert(0, APP_DIR)
 
 import api  # noqa: E402
+import jobs  # noqa: E402
 
 
 class TestAPI(unittest.TestCase):
@@ -24,10 +28,18 @@ class TestAPI(unittest.TestCase):
         self.cache_save_patcher = patch("api.save_analysis_to_cache")
         self.cache_get_patcher.start()
         self.cache_save_patcher.start()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.jobs_db_patcher = patch("jobs.JOBS_DB", Path(self.tmp_dir.name) / "jobs.db")
+        self.jobs_db_patcher.start()
 
     def tearDown(self):
         self.cache_get_patcher.stop()
         self.cache_save_patcher.stop()
+        self.jobs_db_patcher.stop()
+        self.tmp_dir.cleanup()
+
+    def _run_queued_job(self):
+        return asyncio.run(api.job_pool.run_next())
 
     def test_health_endpoint(self):
         response = self.client.get("/health")
@@ -48,10 +60,13 @@ class TestAPI(unittest.TestCase):
             ) as workflow_mock,
         ):
             response = self.client.get("/api/analyze", params={"version": "14.24"})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()["status"], "analyzing")
+            self.assertEqual(response.json()["version"], "14.24")
+            self.assertTrue(self._run_queued_job())
 
-        self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json(), fake_result)
         workflow_mock.assert_awaited_once_with(fake_content, version="14.24")
+        self.assertEqual(jobs.get_job(response.json()["job_id"])["state"], "done")
 
     def test_analyze_post_uses_provided_content(self):
         fake_result = {"version": "14.24", "top_lane_changes": ["x"]}
@@ -64,9 +79,10 @@ class TestAPI(unittest.TestCase):
                 "/api/analyze",
                 json={"version": "14.24", "raw_content": "provided content"},
             )
+            self.assertTrue(self._run_queued_job())
 
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json(), fake_result)
+        self.assertEqual(response.json()["status"], "analyzing")
         fetch_mock.assert_not_awaited()
         workflow_mock.assert_awaited_once_with("provided content", version="14.24")
 
@@ -83,18 +99,56 @@ class TestAPI(unittest.TestCase):
             ) as workflow_mock,
         ):
             response = self.client.post("/api/analyze", json={"version": "latest"})
+            self.assertTrue(self._run_queued_job())
 
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json(), fake_result)
         fetch_mock.assert_awaited_once_with(version="latest")
         workflow_mock.assert_awaited_once_with("fetched content", version="latest")
 
+    def test_analyze_deduplicates_running_job(self):
+        first = self.client.post("/api/analyze", json={"version": "14.24", "raw_content": "a"})
+        second = self.client.post("/api/analyze", json={"version": "14.24", "raw_content": "a"})
+        self.assertEqual(first.json()["job_id"], second.json()["job_id"])
+
     def test_analyze_returns_500_on_failure(self):
+        with patch.object(
+            api.LOLOfficialCrawler, "fetch_patch_notes",
+            new=AsyncMock(side_effect=RuntimeError("boom")),
+        ):
+            response = self.client.post("/api/analyze", json={"version": "14.24"})
+
+        self.assertEqual(response.status_code, 500)
+        self.assertIn("分析失败: boom", response.json()["detail"])
+
+    def test_failed_job_records_error(self):
         with patch.object(api, "run_workflow", new=AsyncMock(side_effect=RuntimeError("boom"))):
             response = self.client.post(
                 "/api/analyze",
                 json={"version": "14.24", "raw_content": "provided content"},
             )
+            self._run_queued_job()
 
-        self.assertEqual(response.status_code, 500)
-        self.assertIn("分析失败: boom", response.json()["detail"])
+        job = self.client.get(f"/api/jobs/{response.json()['job_id']}").json()
+        self.assertEqual(job["state"], "queued")
+        self.assertEqual(job["attempts"], 1)
+        self.assertEqual(job["error"], "boom")
+        self.assertNotIn("payload", job)
+
+    def test_notifying_job_queues_emails_before_caching(self):
+        fake_result = {"version": "14.24", "top_lane_changes": []}
+
+        with (
+            patch.object(api, "run_workflow", new=AsyncMock(return_value=fake_result)),
+            patch("scheduler._queue_patch_notifications", side_effect=RuntimeError("db locked")) as notify_mock,
+        ):
+            job = api._start_analysis_job("14.24", "provided content", notify=True)
+            self._run_queued_job()
+
+        notify_mock.assert_called_once_with("14.24", fake_result)
+        # Left uncached, so the next scheduled check retries the release
+        api.save_analysis_to_cache.assert_not_called()
+        self.assertEqual(jobs.get_job(job["job_id"])["error"], "db locked")
+
+    def test_get_job_not_found(self):
+        response = self.client.get("/api/jobs/missing")
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,78 @@
+import os
+import sys
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+APP_DIR = os.path.join(PROJECT_ROOT, "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from agents import budget  # noqa: E402
+from agents.nodes import analyzer  # noqa: E402
+from agents.prompt_codec import count_tokens  # noqa: E402
+
+CHANGES = [
+    {"type": "champion", "champion": "Fiora", "relevance": "primary", "details": {"Q": "damage up " * 20}},
+    {"type": "champion", "champion": "Teemo", "relevance": "secondary", "details": {"E": "damage up " * 20}},
+    {"type": "item", "item": "Sundered Sky", "change": "cost down " * 20},
+    {"type": "system", "category": "Turret", "change": "plating " * 20},
+]
+
+
+def _render(changes):
+    return "\n".join(str(c) for c in changes)
+
+
+class TestTokenBudget(unittest.TestCase):
+    def test_truncate_to_tokens(self):
+        text = "abcd" * 100
+        truncated = budget.truncate_to_tokens(text, 10)
+        self.assertLessEqual(count_tokens(truncated), 10)
+        self.assertTrue(text.startswith(truncated))
+        self.assertEqual(budget.truncate_to_tokens("short", 10), "short")
+
+    def test_fit_records_drops_low_relevance_first(self):
+        limit = count_tokens(_render([CHANGES[0], CHANGES[2]]))
+        kept, prompt, tokens = budget.fit_records(CHANGES, _render, limit)
+        self.assertEqual([c.get("champion") or c.get("item") for c in kept], ["Fiora", "Sundered Sky"])
+        self.assertLessEqual(tokens, limit)
+        self.assertEqual(prompt, _render(kept))
+
+    def test_fit_records_keeps_at_least_one(self):
+        kept, _, _ = budget.fit_records(CHANGES, _render, 1)
+        self.assertEqual([c.get("champion") for c in kept], ["Fiora"])
+
+    def test_prompt_limit_respects_run_budget(self):
+        metadata = {}
+        with patch.object(budget, "RUN_TOKEN_BUDGET", 5000), \
+                patch.dict(budget.NODE_TOKEN_BUDGETS, {"extractor": 4000, "analyzer": 4000}):
+            self.assertEqual(budget.prompt_limit(metadata, "extractor"), 4000)
+            response = MagicMock(response_metadata={"token_usage": {"prompt_tokens": 3000, "completion_tokens": 500}})
+            budget.record(metadata, "extractor", 4000, 2900, response)
+            self.assertEqual(budget.prompt_limit(metadata, "analyzer"), 1500)
+
+        entry = metadata["token_budget"]["calls"]["extractor"]
+        self.assertEqual(entry["estimated_prompt_tokens"], 2900)
+        self.assertEqual(entry["actual_prompt_tokens"], 3000)
+
+
+class TestAnalyzerBudget(unittest.IsolatedAsyncioTestCase):
+    async def test_analyzer_drops_secondary_champions_over_budget(self):
+        response = MagicMock(content='{"champion_analyses": [], "meta_overview": {}}', response_metadata={})
+        response.tool_calls = []
+        llm = MagicMock(ainvoke=AsyncMock(return_value=response))
+        full = analyzer.ANALYZER_PROMPT_TEMPLATE.format(changes_summary=analyzer._format_changes_summary(CHANGES))
+
+        with patch.object(analyzer, "analyzer_llm", return_value=llm), \
+                patch.dict(budget.NODE_TOKEN_BUDGETS, {"analyzer": count_tokens(full)}):
+            result = await analyzer.analyzer_node({"top_lane_changes": CHANGES, "metadata": {}, "messages": []})
+
+        prompt = llm.ainvoke.await_args.args[0][1].content
+        self.assertIn("Fiora", prompt)
+        self.assertNotIn("Teemo", prompt)
+        self.assertEqual(result["metadata"]["token_budget"]["calls"]["analyzer"]["dropped"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,7 @@
+import asyncio
 import os
 import sys
+import tempfile
 import unittest
 from pathlib import Path
 from unittest.mock import AsyncMock, patch
@@ -17,16 +19,25 @@ import api  # noqa: E402
 class TestCaching(unittest.TestCase):
     def setUp(self):
         self.client = TestClient(api.app)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        cache_dir = Path(self.tmp_dir.name)
+        # Keep cache files, indexes and sections out of the working tree
+        self.patchers = [
+            patch("jobs.JOBS_DB", cache_dir / "jobs.db"),
+            patch.object(api, "CACHE_DIR", cache_dir),
+            patch.object(api, "VERSIONS_INDEX", cache_dir / "versions.json"),
+            patch("history.HISTORY_DB", cache_dir / "history.db"),
+            patch("history.HISTORY_FILE", cache_dir / "history.json"),
+        ]
+        for p in self.patchers:
+            p.start()
         self.test_version = "99.99_test"
-        self.cache_file = Path("data/cache") / f"{self.test_version}.json"
-        # 确保开始前没有缓存
-        if self.cache_file.exists():
-            self.cache_file.unlink()
+        self.cache_file = cache_dir / f"{self.test_version}.json"
 
     def tearDown(self):
-        # 清理测试产生的缓存
-        if self.cache_file.exists():
-            self.cache_file.unlink()
+        for p in self.patchers:
+            p.stop()
+        self.tmp_dir.cleanup()
 
     def test_cache_creation_and_hit(self):
         fake_content = "patch notes content"
@@ -49,6 +60,7 @@ class TestCaching(unittest.TestCase):
             ) as workflow_mock,
         ):
             response = self.client.get("/api/analyze", params={"version": self.test_version})
+            asyncio.run(api.job_pool.run_next())
 
             self.assertEqual(response.status_code, 200)
             self.assertEqual(response.json()["version"], self.test_version)
@@ -86,5 +86,45 @@ class TestLOLOfficialCrawlerFetch(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(version, "26.3")
 
 
+
+async def _chunks(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+class TestLOLOfficialCrawlerProbe(unittest.IsolatedAsyncioTestCase):
+    PAGE = (
+        '<html><body><a href="/other/1.html">首页</a>'
+        + "填充" * 2000
+        + '<li><a href="/gicp/news/410/37072785.html" target="_blank">26.5版本公告</a></li>'
+        + '<a href="/gicp/news/410/1.html">26.4版本公告</a>'
+        + "填充" * 2000
+        + "</body></html>"
+    ).encode("gb2312")
+
+    async def test_scan_finds_first_link_across_chunks(self):
+        crawler = LOLOfficialCrawler()
+        url, version = await crawler._scan_first_news_link(_chunks(self.PAGE, 7), max_bytes=10**6)
+        self.assertEqual(url, "https://lol.qq.com/gicp/news/410/37072785.html")
+        self.assertEqual(version, "26.5")
+
+    async def test_scan_stops_reading_after_match(self):
+        read = []
+
+        async def _tracking():
+            async for chunk in _chunks(self.PAGE, 64):
+                read.append(chunk)
+                yield chunk
+
+        crawler = LOLOfficialCrawler()
+        await crawler._scan_first_news_link(_tracking(), max_bytes=10**6)
+        self.assertLess(sum(map(len, read)), len(self.PAGE))
+
+    async def test_scan_gives_up_after_max_bytes(self):
+        crawler = LOLOfficialCrawler()
+        result = await crawler._scan_first_news_link(_chunks(self.PAGE, 64), max_bytes=128)
+        self.assertEqual(result, (None, "unknown"))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,101 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+APP_DIR = os.path.join(PROJECT_ROOT, "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+import api  # noqa: E402
+from report_diff import diff_summary_reports  # noqa: E402
+
+OLD_REPORT = {
+    "tier_list": {
+        "A": [{"champion": "菲奥娜", "tier": "A", "strength_score": 7}],
+        "B": [{"champion": "盖伦", "tier": "B", "strength_score": 5}],
+    },
+    "champion_details": [
+        {"champion": "菲奥娜", "recommended_builds": [{"core_items": ["三相之力", "死亡之舞"]}]},
+    ],
+    "counter_matrix": {
+        "菲奥娜": {"counters": [{"champion": "诺手"}], "countered_by": [{"champion": "蒙多"}]},
+    },
+}
+
+NEW_REPORT = {
+    "tier_list": {
+        "S": [{"champion": "菲奥娜", "tier": "S", "strength_score": 9}],
+        "B": [{"champion": "杰斯", "tier": "B+", "strength_score": 6}],
+    },
+    "champion_details": [
+        {"champion": "菲奥娜", "recommended_builds": [{"core_items": ["三相之力", "黑色切割者"]}]},
+    ],
+    "counter_matrix": {
+        "菲奥娜": {"counters": [{"champion": "诺手"}, {"champion": "鳄鱼"}], "countered_by": [{"champion": "蒙多"}]},
+    },
+}
+
+
+class TestDiffSummaryReports(unittest.TestCase):
+    def test_tier_movement(self):
+        diff = diff_summary_reports(OLD_REPORT, NEW_REPORT)
+        self.assertEqual(diff["tier_changes"], [{
+            "champion": "菲奥娜", "from_tier": "A", "to_tier": "S",
+            "from_score": 7, "to_score": 9, "direction": "up",
+        }])
+
+    def test_new_and_removed_champions(self):
+        diff = diff_summary_reports(OLD_REPORT, NEW_REPORT)
+        self.assertEqual([c["champion"] for c in diff["new_champions"]], ["杰斯"])
+        self.assertEqual([c["champion"] for c in diff["removed_champions"]], ["盖伦"])
+
+    def test_build_and_counter_deltas(self):
+        diff = diff_summary_reports(OLD_REPORT, NEW_REPORT)
+        self.assertEqual(diff["build_changes"]["菲奥娜"], {"added": ["黑色切割者"], "removed": ["死亡之舞"]})
+        self.assertEqual(diff["counter_changes"]["菲奥娜"], {"counters": {"added": ["鳄鱼"], "removed": []}})
+
+    def test_identical_reports_have_empty_diff(self):
+        diff = diff_summary_reports(NEW_REPORT, NEW_REPORT)
+        self.assertFalse(any(diff.values()))
+
+
+class TestDiffEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(api.app)
+        api._diff_cache.clear()
+        self.reports = {
+            "26.2": {"summary_report": OLD_REPORT},
+            "26.3": {"summary_report": NEW_REPORT},
+        }
+
+    def tearDown(self):
+        api._diff_cache.clear()
+
+    def test_diff_is_memoized(self):
+        with patch.object(api, "get_cached_analysis", side_effect=self.reports.get) as cache_mock:
+            first = self.client.get("/api/diff", params={"from": "26.2", "to": "26.3"})
+            second = self.client.get("/api/diff", params={"from": "26.2", "to": "26.3"})
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(first.json()["to"], "26.3")
+        self.assertEqual(cache_mock.call_count, 2)
+
+    def test_diff_missing_version(self):
+        with patch.object(api, "get_cached_analysis", side_effect=self.reports.get):
+            resp = self.client.get("/api/diff", params={"from": "26.2", "to": "99.99"})
+        self.assertEqual(resp.status_code, 404)
+
+    def test_reanalysis_invalidates_memo(self):
+        api._diff_cache[("26.2", "26.3")] = {"stale": True}
+        api._diff_cache[("26.1", "26.2")] = {"stale": True}
+        api._invalidate_diffs("26.3", ["26.3", "26.2", "26.1"])
+        self.assertEqual(list(api._diff_cache), [("26.1", "26.2")])
+
+
+if __name__ == "__main__":
+    unittest.main()
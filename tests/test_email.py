@@ -1,14 +1,20 @@
+import json
 import os
 import sys
+import time
 import unittest
 from unittest.mock import patch
 
+import httpx
+
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 APP_DIR = os.path.join(PROJECT_ROOT, "app")
 if APP_DIR not in sys.path:
     sys.path.insert(0, APP_DIR)
 
-from email_template import render_patch_email  # noqa: E402
+import email_client  # noqa: E402
+from email_client import ResendEmailClient, TokenBucket  # noqa: E402
+from email_template import PatchEmailTemplate, render_patch_email  # noqa: E402
 
 
 class TestEmailTemplate(unittest.TestCase):
@@ -41,6 +47,14 @@ class TestEmailTemplate(unittest.TestCase):
         self.assertNotIn("<script>", result["html"])
         self.assertIn("&lt;script&gt;", result["html"])
 
+    def test_template_matches_full_render(self):
+        template = PatchEmailTemplate("26.5", "Fiora & Darius <buffs>", ["S-tier: Fiora"], "https://example.com")
+        for url in ("https://example.com/api/unsubscribe?token=abc", "https://example.com/u?a=1&b=<2>"):
+            self.assertEqual(
+                template.render(url),
+                render_patch_email("26.5", "Fiora & Darius <buffs>", ["S-tier: Fiora"], "https://example.com", url),
+            )
+
 
 class TestEmailEndpoints(unittest.TestCase):
     def setUp(self):
@@ -74,5 +88,120 @@ class TestEmailEndpoints(unittest.TestCase):
         self.assertEqual(resp.status_code, 404)
 
 
+class TestResendEmailClient(unittest.IsolatedAsyncioTestCase):
+    def _client(self, handler, **kwargs) -> ResendEmailClient:
+        http = httpx.AsyncClient(base_url=email_client.RESEND_API_URL, transport=httpx.MockTransport(handler))
+        return ResendEmailClient("key", rate_limit=1000, client=http, **kwargs)
+
+    async def test_reuses_one_http_client(self):
+        client = ResendEmailClient("key")
+        self.assertIs(client._get_client(), client._get_client())
+        await client.aclose()
+        self.assertIsNone(client._client)
+
+    async def test_retries_429_honouring_retry_after(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            if len(calls) == 1:
+                return httpx.Response(429, headers={"Retry-After": "0"}, json={"message": "rate limited"})
+            return httpx.Response(200, json={"id": "msg-1"})
+
+        async with self._client(handler) as client:
+            message_id = await client.send_email(from_addr="a@b.com", to="c@d.com", subject="s", html="h", text="t")
+
+        self.assertEqual(message_id, "msg-1")
+        self.assertEqual(len(calls), 2)
+
+    async def test_gives_up_after_max_retries(self):
+        def handler(request):
+            return httpx.Response(503, headers={"Retry-After": "0"}, json={"message": "unavailable"})
+
+        async with self._client(handler, max_retries=1) as client:
+            with self.assertRaises(RuntimeError):
+                await client.send_email(from_addr="a@b.com", to="c@d.com", subject="s", html="h", text="t")
+
+    async def test_token_bucket_limits_rate(self):
+        bucket = TokenBucket(rate=100, capacity=1)
+        start = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.015)
+
+
+class TestSendBatch(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.backoff = patch.object(email_client, "EMAIL_RETRY_BACKOFF_SECONDS", 0)
+        self.backoff.start()
+
+    def tearDown(self):
+        self.backoff.stop()
+
+    @staticmethod
+    def _messages(n: int) -> list[dict]:
+        return [
+            {"from_addr": "a@b.com", "to": f"user{i}@example.com", "subject": "s", "html": "h", "text": "t"}
+            for i in range(n)
+        ]
+
+    async def test_retries_only_rejected_messages(self):
+        bodies = []
+
+        def handler(request):
+            body = json.loads(request.content)
+            bodies.append(body)
+            if len(bodies) == 1:
+                # Second message rejected on the first attempt
+                return httpx.Response(200, json={
+                    "data": [{"id": "id-0"}, {"id": "id-2"}],
+                    "errors": [{"index": 1, "message": "temporary failure"}],
+                })
+            return httpx.Response(200, json={"data": [{"id": "id-1"}]})
+
+        http = httpx.AsyncClient(base_url=email_client.RESEND_API_URL, transport=httpx.MockTransport(handler))
+        async with ResendEmailClient("key", rate_limit=1000, client=http) as client:
+            results = await client.send_batch(self._messages(3))
+
+        self.assertEqual(results, [{"id": "id-0"}, {"id": "id-1"}, {"id": "id-2"}])
+        self.assertEqual(len(bodies[0]), 3)
+        self.assertEqual([m["to"] for m in bodies[1]], [["user1@example.com"]])
+
+    async def test_reports_persistent_failures(self):
+        def handler(request):
+            return httpx.Response(200, json={"data": [], "errors": [{"index": 0, "message": "invalid to"}]})
+
+        http = httpx.AsyncClient(base_url=email_client.RESEND_API_URL, transport=httpx.MockTransport(handler))
+        async with ResendEmailClient("key", rate_limit=1000, max_retries=1, client=http) as client:
+            results = await client.send_batch(self._messages(1))
+
+        self.assertEqual(results, [{"error": "invalid to"}])
+
+    async def test_server_errors_are_marked_retryable(self):
+        def handler(request):
+            return httpx.Response(503, json={"message": "unavailable"})
+
+        http = httpx.AsyncClient(base_url=email_client.RESEND_API_URL, transport=httpx.MockTransport(handler))
+        async with ResendEmailClient("key", rate_limit=1000, max_retries=0, client=http) as client:
+            results = await client.send_batch(self._messages(1))
+
+        self.assertEqual(results, [{"error": "unavailable", "retryable": True}])
+
+    async def test_rejected_batches_are_not_retryable(self):
+        def handler(request):
+            return httpx.Response(422, json={"message": "invalid from"})
+
+        http = httpx.AsyncClient(base_url=email_client.RESEND_API_URL, transport=httpx.MockTransport(handler))
+        async with ResendEmailClient("key", rate_limit=1000, max_retries=0, client=http) as client:
+            results = await client.send_batch(self._messages(1))
+
+        self.assertEqual(results, [{"error": "invalid from", "retryable": False}])
+
+    async def test_rejects_oversized_batch(self):
+        client = ResendEmailClient("key")
+        with self.assertRaises(ValueError):
+            await client.send_batch(self._messages(email_client.RESEND_BATCH_SIZE + 1))
+
+
 if __name__ == "__main__":
     unittest.main()
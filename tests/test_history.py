@@ -0,0 +1,145 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+APP_DIR = os.path.join(PROJECT_ROOT, "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+import api  # noqa: E402
+import history  # noqa: E402
+
+
+def _result(version, tier, score, change_type="buff"):
+    return {
+        "version": version,
+        "top_lane_changes": [
+            {"type": "champion", "champion": "无双剑姬 菲奥娜", "change_type": change_type, "details": {}},
+            {"type": "item", "item": "黑色切割者", "change": "攻击力 40 → 45"},
+        ],
+        "impact_analyses": [{
+            "champion_analyses": [{
+                "champion": "无双剑姬 菲奥娜",
+                "meta_impact": {"tier_prediction": "B"},
+                "overall_assessment": {"strength_score": 5},
+            }],
+        }],
+        "summary_report": {
+            "tier_list": {tier: [{"champion": "无双剑姬 菲奥娜", "tier": tier, "strength_score": score}]},
+            "champion_details": [{"champion": "无双剑姬 菲奥娜"}],
+        },
+        "metadata": {},
+    }
+
+
+class TestHistoryStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        tmp = Path(self.tmp_dir.name)
+        self.patchers = [
+            patch.object(api, "CACHE_DIR", tmp),
+            patch.object(api, "VERSIONS_INDEX", tmp / "versions.json"),
+            patch.object(api, "MAX_CACHED_VERSIONS", 2),
+            patch.object(history, "HISTORY_DB", tmp / "history.db"),
+            patch.object(history, "HISTORY_FILE", tmp / "history.json"),
+            patch.object(history, "HISTORY_MAX_VERSIONS", 3),
+        ]
+        for p in self.patchers:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patchers:
+            p.stop()
+        self.tmp_dir.cleanup()
+
+    def _versions(self, name):
+        return [e["version"] for e in history.find(name)[2]]
+
+    def test_build_history_entries_prefers_summary_tier(self):
+        entries = api.build_history_entries("26.3", _result("26.3", "S", 9))
+        fiora = entries["champions"]["无双剑姬 菲奥娜"]
+        self.assertEqual(fiora["tier"], "S")
+        self.assertEqual(fiora["strength_score"], 9)
+        self.assertEqual(fiora["change_type"], "buff")
+        self.assertEqual(fiora["details"], {"section": "champion_details", "index": 0})
+        self.assertEqual(entries["items"]["黑色切割者"]["details"], {"section": "top_lane_changes", "index": 1})
+
+    def test_save_maintains_history_newest_first(self):
+        api.save_analysis_to_cache("26.3", _result("26.3", "S", 9))
+        api.save_analysis_to_cache("26.2", _result("26.2", "B", 5, "nerf"))  # backfilled later
+
+        kind, _, entries = history.find("无双剑姬 菲奥娜")
+        self.assertEqual(kind, "champions")
+        self.assertEqual([e["version"] for e in entries], ["26.3", "26.2"])
+        self.assertEqual(entries[1]["change_type"], "nerf")
+
+    def test_reanalysis_replaces_entry(self):
+        api.save_analysis_to_cache("26.3", _result("26.3", "B", 5))
+        api.save_analysis_to_cache("26.3", _result("26.3", "A", 7))
+
+        entries = history.find("无双剑姬 菲奥娜")[2]
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]["tier"], "A")
+
+    def test_history_outlives_report_eviction(self):
+        for v in ["26.1", "26.2", "26.3"]:
+            api.save_analysis_to_cache(v, _result(v, "A", 7))
+
+        # Only 2 reports stay cached, history keeps all 3 versions
+        self.assertEqual(len(api.load_versions_index()["versions"]), 2)
+        self.assertEqual(self._versions("黑色切割者"), ["26.3", "26.2", "26.1"])
+
+    def test_history_keeps_newest_versions(self):
+        for v in ["26.9", "26.10", "26.11", "26.12"]:
+            history.record(v, api.build_history_entries(v, _result(v, "A", 7)))
+
+        self.assertEqual(self._versions("黑色切割者"), ["26.12", "26.11", "26.10"])
+
+    def test_find_matches_short_name(self):
+        api.save_analysis_to_cache("26.3", _result("26.3", "S", 9))
+        kind, name, _ = history.find("菲奥娜")
+        self.assertEqual(kind, "champions")
+        self.assertEqual(name, "无双剑姬 菲奥娜")
+        self.assertIsNone(history.find("盖伦"))
+        self.assertIsNone(history.find("剑"))
+
+    def test_migrates_legacy_index_once(self):
+        history.HISTORY_FILE.write_text(json.dumps({
+            "champions": {"无双剑姬 菲奥娜": [{"version": "26.2", "tier": "B"}, {"version": "26.1", "tier": "C"}]},
+            "items": {},
+        }), encoding="utf-8")
+
+        self.assertEqual(self._versions("菲奥娜"), ["26.2", "26.1"])
+        history.HISTORY_FILE.unlink()
+        self.assertEqual(self._versions("菲奥娜"), ["26.2", "26.1"])
+
+
+class TestHistoryEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(api.app)
+        self.found = ("champions", "无双剑姬 菲奥娜", [{"version": "26.3", "tier": "S"}])
+
+    def test_champion_history_found(self):
+        with patch.object(history, "find", return_value=self.found) as find_mock:
+            resp = self.client.get("/api/champions/菲奥娜/history")
+        find_mock.assert_called_once_with("菲奥娜")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["name"], "无双剑姬 菲奥娜")
+        self.assertEqual(resp.json()["kind"], "champion")
+        self.assertEqual(resp.json()["history"][0]["tier"], "S")
+
+    def test_champion_history_not_found(self):
+        with patch.object(history, "find", return_value=None):
+            resp = self.client.get("/api/champions/盖伦/history")
+        self.assertEqual(resp.status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
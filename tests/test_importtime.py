@@ -0,0 +1,65 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+APP_DIR = os.path.join(PROJECT_ROOT, "app")
+SCRIPTS_DIR = os.path.join(PROJECT_ROOT, "scripts")
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+from importtime_report import HEAVY_PACKAGES, measure, parse_importtime  # noqa: E402
+
+# Generous by default so slow CI machines pass; tighten locally to catch regressions
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "3000"))
+
+_READ_ONLY_PROBE = """
+import json, sys
+from fastapi.testclient import TestClient
+import api
+client = TestClient(api.app)
+statuses = [client.get(path).status_code for path in ("/health", "/api/versions", "/api/previews/0.0")]
+heavy = [name for name in json.loads(sys.argv[1]) if name in sys.modules]
+print(json.dumps({"statuses": statuses, "heavy": heavy}))
+"""
+
+
+def _run_in_fresh_interpreter(code: str) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-c", code, json.dumps(HEAVY_PACKAGES)],
+        cwd=APP_DIR, capture_output=True, text=True, timeout=120,
+    )
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+class TestImportTime(unittest.TestCase):
+    def test_parse_importtime(self):
+        stderr = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   json.decoder\n"
+            "import time:       300 |        420 | json\n"
+        )
+        entries = parse_importtime(stderr)
+        self.assertEqual([e["module"] for e in entries], ["json.decoder", "json"])
+        self.assertEqual(entries[0]["depth"], 1)
+        self.assertEqual(entries[1]["cumulative_us"], 420)
+
+    def test_api_import_is_light_and_within_budget(self):
+        report = measure("api")
+        self.assertEqual(report["heavy_loaded"], [])
+        self.assertLess(report["total_ms"], IMPORT_BUDGET_MS, report["top"])
+
+    def test_cli_import_does_not_load_llm_stack(self):
+        self.assertEqual(measure("main")["heavy_loaded"], [])
+
+    def test_read_only_endpoints_never_import_llm_stack(self):
+        result = _run_in_fresh_interpreter(_READ_ONLY_PROBE)
+        self.assertEqual(result["statuses"], [200, 200, 404])
+        self.assertEqual(result["heavy"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+APP_DIR = os.path.join(PROJECT_ROOT, "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+import jobs  # noqa: E402
+
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.patchers = [
+            patch.object(jobs, "JOBS_DB", Path(self.tmp_dir.name) / "jobs.db"),
+            patch.object(jobs, "JOB_RETRY_DELAY_SECONDS", 0),
+            patch.object(jobs, "MAX_JOB_ATTEMPTS", 2),
+        ]
+        for p in self.patchers:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patchers:
+            p.stop()
+        self.tmp_dir.cleanup()
+
+    def test_enqueue_deduplicates_active_jobs(self):
+        job, created = jobs.enqueue("analyze", "26.3", {"raw_content": "x"})
+        again, created_again = jobs.enqueue("analyze", "26.3")
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(job["id"], again["id"])
+        self.assertEqual(job["state"], "queued")
+        self.assertEqual(job["payload"], {"raw_content": "x"})
+
+    def test_claim_moves_job_to_running(self):
+        job, _ = jobs.enqueue("analyze", "26.3")
+        claimed = jobs.claim_next()
+        self.assertEqual(claimed["id"], job["id"])
+        self.assertEqual(claimed["state"], "running")
+        self.assertEqual(claimed["attempts"], 1)
+        self.assertIsNone(jobs.claim_next())
+
+    def test_fail_retries_then_gives_up(self):
+        job, _ = jobs.enqueue("analyze", "26.3")
+        jobs.claim_next()
+        self.assertEqual(jobs.fail(job["id"], "first"), "queued")
+        jobs.claim_next()
+        self.assertEqual(jobs.fail(job["id"], "second"), "failed")
+
+        failed = jobs.get_job(job["id"])
+        self.assertEqual(failed["error"], "second")
+        self.assertEqual(failed["attempts"], 2)
+        self.assertIsNotNone(failed["finished_at"])
+        self.assertIsNone(jobs.find_active("analyze", "26.3"))
+
+    def test_requeue_stale_only_recovers_dead_owners(self):
+        job, _ = jobs.enqueue("analyze", "26.3")
+        jobs.claim_next()
+        self.assertEqual(jobs.requeue_stale(ttl=60), 0)
+        self.assertEqual(jobs.get_job(job["id"])["owner"], jobs.OWNER_ID)
+
+        self.assertEqual(jobs.requeue_stale(ttl=-1), 1)
+        self.assertEqual(jobs.get_job(job["id"])["state"], "queued")
+
+    def test_release_owned_does_not_count_attempt(self):
+        job, _ = jobs.enqueue("analyze", "26.3")
+        jobs.claim_next()
+        self.assertEqual(jobs.release_owned(), 1)
+        released = jobs.get_job(job["id"])
+        self.assertEqual(released["state"], "queued")
+        self.assertEqual(released["attempts"], 0)
+
+
+class TestJobWorkerPool(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_patcher = patch.object(jobs, "JOBS_DB", Path(self.tmp_dir.name) / "jobs.db")
+        self.db_patcher.start()
+
+    def tearDown(self):
+        self.db_patcher.stop()
+        self.tmp_dir.cleanup()
+
+    async def test_run_next_completes_job(self):
+        handler = AsyncMock(return_value={"version": "26.3"})
+        pool = jobs.JobWorkerPool({"analyze": handler})
+        job, _ = jobs.enqueue("analyze", "26.3", {"raw_content": "x"})
+
+        self.assertTrue(await pool.run_next())
+        self.assertFalse(await pool.run_next())
+
+        done = jobs.get_job(job["id"])
+        self.assertEqual(done["state"], "done")
+        self.assertEqual(done["result"], {"version": "26.3"})
+        self.assertIsNone(done["payload"])
+        handler.assert_awaited_once()
+
+    async def test_queue_calls_run_off_the_event_loop(self):
+        loop_thread = threading.get_ident()
+        threads = []
+
+        def claim():
+            threads.append(threading.get_ident())
+            return None
+
+        with patch.object(jobs, "claim_next", claim):
+            self.assertFalse(await jobs.JobWorkerPool({}).run_next())
+        self.assertNotEqual(threads, [loop_thread])
+
+    def test_schema_is_created_once_per_database(self):
+        jobs.enqueue("analyze", "26.3")
+        with patch.object(jobs, "_SCHEMA", "this is not sql"):
+            self.assertIsNotNone(jobs.find_active("analyze", "26.3"))
+
+    async def test_unknown_kind_fails(self):
+        pool = jobs.JobWorkerPool({})
+        job, _ = jobs.enqueue("mystery", "26.3")
+        await pool.run_next()
+        self.assertIn("No handler", jobs.get_job(job["id"])["error"])
+
+    async def test_start_and_stop(self):
+        pool = jobs.JobWorkerPool({}, concurrency=2, poll_interval=0.01)
+        await pool.start()
+        self.assertEqual(len(pool._tasks), 3)  # two workers + heartbeat
+        await pool.stop()
+        self.assertEqual(pool._tasks, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
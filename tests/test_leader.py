@@ -0,0 +1,94 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+APP_DIR = os.path.join(PROJECT_ROOT, "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+import leader  # noqa: E402
+
+
+class TestLeases(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_patcher = patch.object(leader, "LEASE_DB", Path(self.tmp_dir.name) / "leases.db")
+        self.db_patcher.start()
+
+    def tearDown(self):
+        self.db_patcher.stop()
+        self.tmp_dir.cleanup()
+
+    def test_only_one_owner_holds_a_lease(self):
+        self.assertTrue(leader.try_acquire("scheduler", owner="a"))
+        self.assertFalse(leader.try_acquire("scheduler", owner="b"))
+        self.assertTrue(leader.try_acquire("scheduler", owner="a"))  # renewal
+        self.assertEqual(leader.current_holder("scheduler"), "a")
+
+    def test_expired_lease_can_be_taken_over(self):
+        self.assertTrue(leader.try_acquire("scheduler", owner="a", ttl=-1))
+        self.assertIsNone(leader.current_holder("scheduler"))
+        self.assertTrue(leader.try_acquire("scheduler", owner="b"))
+
+    def test_release_only_by_owner(self):
+        leader.try_acquire("backfill", owner="a")
+        leader.release("backfill", owner="b")
+        self.assertEqual(leader.current_holder("backfill"), "a")
+        leader.release("backfill", owner="a")
+        self.assertIsNone(leader.current_holder("backfill"))
+
+
+class TestHoldAndElector(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_patcher = patch.object(leader, "LEASE_DB", Path(self.tmp_dir.name) / "leases.db")
+        self.db_patcher.start()
+
+    def tearDown(self):
+        self.db_patcher.stop()
+        self.tmp_dir.cleanup()
+
+    async def test_hold_is_exclusive_and_released(self):
+        async with leader.hold("backfill") as acquired:
+            self.assertTrue(acquired)
+            self.assertFalse(leader.try_acquire("backfill", owner="other"))
+        self.assertIsNone(leader.current_holder("backfill"))
+
+    async def test_hold_yields_false_when_taken(self):
+        leader.try_acquire("backfill", owner="other")
+        async with leader.hold("backfill") as acquired:
+            self.assertFalse(acquired)
+        self.assertEqual(leader.current_holder("backfill"), "other")
+
+    async def test_hold_touches_sqlite_off_the_event_loop(self):
+        loop_thread = threading.get_ident()
+        threads = []
+        real_connect = leader._connect
+
+        def connect():
+            threads.append(threading.get_ident())
+            return real_connect()
+
+        with patch.object(leader, "_connect", connect):
+            async with leader.hold("backfill") as acquired:
+                self.assertTrue(acquired)
+        self.assertTrue(threads)
+        self.assertNotIn(loop_thread, threads)
+
+    async def test_elector_follows_lease(self):
+        elector = leader.LeaderElector("scheduler")
+        self.assertTrue(elector.heartbeat())
+        self.assertFalse(leader.try_acquire("scheduler", owner="other-process"))
+        await elector.stop()
+        self.assertFalse(elector.is_leader)
+        self.assertTrue(leader.try_acquire("scheduler", owner="other-process"))
+        self.assertFalse(elector.heartbeat())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import asyncio
+import os
+import sys
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+APP_DIR = os.path.join(PROJECT_ROOT, "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from agents import llm  # noqa: E402
+from agents.nodes import extractor  # noqa: E402
+
+
+def _response(content, prompt_tokens=10, completion_tokens=5):
+    return MagicMock(
+        content=content,
+        response_metadata={"token_usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}},
+    )
+
+
+def _parse(response):
+    if not response.content.startswith("{"):
+        raise ValueError("not JSON")
+    return response.content
+
+
+class TestModelRouting(unittest.TestCase):
+    def test_route_falls_back_from_step_to_node_to_default(self):
+        routes = {"summarizer": "strong", "summarizer.step2": "fast", "extractor": ""}
+        with patch.dict(llm.MODEL_ROUTES, routes), patch.object(llm, "DEFAULT_MODEL", "base"):
+            self.assertEqual(llm.route("summarizer.step2"), "fast")
+            self.assertEqual(llm.route("summarizer.step1"), "strong")
+            self.assertEqual(llm.route("extractor"), "base")
+
+
+class TestHttpClients(unittest.TestCase):
+    def test_async_pool_of_a_closed_loop_is_closed(self):
+        async def get_pool(settle: bool = False):
+            _, pool = llm._get_http_clients()
+            if settle:
+                for _ in range(3):
+                    await asyncio.sleep(0)
+            return pool
+
+        async def shutdown():
+            await llm.aclose_llm_clients()
+
+        with patch.object(llm, "_async_http_clients", {}):
+            first = asyncio.run(get_pool())
+            second = asyncio.run(get_pool(settle=True))
+            self.assertTrue(first.is_closed)
+            self.assertFalse(second.is_closed)
+
+            asyncio.run(shutdown())
+            self.assertTrue(second.is_closed)
+            self.assertEqual(llm._async_http_clients, {})
+
+
+class TestRoutedInvoke(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.models = []
+        self.replies = {}
+
+        def make_llm(model):
+            self.models.append(model)
+            return MagicMock(ainvoke=AsyncMock(return_value=self.replies[model]))
+
+        self.make_llm = make_llm
+        patcher = patch.dict(llm.MODEL_ROUTES, {"extractor": "fast"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_valid_output_uses_routed_model_only(self):
+        self.replies = {"fast": _response("{}")}
+        metadata = {}
+        with patch.object(llm, "ESCALATION_MODEL", "strong"):
+            _, parsed = await llm.ainvoke_routed("extractor", [], self.make_llm, _parse, metadata)
+
+        self.assertEqual(parsed, "{}")
+        self.assertEqual(self.models, ["fast"])
+        self.assertEqual(metadata["model_routes"], {"extractor": "fast"})
+        self.assertEqual(metadata["model_usage"]["fast"]["prompt_tokens"], 10)
+
+    async def test_invalid_output_escalates_once(self):
+        self.replies = {"fast": _response("sorry", 8, 2), "strong": _response("{}", 12, 6)}
+        metadata = {}
+        with patch.object(llm, "ESCALATION_MODEL", "strong"):
+            _, parsed = await llm.ainvoke_routed("extractor", [], self.make_llm, _parse, metadata)
+
+        self.assertEqual(parsed, "{}")
+        self.assertEqual(self.models, ["fast", "strong"])
+        usage = metadata["model_usage"]
+        self.assertEqual((usage["fast"]["calls"], usage["fast"]["escalations"]), (1, 0))
+        self.assertEqual((usage["strong"]["completion_tokens"], usage["strong"]["escalations"]), (6, 1))
+        self.assertEqual(metadata["model_routes"], {"extractor": "strong"})
+
+    async def test_no_escalation_to_the_same_model(self):
+        self.replies = {"fast": _response("sorry")}
+        with patch.object(llm, "ESCALATION_MODEL", "fast"):
+            with self.assertRaises(ValueError):
+                await llm.ainvoke_routed("extractor", [], self.make_llm, _parse, {})
+        self.assertEqual(self.models, ["fast"])
+
+    async def test_escalated_failure_raises(self):
+        self.replies = {"fast": _response("sorry"), "strong": _response("still sorry")}
+        with patch.object(llm, "ESCALATION_MODEL", "strong"):
+            with self.assertRaises(ValueError):
+                await llm.ainvoke_routed("extractor", [], self.make_llm, _parse, {})
+        self.assertEqual(self.models, ["fast", "strong"])
+
+    async def test_extractor_node_escalates_on_bad_json(self):
+        self.replies = {
+            "fast": _response("I could not find any changes."),
+            "strong": _response('{"version": "26.5", "top_lane_changes": [{"champion": "Fiora", "type": "buff"}]}'),
+        }
+
+        def extractor_llm(model, **kwargs):
+            return self.make_llm(model)
+
+        with patch.object(llm, "ESCALATION_MODEL", "strong"), \
+                patch.object(extractor, "extractor_llm", side_effect=extractor_llm):
+            result = await extractor.extractor_node({"raw_content": "patch", "messages": [], "metadata": {}})
+
+        self.assertNotIn("error", result)
+        self.assertEqual(result["top_lane_changes"][0]["champion"], "Fiora")
+        self.assertEqual(self.models, ["fast", "strong"])
+
+
+if __name__ == "__main__":
+    unittest.main()
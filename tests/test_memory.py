@@ -0,0 +1,159 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+APP_DIR = os.path.join(PROJECT_ROOT, "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from agents import budget, memory, workflow  # noqa: E402
+from agents.nodes import extractor  # noqa: E402
+
+
+def _response(data):
+    return MagicMock(
+        content=json.dumps(data, ensure_ascii=False),
+        response_metadata={"token_usage": {"prompt_tokens": 10, "completion_tokens": 5}},
+    )
+
+
+class _SpillDirTestCase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.spill_dir = Path(tmp_dir.name)
+        for patcher in (
+            patch.object(memory, "SPILL_DIR", self.spill_dir),
+            patch.object(memory, "SPILL_THRESHOLD_BYTES", 100),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(tmp_dir.cleanup)
+
+    def spill_files(self):
+        return sorted(p.name.split("-")[0] for p in self.spill_dir.iterdir())
+
+
+class TestSpill(_SpillDirTestCase):
+    async def test_large_values_travel_by_reference(self):
+        self.assertEqual(memory.spill("short", "raw_content"), "short")
+
+        text = "补丁说明\n" * 50
+        ref = memory.spill(text, "raw_content")
+        analyses = [{"champion_analyses": [{"champion": "Fiora", "reasoning": "x" * 200}]}]
+        analyses_ref = memory.spill(analyses, "impact_analyses")
+        self.assertIsInstance(ref, memory.SpillRef)
+        self.assertEqual(memory.load(ref), text)
+        self.assertEqual(memory.load(analyses_ref), analyses)
+
+        result = memory.materialize({"raw_content": ref, "impact_analyses": analyses_ref, "version": "26.5"})
+        self.assertEqual(result, {"raw_content": "", "impact_analyses": analyses, "version": "26.5"})
+        self.assertEqual(self.spill_files(), [])
+
+    async def test_track_records_footprint_and_spills_outputs(self):
+        analyses = [{"champion_analyses": [{"champion": "Fiora", "reasoning": "x" * 200}]}]
+
+        async def node(state):
+            return {**state, "impact_analyses": analyses}
+
+        tracked = memory.track("analyzer", node)
+        state = await tracked({"raw_content": "", "impact_analyses": None, "metadata": {}})
+        self.assertNotIn("traced_peak_kb", state["metadata"]["memory"]["nodes"]["analyzer"])
+        with patch.object(memory, "MEMORY_TRACEMALLOC", True):
+            state = await tracked(state)
+
+        self.assertIsInstance(state["impact_analyses"], memory.SpillRef)
+        # The second call replaced the first spill file instead of leaking it
+        self.assertEqual(self.spill_files(), ["impact_analyses"])
+        entry = state["metadata"]["memory"]["nodes"]["analyzer"]
+        self.assertEqual(entry["calls"], 2)
+        for key in ("rss_mb", "rss_delta_mb", "rss_peak_mb", "traced_delta_kb", "traced_peak_kb", "seconds"):
+            self.assertIn(key, entry)
+        self.assertGreater(entry["rss_peak_mb"], 0)
+        memory.materialize(state)
+
+    async def test_ceiling_skips_node(self):
+        node = AsyncMock()
+        with patch.object(memory, "MEMORY_CEILING_MB", 1):
+            state = await memory.track("summarizer", node)({"metadata": {}})
+
+        node.assert_not_awaited()
+        self.assertIn("内存超出上限", state["error"])
+        self.assertTrue(state["metadata"]["memory"]["nodes"]["summarizer"]["skipped"])
+
+    async def test_run_workflow_returns_plain_values(self):
+        graph = MagicMock()
+        graph.ainvoke = AsyncMock(side_effect=lambda state: {**state, "error": None})
+
+        with patch.object(workflow, "create_workflow", return_value=graph):
+            result = await workflow.run_workflow("全文" * 100, version="26.5")
+
+        self.assertIsInstance(graph.ainvoke.await_args.args[0]["raw_content"], memory.SpillRef)
+        self.assertEqual(result["raw_content"], "")
+        self.assertEqual(self.spill_files(), [])
+
+    async def test_failed_run_removes_its_spill_files(self):
+        graph = MagicMock()
+        graph.ainvoke = AsyncMock(side_effect=RuntimeError("boom"))
+
+        with patch.object(workflow, "create_workflow", return_value=graph):
+            with self.assertRaises(RuntimeError):
+                await workflow.run_workflow("全文" * 100, version="26.5")
+
+        self.assertEqual(self.spill_files(), [])
+
+    async def test_sweep_removes_only_stale_files(self):
+        stale = memory.spill("旧" * 100, "raw_content").path
+        fresh = memory.spill("新" * 100, "raw_content").path
+        os.utime(stale, (0, 0))
+
+        self.assertEqual(memory.sweep_spill_dir(max_age_seconds=3600), 1)
+        self.assertFalse(stale.exists())
+        self.assertTrue(fresh.exists())
+
+
+class TestChunkedExtraction(_SpillDirTestCase):
+    async def test_full_patch_is_extracted_in_chunks(self):
+        # Far beyond the old 4000-character cut; the Garen section sits at the end
+        raw = "".join(f"第{i}行 其他位置的改动 " * 3 + "\n" for i in range(200)) + "盖伦 R 伤害提高\n"
+        self.assertGreater(len(raw), 4000)
+        replies = [
+            _response({"version": "26.5", "top_lane_changes": [
+                {"champion": "Fiora", "type": "buff", "details": {"Q": "cd 16 -> 15"}}]}),
+            _response({"top_lane_changes": [{"champion": "Fiora", "type": "buff", "details": {"W": "cd down"}}],
+                       "item_changes": [{"item": "Sundered Sky", "change": "cost down"}]}),
+            _response({"top_lane_changes": [{"champion": "Garen", "type": "buff", "details": {"R": "dmg up"}}]}),
+        ]
+        llm = MagicMock(ainvoke=AsyncMock(side_effect=replies))
+
+        with patch.object(extractor, "extractor_llm", return_value=llm), \
+                patch.object(extractor, "EXTRACTOR_MAX_CHUNKS", 3), \
+                patch.dict(budget.NODE_TOKEN_BUDGETS, {"extractor": 3000}):
+            state = await extractor.extractor_node(workflow.build_initial_state(raw, "unknown"))
+
+        self.assertIsNone(state["error"])
+        prompts = [call.args[0][1].content for call in llm.ainvoke.await_args_list]
+        self.assertEqual(len(prompts), 3)
+        self.assertIn("盖伦 R 伤害提高", prompts[-1])
+        self.assertEqual(state["version"], "26.5")
+        changes = state["top_lane_changes"]
+        self.assertEqual([c.get("champion") or c.get("item") for c in changes], ["Fiora", "Garen", "Sundered Sky"])
+        self.assertEqual(changes[0]["details"], {"Q": "cd 16 -> 15", "W": "cd down"})
+        self.assertEqual(set(state["metadata"]["token_budget"]["calls"]), {
+            "extractor", "extractor.chunk2", "extractor.chunk3",
+        })
+        self.assertEqual(state["metadata"]["extractor_tokens"]["prompt_tokens"], 30)
+        memory.materialize(state)
+
+    def test_split_into_chunks_keeps_lines_whole(self):
+        chunks = extractor.split_into_chunks("aaaa\nbbbb\ncccc\n", 4)
+        self.assertEqual(chunks, ["aaaa\nbbbb\n", "cccc\n"])
+        self.assertEqual(extractor.split_into_chunks("", 10), [""])
+
+
+if __name__ == "__main__":
+    unittest.main()
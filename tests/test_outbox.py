@@ -0,0 +1,190 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+APP_DIR = os.path.join(PROJECT_ROOT, "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+import email_client  # noqa: E402
+import jobs  # noqa: E402
+import outbox  # noqa: E402
+import scheduler  # noqa: E402
+from email_client import ResendEmailClient  # noqa: E402
+
+EMAIL_ENV = {"RESEND_API_KEY": "key", "EMAIL_FROM": "from@example.com", "APP_BASE_URL": "https://example.com"}
+
+
+def _subscribers(n: int) -> list[dict]:
+    return [{"email": f"user{i}@example.com", "unsubscribe_token": f"tok{i}"} for i in range(n)]
+
+
+class OutboxTestCase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.patchers = [
+            patch.object(outbox, "OUTBOX_DB", Path(self.tmp_dir.name) / "outbox.db"),
+            patch.object(jobs, "JOBS_DB", Path(self.tmp_dir.name) / "jobs.db"),
+            patch.object(email_client, "RESEND_BATCH_SIZE", 10),
+            patch.object(email_client, "EMAIL_CONCURRENCY", 3),
+            patch.dict(os.environ, EMAIL_ENV),
+        ]
+        for p in self.patchers:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patchers:
+            p.stop()
+        self.tmp_dir.cleanup()
+
+
+class TestOutboxStore(OutboxTestCase):
+    def test_enqueue_ignores_duplicates(self):
+        self.assertEqual(outbox.enqueue("26.5", "summary", ["S-tier: Fiora"], _subscribers(3)), 3)
+        self.assertEqual(outbox.enqueue("26.5", "summary", ["S-tier: Fiora"], _subscribers(4)), 1)
+        self.assertEqual(outbox.counts("26.5"), {"pending": 4})
+        self.assertEqual(outbox.get_notification("26.5")["highlights"], ["S-tier: Fiora"])
+
+    def test_failed_rows_retry_until_max_attempts(self):
+        outbox.enqueue("26.5", "summary", [], _subscribers(1))
+        for expected in ("pending", "pending", "failed"):
+            _, rows = outbox.claim_batch("26.5", 10)
+            outbox.record_results(rows, [{"error": "bounced"}])
+            self.assertEqual(outbox.counts("26.5"), {expected: 1})
+
+    def test_ambiguous_failures_keep_their_batch_key(self):
+        outbox.enqueue("26.5", "summary", [], _subscribers(2))
+        batch_key, rows = outbox.claim_batch("26.5", 10)
+        outbox.record_results(rows, [{"error": "timeout", "retryable": True}] * 2)
+
+        self.assertEqual(outbox.counts("26.5"), {"sending": 2})
+        self.assertEqual(outbox.claim_batch("26.5", 10), (None, []))
+        [(replay_key, replayed)] = outbox.reclaim_interrupted("26.5")
+        self.assertEqual(replay_key, batch_key)
+        self.assertEqual([r["attempts"] for r in replayed], [2, 2])
+
+    def test_ambiguous_failures_stop_at_max_attempts(self):
+        outbox.enqueue("26.5", "summary", [], _subscribers(1))
+        _, rows = outbox.claim_batch("26.5", 10)
+        for _ in range(outbox.OUTBOX_MAX_ATTEMPTS):
+            outbox.record_results(rows, [{"error": "timeout", "retryable": True}])
+            batches = outbox.reclaim_interrupted("26.5")
+            rows = batches[0][1] if batches else []
+        self.assertEqual(outbox.counts("26.5"), {"failed": 1})
+
+
+class TestOutboxDelivery(OutboxTestCase):
+    async def test_delivers_in_batches_and_never_resends(self):
+        outbox.enqueue("26.5", "summary", ["S-tier: Fiora"], _subscribers(25))
+
+        async def fake_send_batch(messages, idempotency_key=None):
+            return [{"id": f"id-{m['to']}"} for m in messages]
+
+        send_batch = AsyncMock(side_effect=fake_send_batch)
+        with patch.object(ResendEmailClient, "send_batch", send_batch):
+            self.assertEqual(await outbox.deliver("26.5"), {"sent": 25})
+            await outbox.deliver("26.5")
+
+        batches = [c.args[0] for c in send_batch.await_args_list]
+        self.assertEqual(sorted(len(b) for b in batches), [5, 10, 10])
+        self.assertEqual({m["to"] for b in batches for m in b}, {s["email"] for s in _subscribers(25)})
+        self.assertEqual(len({c.kwargs["idempotency_key"] for c in send_batch.await_args_list}), 3)
+
+    async def test_resumes_interrupted_batch_with_same_key(self):
+        outbox.enqueue("26.5", "summary", [], _subscribers(3))
+        batch_key, _ = outbox.claim_batch("26.5", 2)  # process died after claiming
+
+        send_batch = AsyncMock(side_effect=lambda messages, idempotency_key=None: [{"id": "x"} for _ in messages])
+        with patch.object(ResendEmailClient, "send_batch", send_batch):
+            await outbox.deliver("26.5")
+
+        first = send_batch.await_args_list[0]
+        self.assertEqual(first.kwargs["idempotency_key"], batch_key)
+        self.assertEqual(len(first.args[0]), 2)
+        self.assertEqual(outbox.counts("26.5"), {"sent": 3})
+
+    async def test_timed_out_batch_is_replayed_with_same_key(self):
+        outbox.enqueue("26.5", "summary", [], _subscribers(2))
+        send_batch = AsyncMock(side_effect=[
+            TimeoutError("read timeout"),
+            [{"id": "a"}, {"id": "b"}],
+        ])
+        with patch.object(ResendEmailClient, "send_batch", send_batch):
+            with self.assertRaises(RuntimeError):
+                await outbox.deliver("26.5")
+            self.assertEqual(await outbox.deliver("26.5"), {"sent": 2})
+
+        keys = [c.kwargs["idempotency_key"] for c in send_batch.await_args_list]
+        self.assertEqual(len(keys), 2)
+        self.assertEqual(keys[0], keys[1])
+
+    async def test_scheduler_requeues_undelivered_versions(self):
+        outbox.enqueue("26.5", "summary", [], _subscribers(1))
+        outbox.enqueue("26.4", "summary", [], _subscribers(1))
+        _, rows = outbox.claim_batch("26.4", 10)
+        outbox.record_results(rows, [{"id": "x"}])
+
+        scheduler._requeue_undelivered_notifications()
+
+        self.assertIsNotNone(jobs.find_active("notify", "26.5"))
+        self.assertIsNone(jobs.find_active("notify", "26.4"))
+
+    async def test_pending_failures_raise_for_job_retry(self):
+        outbox.enqueue("26.5", "summary", [], _subscribers(2))
+
+        async def fake_send_batch(messages, idempotency_key=None):
+            return [{"error": "bounced"} if m["to"] == "user1@example.com" else {"id": "x"} for m in messages]
+
+        with patch.object(ResendEmailClient, "send_batch", AsyncMock(side_effect=fake_send_batch)):
+            with self.assertRaises(RuntimeError):
+                await outbox.deliver("26.5")
+
+        self.assertEqual(outbox.counts("26.5"), {"sent": 1, "pending": 1})
+
+    async def test_queue_patch_notifications_writes_outbox_and_job(self):
+        with patch("subscribers.iter_active", return_value=iter(_subscribers(2))):
+            scheduler._queue_patch_notifications("26.5", {"summary_report": {"executive_summary": "Big patch"}})
+
+        self.assertEqual(outbox.counts("26.5"), {"pending": 2})
+        self.assertEqual(outbox.get_notification("26.5")["summary"], "Big patch")
+        self.assertIsNotNone(jobs.find_active("notify", "26.5"))
+
+    async def test_queue_patch_notifications_requeues_job_for_pending_rows(self):
+        # An earlier attempt wrote the rows but died before queueing the job
+        outbox.enqueue("26.5", "summary", [], _subscribers(2))
+        with patch("subscribers.iter_active", return_value=iter(_subscribers(2))):
+            scheduler._queue_patch_notifications("26.5", {})
+
+        self.assertEqual(outbox.counts("26.5"), {"pending": 2})
+        self.assertIsNotNone(jobs.find_active("notify", "26.5"))
+
+    async def test_only_requested_announcements_are_recovered(self):
+        cached = {"summary_report": {"executive_summary": "Big patch"}}
+        with (
+            patch("subscribers.iter_active", side_effect=lambda: iter(_subscribers(2))),
+            patch("api.get_cached_analysis", return_value=cached),
+        ):
+            # Emailed before announcements were recorded, or analyzed via the API
+            scheduler._notify_if_missing("26.4")
+            self.assertEqual(outbox.counts("26.4"), {})
+
+            outbox.request_announcement("26.5")
+            self.assertTrue(outbox.announcement_missing("26.5"))
+            scheduler._notify_if_missing("26.5")
+
+        self.assertEqual(outbox.counts("26.5"), {"pending": 2})
+        self.assertFalse(outbox.announcement_missing("26.5"))
+
+    async def test_queue_patch_notifications_skips_job_without_subscribers(self):
+        with patch("subscribers.iter_active", return_value=iter([])):
+            scheduler._queue_patch_notifications("26.5", {})
+
+        self.assertIsNone(jobs.find_active("notify", "26.5"))
+
+
+if __name__ == "__main__":
+    unittest.main()
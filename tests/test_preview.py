@@ -0,0 +1,178 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+APP_DIR = os.path.join(PROJECT_ROOT, "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+import preview  # noqa: E402
+from agents import workflow  # noqa: E402
+
+PREVIEW_CHANGES = [
+    {"type": "champion", "champion": "Fiora", "change_type": "buff", "details": {"Q": "cd 16 -> 15"}},
+    {"type": "champion", "champion": "Darius", "change_type": "nerf", "details": {"W": "cd 7 -> 8"}},
+    {"type": "champion", "champion": "Teemo", "change_type": "buff", "details": {"E": "dmg up"}},
+    {"type": "item", "item": "Sundered Sky", "change": "cost down"},
+]
+LIVE_CHANGES = [
+    PREVIEW_CHANGES[0],
+    {"type": "champion", "champion": "Darius", "change_type": "nerf", "details": {"W": "cd 7 -> 9"}},
+    {"type": "champion", "champion": "Garen", "change_type": "buff", "details": {"R": "dmg up"}},
+    PREVIEW_CHANGES[3],
+]
+PREVIEW_RESULT = {
+    "version": "26.5",
+    "top_lane_changes": PREVIEW_CHANGES,
+    "impact_analyses": [{
+        "champion_analyses": [{"champion": "Fiora"}, {"champion": "Darius", "old": True}, {"champion": "Teemo"}],
+        "meta_overview": {"rising_picks": ["Fiora", "Teemo"], "meta_shift_summary": "preview"},
+    }],
+    "summary_report": {"tier_list": {"S": ["Fiora"]}},
+    "metadata": {},
+}
+
+
+class TestChangeDiff(unittest.TestCase):
+    def test_diff_changes(self):
+        changed, stale = preview.diff_changes(PREVIEW_CHANGES, LIVE_CHANGES)
+        self.assertEqual([c["champion"] for c in changed], ["Darius", "Garen"])
+        self.assertEqual(stale, {"Darius", "Garen", "Teemo"})
+
+    def test_reworded_details_are_not_changes(self):
+        preview_changes = [{"type": "champion", "champion": "Fiora", "change_type": "buff",
+                            "details": {"Q": "冷却时间 16 -> 15"}}]
+        live_changes = [{"type": "champion", "champion": "Fiora", "change_type": "buff",
+                         "details": {"Q技能": "CD 从16秒降低到15秒"}}]
+        self.assertEqual(preview.diff_changes(preview_changes, live_changes), ([], set()))
+
+    def test_diff_uses_source_sections_when_notes_are_available(self):
+        preview_raw = "英雄改动\nFiora\nQ 冷却 16 -> 15\nDarius\nW 冷却 7 -> 8\n"
+        live_raw = "英雄改动（正式）\nFiora\nQ 冷却 16 -> 15\nDarius\nW 冷却 7 -> 9\n"
+        # The LLM worded Fiora differently and repeated Darius verbatim; the source text decides
+        preview_changes = [
+            {"type": "champion", "champion": "Fiora", "details": {"Q": "cd 16 -> 15"}},
+            {"type": "champion", "champion": "Darius", "details": {"W": "cd up"}},
+        ]
+        live_changes = [
+            {"type": "champion", "champion": "Fiora", "details": {"Q": "冷却缩短至15秒", "被动": "1"}},
+            {"type": "champion", "champion": "Darius", "details": {"W": "cd up"}},
+        ]
+        changed, stale = preview.diff_changes(preview_changes, live_changes, preview_raw, live_raw)
+        self.assertEqual([c["champion"] for c in changed], ["Darius"])
+        self.assertEqual(stale, {"Darius"})
+
+    def test_merge_analyses(self):
+        fresh = [{"champion_analyses": [{"champion": "Darius"}, {"champion": "Garen"}],
+                  "meta_overview": {"rising_picks": ["Garen"]}}]
+        merged = preview.merge_analyses(PREVIEW_RESULT["impact_analyses"], fresh, {"Darius", "Teemo"}, "26.5")[0]
+        self.assertEqual([a["champion"] for a in merged["champion_analyses"]], ["Fiora", "Darius", "Garen"])
+        self.assertNotIn("old", merged["champion_analyses"][1])
+        self.assertEqual(merged["meta_overview"]["rising_picks"], ["Fiora", "Garen"])
+        self.assertEqual(merged["meta_overview"]["meta_shift_summary"], "preview")
+
+
+class TestAnalyzeRelease(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        patcher = patch.object(preview, "PROVISIONAL_DIR", Path(self.tmp_dir.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp_dir.cleanup)
+        preview.save_provisional("26.5", "preview notes", PREVIEW_RESULT, "pbe.txt")
+
+    async def test_identical_notes_are_promoted_without_llm_calls(self):
+        with patch.object(workflow, "run_workflow", new=AsyncMock()) as wf_mock, \
+                patch.object(workflow, "extractor_node", new=AsyncMock()) as extractor_mock:
+            result = await preview.analyze_release("  preview notes\n", "26.5")
+
+        wf_mock.assert_not_awaited()
+        extractor_mock.assert_not_awaited()
+        self.assertEqual(result["summary_report"], PREVIEW_RESULT["summary_report"])
+        self.assertEqual(result["metadata"]["preview"]["mode"], "promoted")
+        self.assertEqual(result["metadata"]["preview"]["source"], "pbe.txt")
+        self.assertIsNone(preview.load_provisional("26.5"))
+
+    async def test_changed_notes_reanalyze_only_changed_champions(self):
+        async def extractor(state):
+            return {**state, "top_lane_changes": LIVE_CHANGES, "raw_content": ""}
+
+        fresh = [{"champion_analyses": [{"champion": "Darius"}, {"champion": "Garen"}], "meta_overview": {}}]
+        analysis_graph = MagicMock()
+        analysis_graph.ainvoke = AsyncMock(side_effect=lambda state: {**state, "impact_analyses": fresh})
+        summarizer = AsyncMock(side_effect=lambda state: {**state, "summary_report": {"tier_list": {}}})
+
+        with patch.object(workflow, "extractor_node", side_effect=extractor), \
+                patch.object(workflow, "create_analysis_workflow", return_value=analysis_graph), \
+                patch.object(workflow, "summarizer_node", new=summarizer):
+            result = await preview.analyze_release("live notes", "26.5")
+
+        analyzed = analysis_graph.ainvoke.await_args.args[0]["top_lane_changes"]
+        self.assertEqual([c["champion"] for c in analyzed], ["Darius", "Garen"])
+        summarized = summarizer.await_args.args[0]
+        self.assertEqual(summarized["top_lane_changes"], LIVE_CHANGES)
+        champions = [a["champion"] for a in summarized["impact_analyses"][0]["champion_analyses"]]
+        self.assertEqual(champions, ["Fiora", "Darius", "Garen"])
+        self.assertEqual(result["metadata"]["preview"]["mode"], "incremental")
+        self.assertEqual(result["metadata"]["preview"]["reanalyzed"], 2)
+
+    async def test_without_provisional_runs_full_workflow(self):
+        fake_result = {"version": "26.6"}
+        with patch.object(workflow, "run_workflow", new=AsyncMock(return_value=fake_result)) as wf_mock:
+            result = await preview.analyze_release("live notes", "26.6")
+        wf_mock.assert_awaited_once_with("live notes", version="26.6")
+        self.assertEqual(result, fake_result)
+
+
+class TestPreviewEndpoints(unittest.TestCase):
+    def setUp(self):
+        import api
+        from fastapi.testclient import TestClient
+
+        self.api = api
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.patchers = [
+            patch.object(preview, "PROVISIONAL_DIR", Path(self.tmp_dir.name)),
+            patch.object(api, "ADMIN_TOKEN", "secret"),
+        ]
+        for p in self.patchers:
+            p.start()
+        self.client = TestClient(api.app)
+
+    def tearDown(self):
+        for p in self.patchers:
+            p.stop()
+        self.tmp_dir.cleanup()
+
+    def test_submit_preview_queues_job(self):
+        self.assertEqual(self.client.post("/api/admin/previews", json={"version": "26.5"}).status_code, 403)
+
+        headers = {"X-Admin-Token": "secret"}
+        resp = self.client.post("/api/admin/previews", json={"version": "26.5"}, headers=headers)
+        self.assertEqual(resp.status_code, 400)
+
+        with patch.object(self.api, "get_cached_analysis", return_value=None), \
+                patch.object(self.api.jobs, "enqueue", return_value=({"id": "job1"}, True)) as enqueue_mock, \
+                patch.object(self.api.job_pool, "notify") as notify_mock:
+            resp = self.client.post(
+                "/api/admin/previews", json={"version": "26.5", "url": "https://example.com/pbe"}, headers=headers,
+            )
+
+        self.assertEqual(resp.json(), {"status": "analyzing", "version": "26.5", "job_id": "job1"})
+        enqueue_mock.assert_called_once_with("preview", "26.5", {"raw_content": None, "url": "https://example.com/pbe"})
+        notify_mock.assert_called_once()
+
+    def test_get_preview(self):
+        self.assertEqual(self.client.get("/api/previews/26.5").status_code, 404)
+        preview.save_provisional("26.5", "notes", PREVIEW_RESULT, "upload")
+        data = self.client.get("/api/previews/26.5").json()
+        self.assertTrue(data["provisional"])
+        self.assertEqual(data["summary_report"], PREVIEW_RESULT["summary_report"])
+
+
+if __name__ == "__main__":
+    unittest.main()
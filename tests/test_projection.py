@@ -0,0 +1,115 @@
+import json
+import os
+import shutil
+import sys
+import unittest
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+APP_DIR = os.path.join(PROJECT_ROOT, "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+import api  # noqa: E402
+import history  # noqa: E402
+
+REPORT = {
+    "version": "26.3",
+    "top_lane_changes": [{"type": "champion", "champion": "菲奥娜"}],
+    "impact_analyses": [{"champion_analyses": []}],
+    "summary_report": {
+        "tier_list": {"S": [{"champion": "菲奥娜"}]},
+        "executive_summary": "剑姬回归",
+    },
+    "metadata": {"extractor_tokens": {}},
+}
+
+
+class TestFieldProjection(unittest.TestCase):
+    def setUp(self):
+        self.originals = (api.CACHE_DIR, api.VERSIONS_INDEX, history.HISTORY_DB, history.HISTORY_FILE)
+        self.test_dir = Path("data/cache/_test_projection")
+        self.test_dir.mkdir(parents=True, exist_ok=True)
+        api.CACHE_DIR = self.test_dir
+        api.VERSIONS_INDEX = self.test_dir / "versions.json"
+        history.HISTORY_DB = self.test_dir / "history.db"
+        history.HISTORY_FILE = self.test_dir / "history.json"
+        self.client = TestClient(api.app)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+        api.CACHE_DIR, api.VERSIONS_INDEX, history.HISTORY_DB, history.HISTORY_FILE = self.originals
+
+    def test_parse_fields_rejects_unknown_section(self):
+        self.assertEqual(api.parse_fields("top_lane_changes, summary_report.tier_list"),
+                         ["top_lane_changes", "summary_report.tier_list"])
+        with self.assertRaises(ValueError):
+            api.parse_fields("secrets")
+        with self.assertRaises(ValueError):
+            api.parse_fields("summary_report/../x")
+
+    def test_save_splits_sections(self):
+        api.save_analysis_to_cache("26.3", REPORT)
+        section_dir = self.test_dir / "sections" / "26.3"
+        self.assertTrue((section_dir / "metadata.json").exists())
+        tier_list = json.loads((section_dir / "summary_report.tier_list.json").read_text(encoding="utf-8"))
+        self.assertEqual(tier_list, REPORT["summary_report"]["tier_list"])
+
+    def test_fields_query_returns_only_requested_sections(self):
+        api.save_analysis_to_cache("26.3", REPORT)
+        resp = self.client.get("/api/versions/26.3", params={"fields": "top_lane_changes,summary_report.tier_list"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json(), {
+            "version": "26.3",
+            "top_lane_changes": REPORT["top_lane_changes"],
+            "summary_report": {"tier_list": REPORT["summary_report"]["tier_list"]},
+        })
+
+    def test_fields_fall_back_to_full_cache(self):
+        with patch.object(api, "get_cached_analysis", return_value=REPORT):
+            resp = self.client.get("/api/versions/26.2", params={"fields": "summary_report.executive_summary"})
+        self.assertEqual(resp.json(), {"version": "26.3", "summary_report": {"executive_summary": "剑姬回归"}})
+
+    def test_invalid_fields_returns_400(self):
+        resp = self.client.get("/api/versions/26.3", params={"fields": "nope"})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_section_endpoint(self):
+        api.save_analysis_to_cache("26.3", REPORT)
+        resp = self.client.get("/api/versions/26.3/summary_report.executive_summary")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json(), "剑姬回归")
+
+        resp = self.client.get("/api/versions/99.99/metadata")
+        self.assertEqual(resp.status_code, 404)
+
+    def test_eviction_removes_sections(self):
+        with patch.object(api, "MAX_CACHED_VERSIONS", 1):
+            api.save_analysis_to_cache("26.2", {**REPORT, "version": "26.2"})
+            api.save_analysis_to_cache("26.3", REPORT)
+        self.assertFalse((self.test_dir / "sections" / "26.2").exists())
+        self.assertTrue((self.test_dir / "sections" / "26.3").exists())
+
+
+    def test_memo_survives_concurrent_loads(self):
+        paths = []
+        for i in range(6):
+            path = self.test_dir / f"memo{i}.json"
+            path.write_text(json.dumps({"i": i}), encoding="utf-8")
+            paths.append(path)
+
+        with patch.object(api, "_JSON_MEMO_SIZE", 2), patch.object(api, "_json_memo", OrderedDict()):
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                loaded = list(pool.map(api._load_json_file, paths * 50))
+            self.assertLessEqual(len(api._json_memo), 2)
+
+        self.assertEqual([d["i"] for d in loaded], list(range(6)) * 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import json
+import os
+import sys
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+APP_DIR = os.path.join(PROJECT_ROOT, "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from agents import prompt_codec  # noqa: E402
+from agents.nodes import summarizer  # noqa: E402
+
+ANALYSES = [
+    {
+        "champion": f"英雄{i}",
+        "change_type": "buff",
+        "gameplay_changes": {"laning_phase": "对线更强", "teamfight_role": "前排", "build_adjustment": "先出日炎"},
+        "meta_impact": {
+            "tier_prediction": "A",
+            "tier_change": "B到A",
+            "counter_changes": ["克制剑姬", "怕重伤"],
+            "synergy_items": ["日炎圣盾", "荆棘之甲"],
+        },
+        "overall_assessment": {
+            "strength_score": 7,
+            "worth_practicing": True,
+            "win_rate_trend": "上升",
+            "reasoning": "基础属性提升",
+        },
+    }
+    for i in range(10)
+]
+
+
+class TestPromptCodec(unittest.TestCase):
+    def test_encode_table_header_and_rows(self):
+        table = prompt_codec.encode_table(
+            [{"a": "x|y", "b": {"c": ["1", "2"]}}, {"a": "line\nbreak"}], ["a", "b.c"]
+        )
+        self.assertEqual(table.splitlines(), ["a|c", "x/y|1、2", "line break|"])
+
+    def test_compact_encoding_is_much_smaller(self):
+        indented = json.dumps(ANALYSES, ensure_ascii=False, indent=2)
+        table = prompt_codec.encode_table(ANALYSES, summarizer.STEP1_COLUMNS)
+        self.assertLess(prompt_codec.count_tokens(table), prompt_codec.count_tokens(indented) / 2)
+
+    def test_count_tokens_fallback_estimate(self):
+        with patch.object(prompt_codec, "_encoder", return_value=None):
+            self.assertEqual(prompt_codec.count_tokens("蒙多医生"), 4)
+            self.assertEqual(prompt_codec.count_tokens("abcdefgh"), 2)
+
+
+class TestSummarizerPrompts(unittest.IsolatedAsyncioTestCase):
+    async def test_step_prompts_drop_unused_fields(self):
+        response = MagicMock(content='{"tier_list": {}}', response_metadata={"token_usage": {}})
+        llm = MagicMock(ainvoke=AsyncMock(return_value=response))
+
+        with patch.object(summarizer, "summarizer_llm", return_value=llm):
+            step1 = await summarizer._aggregate_tier_list_and_meta(ANALYSES, {"meta_shift_summary": "坦克回归"})
+            await summarizer._enhance_builds_and_counters(
+                ANALYSES, {"A": [{"champion": "英雄0", "reason": "很长的理由"}]}, []
+            )
+
+        step1_prompt = llm.ainvoke.await_args_list[0].args[0][0].content
+        step2_prompt = llm.ainvoke.await_args_list[1].args[0][0].content
+        self.assertNotIn("worth_practicing", step1_prompt)
+        self.assertNotIn("synergy_items", step1_prompt)
+        self.assertIn("英雄9|buff|A", step1_prompt)
+        self.assertIn('{"A":["英雄0"]}', step2_prompt)
+        self.assertNotIn("很长的理由", step2_prompt)
+        self.assertGreater(step1["tokens"]["estimated_prompt_tokens"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
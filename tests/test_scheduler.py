@@ -1,6 +1,8 @@
 import os
 import sys
 import unittest
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
 from unittest.mock import AsyncMock, MagicMock, patch
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -12,45 +14,77 @@ import scheduler  # noqa: E402
 
 
 class TestCheckForNewVersion(unittest.IsolatedAsyncioTestCase):
-    async def test_new_version_triggers_workflow(self):
+    async def test_new_version_queues_analysis_job(self):
         fake_index = {"latest": "26.3", "versions": []}
-        fake_result = {"version": "26.4", "top_lane_changes": []}
+        queued = {"status": "analyzing", "version": "26.4", "job_id": "job-1"}
 
         with (
+            patch.object(
+                scheduler.LOLOfficialCrawler, "probe_latest_version",
+                new=AsyncMock(return_value=("https://lol.qq.com/x.html", "26.4")),
+            ),
             patch.object(
                 scheduler.LOLOfficialCrawler, "fetch_latest_patch_notes",
                 new=AsyncMock(return_value=("raw patch", "26.4")),
             ),
             patch("api.load_versions_index", return_value=fake_index),
-            patch("agents.workflow.run_workflow", new=AsyncMock(return_value=fake_result)) as wf_mock,
-            patch("api.save_analysis_to_cache") as cache_mock,
+            patch("api._start_analysis_job", return_value=queued) as start_mock,
+            patch("outbox.request_announcement") as announce_mock,
+            patch("agents.workflow.run_workflow", new=AsyncMock()) as wf_mock,
         ):
             result = await scheduler.check_for_new_version()
 
-        self.assertEqual(result["status"], "new")
-        self.assertEqual(result["version"], "26.4")
-        wf_mock.assert_awaited_once_with("raw patch", version="26.4")
-        cache_mock.assert_called_once_with("26.4", fake_result)
+        self.assertEqual(result, {"status": "new", "version": "26.4", "job_id": "job-1"})
+        # Analysis runs on the worker pool, not inside the check
+        start_mock.assert_called_once_with("26.4", "raw patch", notify=True)
+        announce_mock.assert_called_once_with("26.4")
+        wf_mock.assert_not_awaited()
+
+    async def test_unchanged_announced_release_without_notifications_queues_them(self):
+        fake_index = {"latest": "26.3", "versions": []}
+        cached = {"version": "26.3", "top_lane_changes": []}
+
+        with (
+            patch.dict(os.environ, {
+                "RESEND_API_KEY": "key", "EMAIL_FROM": "from@example.com", "APP_BASE_URL": "https://example.com",
+            }),
+            patch.object(
+                scheduler.LOLOfficialCrawler, "probe_latest_version",
+                new=AsyncMock(return_value=("https://lol.qq.com/x.html", "26.3")),
+            ),
+            patch("api.load_versions_index", return_value=fake_index),
+            patch("api.get_cached_analysis", return_value=cached),
+            patch("outbox.announcement_missing", return_value=True),
+            patch.object(scheduler, "_queue_patch_notifications") as notify_mock,
+        ):
+            result = await scheduler.check_for_new_version()
+
+        self.assertEqual(result["status"], "unchanged")
+        notify_mock.assert_called_once_with("26.3", cached)
 
     async def test_same_version_is_noop(self):
         fake_index = {"latest": "26.3", "versions": []}
 
         with (
             patch.object(
-                scheduler.LOLOfficialCrawler, "fetch_latest_patch_notes",
-                new=AsyncMock(return_value=("raw patch", "26.3")),
+                scheduler.LOLOfficialCrawler, "probe_latest_version",
+                new=AsyncMock(return_value=("https://lol.qq.com/x.html", "26.3")),
             ),
+            patch.object(
+                scheduler.LOLOfficialCrawler, "fetch_latest_patch_notes", new=AsyncMock(),
+            ) as fetch_mock,
             patch("api.load_versions_index", return_value=fake_index),
             patch("agents.workflow.run_workflow", new=AsyncMock()) as wf_mock,
         ):
             result = await scheduler.check_for_new_version()
 
         self.assertEqual(result["status"], "unchanged")
+        fetch_mock.assert_not_awaited()
         wf_mock.assert_not_awaited()
 
     async def test_crawler_error_returns_error_status(self):
         with patch.object(
-            scheduler.LOLOfficialCrawler, "fetch_latest_patch_notes",
+            scheduler.LOLOfficialCrawler, "probe_latest_version",
             new=AsyncMock(side_effect=RuntimeError("network error")),
         ):
             result = await scheduler.check_for_new_version()
@@ -59,6 +93,106 @@ class TestCheckForNewVersion(unittest.IsolatedAsyncioTestCase):
         self.assertIn("network error", result["error"])
 
 
+class TestLeaderGating(unittest.IsolatedAsyncioTestCase):
+    async def test_scheduled_check_skips_when_not_leader(self):
+        with (
+            patch.object(scheduler.leader_elector, "is_leader", False),
+            patch.object(scheduler, "check_for_new_version", new=AsyncMock()) as check_mock,
+        ):
+            await scheduler._scheduled_check()
+        check_mock.assert_not_awaited()
+
+    async def test_exclusive_check_reports_busy(self):
+        @asynccontextmanager
+        async def _taken(name):
+            yield False
+
+        with (
+            patch.object(scheduler, "hold", _taken),
+            patch.object(scheduler, "check_for_new_version", new=AsyncMock()) as check_mock,
+        ):
+            result = await scheduler.run_exclusive_check()
+        self.assertEqual(result, {"status": "busy"})
+        check_mock.assert_not_awaited()
+
+
+class _NoJitter:
+    def uniform(self, a, b):
+        return 0.0
+
+
+class TestAdaptiveSchedule(unittest.TestCase):
+    def setUp(self):
+        # Releases every 14 days at 08:00 UTC, plus a backfill 1 hour after the last one
+        self.versions = [
+            {"version": "26.1", "analyzed_at": "2026-01-07T08:00:00+00:00"},
+            {"version": "26.2", "analyzed_at": "2026-01-21T08:00:00+00:00"},
+            {"version": "26.3", "analyzed_at": "2026-02-04T08:00:00+00:00"},
+            {"version": "25.24", "analyzed_at": "2026-02-04T09:00:00+00:00"},
+        ]
+
+    def _delay(self, now, errors=0):
+        return scheduler.compute_next_check_delay(
+            self.versions, now=datetime.fromisoformat(now), consecutive_errors=errors, rng=_NoJitter(),
+        )
+
+    def test_estimate_ignores_backfill_gaps(self):
+        # Anchored on the 26.3 release (08:00), not on the 25.24 backfill an hour later
+        expected = scheduler.estimate_next_release(self.versions)
+        self.assertEqual(expected, datetime.fromisoformat("2026-02-18T08:00:00+00:00"))
+
+    def test_polls_fastest_at_expected_release(self):
+        self.assertEqual(self._delay("2026-02-18T08:00:00+00:00"), scheduler.MIN_CHECK_INTERVAL_SECONDS)
+
+    def test_interval_ramps_toward_window_edges(self):
+        near = self._delay("2026-02-18T07:30:00+00:00")
+        far = self._delay("2026-02-18T05:30:00+00:00")
+        self.assertLess(scheduler.MIN_CHECK_INTERVAL_SECONDS, near)
+        self.assertLess(near, far)
+        self.assertLessEqual(far, scheduler.RELEASE_EDGE_INTERVAL_SECONDS)
+
+    def test_polls_rarely_far_from_release(self):
+        self.assertEqual(self._delay("2026-02-08T00:00:00+00:00"), scheduler.MAX_CHECK_INTERVAL_SECONDS)
+
+    def test_sleeps_until_window_opens(self):
+        # Window opens at 05:00 (3h before expected 08:00)
+        self.assertEqual(self._delay("2026-02-18T03:00:00+00:00"), 7200)
+
+    def test_overdue_release_uses_steady_interval(self):
+        self.assertEqual(self._delay("2026-02-20T00:00:00+00:00"), scheduler.CHECK_INTERVAL_SECONDS)
+
+    def _polls_until(self, release):
+        now = datetime.fromisoformat("2026-02-04T09:00:00+00:00")
+        polls = 0
+        while now < release:
+            now += timedelta(seconds=self._delay(now.isoformat()))
+            polls += 1
+        return polls
+
+    def test_cycle_polls_fewer_than_fixed_hourly(self):
+        expected = datetime.fromisoformat("2026-02-18T08:00:00+00:00")
+        start = datetime.fromisoformat("2026-02-04T09:00:00+00:00")
+        for late in (timedelta(0), timedelta(hours=2), timedelta(days=1)):
+            release = expected + late
+            hourly = (release - start) / timedelta(seconds=scheduler.CHECK_INTERVAL_SECONDS)
+            self.assertLess(self._polls_until(release), hourly, late)
+
+    def test_errors_back_off(self):
+        self.assertEqual(
+            self._delay("2026-02-18T08:00:00+00:00", errors=3),
+            scheduler.MIN_CHECK_INTERVAL_SECONDS * 8,
+        )
+
+    def test_no_history_uses_default_interval(self):
+        delay = scheduler.compute_next_check_delay([], rng=_NoJitter())
+        self.assertEqual(delay, scheduler.CHECK_INTERVAL_SECONDS)
+
+    def test_jitter_is_bounded(self):
+        delay = scheduler.compute_next_check_delay([])
+        self.assertLessEqual(abs(delay - scheduler.CHECK_INTERVAL_SECONDS),
+                             scheduler.CHECK_INTERVAL_SECONDS * scheduler.CHECK_JITTER_RATIO)
+
+
 class TestSchedulerLifecycle(unittest.TestCase):
     def test_start_and_stop(self):
         with patch("scheduler.AsyncIOScheduler") as MockSched:
@@ -0,0 +1,75 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+APP_DIR = os.path.join(PROJECT_ROOT, "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from agents import structured_output  # noqa: E402
+from agents.structured_output import OutputParseError, parse_json, repair_json  # noqa: E402
+
+
+class TestRepairJson(unittest.TestCase):
+    def test_code_fence_and_prose(self):
+        content = 'Here you go:\n```json\n{"tier_list": {"S": []}}\n```\nLet me know if {you} need more.'
+        self.assertEqual(parse_json(content, "summarizer.step1"), {"tier_list": {"S": []}})
+
+    def test_trailing_commas(self):
+        content = '{"champion_analyses": [{"champion": "Fiora",},\n],\n "meta_overview": {},}'
+        data = parse_json(content, "analyzer")
+        self.assertEqual(data["champion_analyses"], [{"champion": "Fiora"}])
+
+    def test_braces_and_commas_inside_strings_are_kept(self):
+        content = 'x {"top_lane_changes": [], "version": "a,} ]\\"b"} y'
+        self.assertEqual(parse_json(content, "extractor")["version"], 'a,} ]"b')
+
+    def test_raw_newline_in_string(self):
+        self.assertEqual(parse_json('```{"executive_summary": "line1\nline2", "tier_list": {}}```')["tier_list"], {})
+
+    def test_truncated_or_missing_object(self):
+        with self.assertRaises(OutputParseError):
+            repair_json('{"tier_list": {"S": [')
+        with self.assertRaises(OutputParseError):
+            parse_json("no json here")
+
+    def test_long_output_is_linear(self):
+        body = ",".join(f'{{"champion": "c{i}", "details": "{"x" * 50}"}}' for i in range(5000))
+        content = "```json\n{\"champion_analyses\": [" + body + ",]}\n```"
+        self.assertEqual(len(parse_json(content, "analyzer")["champion_analyses"]), 5000)
+
+
+class TestValidation(unittest.TestCase):
+    def test_missing_required_field(self):
+        with self.assertRaises(OutputParseError):
+            parse_json('{"meta_ecosystem": {}}', "summarizer.step1")
+
+    def test_wrong_type(self):
+        with self.assertRaises(OutputParseError):
+            parse_json('{"champion_analyses": {}}', "analyzer")
+
+    def test_optional_null_allowed(self):
+        self.assertIsNone(parse_json('{"top_lane_changes": [], "item_changes": null}', "extractor")["item_changes"])
+
+    def test_parse_error_is_value_error(self):
+        # The router escalates on ValueError
+        self.assertTrue(issubclass(OutputParseError, ValueError))
+
+
+class TestResponseFormat(unittest.TestCase):
+    def test_modes(self):
+        with patch.object(structured_output, "LLM_RESPONSE_FORMAT", "json_object"):
+            self.assertEqual(structured_output.response_format("analyzer"), {"type": "json_object"})
+        with patch.object(structured_output, "LLM_RESPONSE_FORMAT", "none"):
+            self.assertIsNone(structured_output.response_format("analyzer"))
+        with patch.object(structured_output, "LLM_RESPONSE_FORMAT", "json_schema"):
+            fmt = structured_output.response_format("summarizer.step1")
+        self.assertEqual(fmt["json_schema"]["name"], "summarizer_step1")
+        self.assertEqual(fmt["json_schema"]["schema"]["required"], ["tier_list"])
+        self.assertEqual(fmt["json_schema"]["schema"]["properties"]["tier_list"], {"type": "object"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,12 @@
+import asyncio
+import json
 import os
 import sys
+import tempfile
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from unittest.mock import patch
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 APP_DIR = os.path.join(PROJECT_ROOT, "app")
@@ -13,16 +18,17 @@ import subscribers  # noqa: E402
 
 class TestSubscribers(unittest.TestCase):
     def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
         self.original_file = subscribers.SUBSCRIBERS_FILE
-        self.test_file = Path("data/_test_subscribers.json")
+        self.original_db = subscribers.SUBSCRIBERS_DB
+        self.test_file = Path(self.tmp_dir.name) / "subscribers.json"
         subscribers.SUBSCRIBERS_FILE = self.test_file
-        if self.test_file.exists():
-            self.test_file.unlink()
+        subscribers.SUBSCRIBERS_DB = Path(self.tmp_dir.name) / "subscribers.db"
 
     def tearDown(self):
-        if self.test_file.exists():
-            self.test_file.unlink()
         subscribers.SUBSCRIBERS_FILE = self.original_file
+        subscribers.SUBSCRIBERS_DB = self.original_db
+        self.tmp_dir.cleanup()
 
     def test_upsert_creates_new_subscriber(self):
         sub, action = subscribers.upsert_active("test@example.com")
@@ -66,6 +72,136 @@ class TestSubscribers(unittest.TestCase):
         self.assertIn("active@example.com", emails)
         self.assertNotIn("gone@example.com", emails)
 
+    def test_iter_active_pages_in_id_order(self):
+        for i in range(7):
+            subscribers.upsert_active(f"user{i}@example.com")
+        gone, _ = subscribers.upsert_active("gone@example.com")
+        subscribers.unsubscribe_by_token(gone["unsubscribe_token"])
+
+        streamed = [s["email"] for s in subscribers.iter_active(page_size=3)]
+        self.assertEqual(streamed, [f"user{i}@example.com" for i in range(7)])
+
+    def test_iter_active_resumes_on_another_thread(self):
+        for i in range(4):
+            subscribers.upsert_active(f"user{i}@example.com")
+        pages = subscribers.iter_active(page_size=2)
+
+        # StreamingResponse drives sync iterators from whichever threadpool worker is free
+        with ThreadPoolExecutor(max_workers=1) as first, ThreadPoolExecutor(max_workers=1) as second:
+            emails = [first.submit(next, pages).result()["email"]]
+            emails += [s["email"] for s in second.submit(list, pages).result()]
+
+        self.assertEqual(emails, [f"user{i}@example.com" for i in range(4)])
+
+    def test_bulk_insert_skips_existing_and_unsubscribed(self):
+        subscribers.upsert_active("active@example.com")
+        gone, _ = subscribers.upsert_active("gone@example.com")
+        subscribers.unsubscribe_by_token(gone["unsubscribe_token"])
+
+        counts = subscribers.bulk_insert(
+            ["new@example.com", "active@example.com", "gone@example.com", "new@example.com"]
+        )
+
+        self.assertEqual(counts, {"created": 1, "already_active": 1, "unsubscribed": 1})
+        emails = [s["email"] for s in subscribers.list_active()]
+        self.assertEqual(emails, ["active@example.com", "new@example.com"])
+
+    def test_migrates_legacy_json_file_once(self):
+        self.test_file.write_text(json.dumps({"subscribers": [
+            {"email": "old@example.com", "status": "active", "unsubscribe_token": "tok-old",
+             "created_at": "2025-01-01T00:00:00+00:00", "updated_at": "2025-01-01T00:00:00+00:00"},
+            {"email": "gone@example.com", "status": "unsubscribed", "unsubscribe_token": "tok-gone",
+             "created_at": "2025-01-01T00:00:00+00:00", "updated_at": "2025-01-01T00:00:00+00:00"},
+        ]}), encoding="utf-8")
+
+        self.assertEqual([s["email"] for s in subscribers.list_active()], ["old@example.com"])
+        self.assertEqual(subscribers.unsubscribe_by_token("tok-old")["email"], "old@example.com")
+
+        # The file is not re-imported on later connections
+        self.assertEqual(subscribers.list_active(), [])
+
+    def test_concurrent_upserts_create_one_row(self):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            actions = [a for _, a in pool.map(lambda _: subscribers.upsert_active("race@example.com"), range(16))]
+        self.assertEqual(actions.count("created"), 1)
+        self.assertEqual(len(subscribers.list_active()), 1)
+
+
+
+class TestSubscriberAdminEndpoints(unittest.TestCase):
+    def setUp(self):
+        import api
+        from fastapi.testclient import TestClient
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.patchers = [
+            patch.object(subscribers, "SUBSCRIBERS_DB", Path(self.tmp_dir.name) / "subscribers.db"),
+            patch.object(subscribers, "SUBSCRIBERS_FILE", Path(self.tmp_dir.name) / "subscribers.json"),
+            patch.object(api, "ADMIN_TOKEN", "secret"),
+            patch.object(api, "SUBSCRIBER_IMPORT_BATCH_SIZE", 2),
+        ]
+        for p in self.patchers:
+            p.start()
+        self.api = api
+        self.client = TestClient(api.app)
+        self.headers = {"X-Admin-Token": "secret"}
+
+    def tearDown(self):
+        for p in self.patchers:
+            p.stop()
+        self.tmp_dir.cleanup()
+
+    def test_requires_admin_token(self):
+        resp = self.client.get("/api/admin/subscribers:export")
+        self.assertEqual(resp.status_code, 403)
+        resp = self.client.post("/api/admin/subscribers:import", content="a@b.com", headers={"X-Admin-Token": "x"})
+        self.assertEqual(resp.status_code, 403)
+
+    def test_import_csv_validates_and_deduplicates(self):
+        body = (
+            "name,email\nA,One@Example.com\nB,not-an-email\n"
+            "C,two@example.com\nD,one@example.com\nE,three@example.com\n"
+        )
+        resp = self.client.post("/api/admin/subscribers:import", content=body, headers=self.headers)
+
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertEqual((data["created"], data["already_active"], data["invalid"]), (3, 1, 1))
+        self.assertEqual(data["invalid_samples"], ["not-an-email"])
+        self.assertEqual(len(subscribers.list_active()), 3)
+
+    def test_body_lines_keep_multibyte_characters_split_across_chunks(self):
+        body = "name,email\n盖伦,garen@example.com\n剑姬".encode("utf-8")
+        split = body.index("盖".encode("utf-8")) + 1  # inside the first character
+
+        class _Request:
+            async def stream(self):
+                for chunk in (body[:split], body[split:-2], body[-2:]):
+                    yield chunk
+
+        async def _collect():
+            return [line async for line in self.api._iter_body_lines(_Request())]
+
+        self.assertEqual(asyncio.run(_collect()), ["name,email", "盖伦,garen@example.com", "剑姬"])
+
+    def test_import_ndjson_then_export_round_trip(self):
+        body = '{"email": "a@example.com"}\n"b@example.com"\n{"email": 42}\n'
+        resp = self.client.post(
+            "/api/admin/subscribers:import?format=ndjson", content=body, headers=self.headers
+        )
+        self.assertEqual(resp.json()["created"], 2)
+        self.assertEqual(resp.json()["invalid"], 1)
+
+        resp = self.client.get("/api/admin/subscribers:export?format=ndjson", headers=self.headers)
+        self.assertEqual(resp.headers["content-type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in resp.text.splitlines()]
+        self.assertEqual([r["email"] for r in rows], ["a@example.com", "b@example.com"])
+
+        resp = self.client.get("/api/admin/subscribers:export", headers=self.headers)
+        lines = resp.text.splitlines()
+        self.assertEqual(lines[0], "email,status,unsubscribe_token,created_at,updated_at")
+        self.assertEqual(len(lines), 3)
+
 
 if __name__ == "__main__":
     unittest.main()
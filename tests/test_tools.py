@@ -0,0 +1,147 @@
+import asyncio
+import os
+import sys
+import unittest
+from unittest.mock import AsyncMock, patch
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+APP_DIR = os.path.join(PROJECT_ROOT, "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from agents import tools  # noqa: E402
+from agents.nodes import tool_executor  # noqa: E402
+from langchain_core.messages import AIMessage  # noqa: E402
+
+
+class TestSearchCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = tools.SearchCache(maxsize=2, ttl=60)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.get("a")
+        cache.put("c", "3")
+        self.assertEqual(cache.get("a"), "1")
+        self.assertIsNone(cache.get("b"))
+
+    def test_entries_expire(self):
+        cache = tools.SearchCache(maxsize=2, ttl=-1)
+        cache.put("a", "1")
+        self.assertIsNone(cache.get("a"))
+
+
+class TestWebSearch(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.cache_patcher = patch.object(tools, "_cache", tools.SearchCache(maxsize=8, ttl=60))
+        self.cache_patcher.start()
+
+    def tearDown(self):
+        self.cache_patcher.stop()
+
+    async def test_normalized_queries_hit_cache(self):
+        backend = AsyncMock(return_value="result")
+        with patch.object(tools, "_tavily_search", backend):
+            self.assertEqual(await tools.search("Fiora  15.24"), "result")
+            self.assertEqual(await tools.search("fiora 15.24 "), "result")
+        backend.assert_awaited_once()
+
+    async def test_concurrent_identical_queries_share_one_request(self):
+        calls = 0
+
+        async def slow_backend(query):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "result"
+
+        with patch.object(tools, "_tavily_search", slow_backend):
+            results = await asyncio.gather(*(tools.search("Darius") for _ in range(5)))
+        self.assertEqual(results, ["result"] * 5)
+        self.assertEqual(calls, 1)
+        self.assertEqual(tools._inflight, {})
+
+    async def test_errors_are_not_cached(self):
+        backend = AsyncMock(side_effect=[RuntimeError("boom"), "ok"])
+        with patch.object(tools, "_tavily_search", backend):
+            self.assertIn("Search error", await tools.websearch.ainvoke({"query": "Garen"}))
+            self.assertEqual(await tools.websearch.ainvoke({"query": "Garen"}), "ok")
+
+    async def test_stub_backend_runs_offline(self):
+        with patch.object(tools, "WEBSEARCH_BACKEND", "stub"):
+            result = await tools.websearch.ainvoke({"query": "Jax 26.5"})
+        self.assertIn("[stub] Jax 26.5", result)
+
+
+
+class TestSearchClient(unittest.TestCase):
+    def test_client_of_a_closed_loop_is_closed(self):
+        async def get_client(settle: bool = False):
+            client = tools._get_http_client()
+            if settle:
+                for _ in range(3):
+                    await asyncio.sleep(0)
+            return client
+
+        async def shutdown():
+            await tools.aclose_search_client()
+
+        with patch.object(tools, "_http_clients", {}):
+            first = asyncio.run(get_client())
+            second = asyncio.run(get_client(settle=True))
+            self.assertTrue(first.is_closed)
+            self.assertFalse(second.is_closed)
+
+            asyncio.run(shutdown())
+            self.assertTrue(second.is_closed)
+            self.assertEqual(tools._http_clients, {})
+
+
+def _turn(n: int) -> AIMessage:
+    return AIMessage(content="", tool_calls=[
+        {"name": "websearch", "args": {"query": f"q{i}"}, "id": f"call-{i}"} for i in range(n)
+    ])
+
+
+class TestToolExecutorNode(unittest.IsolatedAsyncioTestCase):
+    async def test_runs_calls_concurrently_and_answers_each(self):
+        async def slow_search(query):
+            await asyncio.sleep(0.05)
+            return f"result {query}"
+
+        state = {"messages": [_turn(3)], "tool_call_count": 0, "metadata": {}}
+        with patch.object(tools, "search", slow_search):
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            result = await tool_executor.tool_executor_node(state)
+            elapsed = loop.time() - started
+
+        self.assertLess(elapsed, 0.12)
+        replies = result["messages"][1:]
+        self.assertEqual([m.tool_call_id for m in replies], ["call-0", "call-1", "call-2"])
+        self.assertEqual(replies[2].content, "result q2")
+        self.assertEqual(result["tool_call_count"], 3)
+        self.assertGreater(result["metadata"]["tool_seconds"], 0)
+
+    async def test_enforces_call_budget(self):
+        state = {"messages": [_turn(3)], "tool_call_count": tool_executor.MAX_TOOL_CALLS - 1, "metadata": {}}
+        with patch.object(tools, "search", AsyncMock(return_value="ok")) as search:
+            result = await tool_executor.tool_executor_node(state)
+
+        search.assert_awaited_once()
+        self.assertEqual(result["tool_call_count"], tool_executor.MAX_TOOL_CALLS)
+        self.assertEqual([m.content for m in result["messages"][1:]].count(
+            "Tool call skipped: tool budget exhausted"), 2)
+
+    async def test_slow_calls_time_out(self):
+        async def hang(query):
+            await asyncio.sleep(1)
+
+        state = {"messages": [_turn(1)], "tool_call_count": 0, "metadata": {}}
+        with patch.object(tools, "search", hang), patch.object(tool_executor, "TOOL_CALL_TIMEOUT_SECONDS", 0.01):
+            result = await tool_executor.tool_executor_node(state)
+
+        self.assertIn("timed out", result["messages"][-1].content)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import json
 import os
 import sys
 import unittest
@@ -117,5 +118,43 @@ class TestVersionsEndpoints(unittest.TestCase):
         self.assertEqual(resp.status_code, 404)
 
 
+class TestBatchVersionsEndpoint(unittest.TestCase):
+    """Test POST /api/versions:batch NDJSON streaming."""
+
+    def setUp(self):
+        self.client = TestClient(api.app)
+        self.reports = {
+            "26.2": {"version": "26.2", "metadata": {}},
+            "26.3": {"version": "26.3", "metadata": {}},
+        }
+
+    def _lines(self, resp):
+        return {line["version"]: line for line in map(json.loads, resp.text.splitlines())}
+
+    def test_batch_returns_one_line_per_version(self):
+        with patch.object(api, "get_cached_analysis", side_effect=self.reports.get):
+            resp = self.client.post("/api/versions:batch", json={"versions": ["26.3", "26.2", "26.3", "99.99"]})
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.headers["content-type"].startswith("application/x-ndjson"))
+        lines = self._lines(resp)
+        self.assertEqual(set(lines), {"26.2", "26.3", "99.99"})
+        self.assertEqual(lines["26.2"], self.reports["26.2"])
+        self.assertEqual(lines["99.99"]["error"], "not_found")
+
+    def test_batch_applies_projection(self):
+        with patch.object(api, "get_cached_analysis", side_effect=self.reports.get):
+            resp = self.client.post("/api/versions:batch", json={"versions": ["26.2"], "fields": "metadata"})
+        self.assertEqual(self._lines(resp)["26.2"], {"version": "26.2", "metadata": {}})
+
+    def test_batch_rejects_bad_input(self):
+        resp = self.client.post("/api/versions:batch", json={"versions": []})
+        self.assertEqual(resp.status_code, 400)
+        resp = self.client.post("/api/versions:batch", json={"versions": ["26.3"], "fields": "nope"})
+        self.assertEqual(resp.status_code, 400)
+        too_many = [f"1.{i}" for i in range(api.MAX_BATCH_VERSIONS + 1)]
+        resp = self.client.post("/api/versions:batch", json={"versions": too_many})
+        self.assertEqual(resp.status_code, 400)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+import httpx
+from fastapi.testclient import TestClient
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+APP_DIR = os.path.join(PROJECT_ROOT, "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+import api  # noqa: E402
+
+
+class TestWarmup(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        cache_dir = Path(self.tmp_dir.name)
+        (cache_dir / "26.5.json").write_text(json.dumps({"version": "26.5", "summary_report": {}}), encoding="utf-8")
+        (cache_dir / "versions.json").write_text(json.dumps({"latest": "26.4", "versions": []}), encoding="utf-8")
+        self.patchers = [
+            patch.object(api, "CACHE_DIR", cache_dir),
+            patch.object(api, "VERSIONS_INDEX", cache_dir / "versions.json"),
+            patch.object(api, "readiness", {"ready": False, "steps": {}}),
+            patch.object(api, "_latest_version", None),
+            patch.object(api, "warm_up_clients", return_value=["deepseek"]),
+            patch.object(
+                api.LOLOfficialCrawler, "probe_latest_version",
+                new=AsyncMock(return_value=("https://lol.qq.com/x.html", "26.5")),
+            ),
+        ]
+        for p in self.patchers:
+            p.start()
+        self.client = TestClient(api.app)
+
+    def tearDown(self):
+        for p in self.patchers:
+            p.stop()
+        self.tmp_dir.cleanup()
+
+    def test_readiness_reported_separately_from_liveness(self):
+        self.assertEqual(self.client.get("/health/ready").status_code, 503)
+        self.assertEqual(self.client.get("/health/live").json(), {"status": "healthy"})
+
+        asyncio.run(api.warm_up())
+
+        resp = self.client.get("/health/ready")
+        self.assertEqual(resp.status_code, 200)
+        steps = resp.json()["warmup"]
+        self.assertTrue(all(step["ok"] for step in steps.values()))
+        self.assertEqual(steps["latest_version"]["result"], "26.5")
+        self.assertEqual(steps["latest_analysis"]["result"], "26.5")
+
+    def test_health_answers_while_warmup_runs(self):
+        release = threading.Event()
+
+        def slow_compile():
+            release.wait(5)
+            return True
+
+        async def scenario():
+            task = asyncio.create_task(api.warm_up())
+            await asyncio.sleep(0.05)
+            transport = httpx.ASGITransport(app=api.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                resp = await client.get("/health")
+            # The graph step was still blocked in its thread when /health answered
+            warming = "workflow_graph" not in api.readiness["steps"]
+            release.set()
+            await task
+            return resp, warming
+
+        with patch.object(api, "_compile_workflows", side_effect=slow_compile):
+            resp, warming = asyncio.run(scenario())
+
+        self.assertEqual(resp.json(), {"status": "healthy"})
+        self.assertTrue(warming)
+        self.assertTrue(api.readiness["ready"])
+
+    def test_failed_step_does_not_block_readiness(self):
+        with patch.object(api.LOLOfficialCrawler, "probe_latest_version", new=AsyncMock(side_effect=OSError("down"))):
+            asyncio.run(api.warm_up())
+
+        steps = api.readiness["steps"]
+        self.assertTrue(api.readiness["ready"])
+        self.assertFalse(steps["latest_version"]["ok"])
+        # Falls back to the index's latest version, which has no cached analysis here
+        self.assertIsNone(steps["latest_analysis"]["result"])
+
+    def test_latest_is_served_from_memory_after_warmup(self):
+        asyncio.run(api.warm_up())
+        with patch.object(api.LOLOfficialCrawler, "fetch_patch_notes", new=AsyncMock()) as fetch_mock:
+            resp = self.client.get("/api/analyze", params={"version": "latest"})
+
+        self.assertEqual(resp.json()["version"], "26.5")
+        fetch_mock.assert_not_awaited()
+
+    def test_cache_memo_reloads_changed_files(self):
+        first = api.get_cached_analysis("26.5")
+        self.assertIs(api.get_cached_analysis("26.5"), first)
+
+        (api.CACHE_DIR / "26.5.json").write_text(json.dumps({"version": "26.5", "changed": True}), encoding="utf-8")
+        self.assertTrue(api.get_cached_analysis("26.5")["changed"])
+
+        index = api.load_versions_index()
+        index["latest"] = "mutated"
+        self.assertEqual(api.load_versions_index()["latest"], "26.4")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import json
 import os
 import sys
 import unittest
@@ -9,6 +10,8 @@ if APP_DIR not in sys.path:
     sys.path.insert(0, APP_DIR)
 
 from agents import workflow  # noqa: E402
+from agents.nodes import analyzer, tool_executor  # noqa: E402
+from langchain_core.messages import AIMessage  # noqa: E402
 
 
 class _Message:
@@ -30,7 +33,7 @@ class TestShouldContinue(unittest.TestCase):
     def test_routes_to_summarizer_when_tool_calls_reach_limit(self):
         state = {
             "messages": [_Message(tool_calls=[{"name": "websearch"}])],
-            "tool_call_count": workflow.MAX_TOOL_CALLS,
+            "tool_call_count": tool_executor.MAX_TOOL_CALLS,
         }
         self.assertEqual(workflow.should_continue(state), "summarizer")
 
@@ -41,6 +44,14 @@ class TestShouldContinue(unittest.TestCase):
         }
         self.assertEqual(workflow.should_continue(state), "tools")
 
+    def test_routes_to_summarizer_when_latency_budget_is_spent(self):
+        state = {
+            "messages": [_Message(tool_calls=[{"name": "websearch"}])],
+            "tool_call_count": 1,
+            "metadata": {"tool_seconds": 999.0},
+        }
+        self.assertEqual(workflow.should_continue(state), "summarizer")
+
     def test_routes_to_summarizer_when_no_tool_calls(self):
         state = {
             "messages": [_Message(tool_calls=[])],
@@ -49,6 +60,47 @@ class TestShouldContinue(unittest.TestCase):
         self.assertEqual(workflow.should_continue(state), "summarizer")
 
 
+class _ToolHungryLLM:
+    """Always asks for a websearch while tools are bound; answers with JSON otherwise."""
+
+    def __init__(self, bind_tools):
+        self.bind_tools = bind_tools
+
+    async def ainvoke(self, messages):
+        if self.bind_tools:
+            return AIMessage(content="", tool_calls=[{"name": "websearch", "args": {"query": "q"}, "id": "c1"}])
+        return AIMessage(content=json.dumps({"champion_analyses": [], "meta_overview": {}}))
+
+
+class TestToolLatencyBudget(unittest.IsolatedAsyncioTestCase):
+    async def test_exhausted_latency_budget_finishes_without_tools(self):
+        llms = []
+
+        def make_llm(bind_tools=True, **kwargs):
+            llms.append(_ToolHungryLLM(bind_tools))
+            return llms[-1]
+
+        async def extractor_node(state):
+            changes = [{"type": "champion", "champion": "Fiora", "change_type": "buff", "details": {}}]
+            return {**state, "top_lane_changes": changes, "metadata": {"tool_seconds": 999.0}}
+
+        async def summarizer_node(state):
+            return {**state, "summary_report": {"ok": True}}
+
+        with (
+            patch.object(analyzer, "ANALYZER_USE_TOOLS", True),
+            patch.object(analyzer, "analyzer_llm", make_llm),
+            patch.object(workflow, "extractor_node", extractor_node),
+            patch.object(workflow, "summarizer_node", summarizer_node),
+        ):
+            graph = workflow.create_workflow.__wrapped__()
+            result = await graph.ainvoke(workflow.build_initial_state("raw", "26.5"))
+
+        self.assertEqual(result["summary_report"], {"ok": True})
+        self.assertEqual(result["tool_call_count"], 0)
+        self.assertEqual([llm.bind_tools for llm in llms], [False])
+
+
 class TestRunWorkflow(unittest.IsolatedAsyncioTestCase):
     async def test_run_workflow_returns_graph_result(self):
         expected = {"version": "14.24", "error": None}